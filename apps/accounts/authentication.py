@@ -0,0 +1,114 @@
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from apps.accounts.identity import get_identity, remember
+from apps.accounts.tokens import ROLE_PROFILES
+
+
+class ClaimsUser:
+    """
+    The user an access token was issued to, built from its claims.
+
+    `pk`, `role` and `profile_id` come from the token. Any other attribute
+    loads the full User, with its profiles, from the identity cache on first
+    use, so views that need the model still get it. Being
+    stateless, a deactivated user keeps access until their access token
+    expires.
+    """
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, token):
+        self.token = token
+        self.pk = self.id = get_user_model()._meta.pk.to_python(token[api_settings.USER_ID_CLAIM])
+        self.role = token['role']
+        # Every role profile model has a UUID primary key
+        profile_id = token.get('profile_id')
+        self.profile_id = uuid.UUID(profile_id) if profile_id else None
+
+    @cached_property
+    def instance(self):
+        user = get_identity(self.pk)
+        if user is None:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        return user
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.instance, name)
+
+    def __eq__(self, other):
+        return getattr(other, 'pk', None) == self.pk
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __str__(self):
+        return f'ClaimsUser {self.pk}'
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that trusts the role claims of RoleRefreshToken
+    tokens instead of loading the user and profile on every request.
+    Tokens issued without them fall back to loading the user, through the
+    identity cache.
+    """
+    def get_user(self, validated_token):
+        if 'role' in validated_token:
+            return ClaimsUser(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+        user = get_identity(user_id)
+        if user is None:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        if not user.is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        return user
+
+
+def user_role(user):
+    """
+    The role of an authenticated user, from the token claims when present.
+    """
+    if not (user and user.is_authenticated):
+        return None
+    if isinstance(user, ClaimsUser):
+        return user.role
+    profile = remember('profile', user.pk, lambda: getattr(user, 'profile', None))
+    return profile.role if profile else None
+
+
+def role_profile(user):
+    """
+    The user's role profile (EmployerProfile, EmployeeProfile, ...), or
+    None. Loaded at most once per request.
+    """
+    role = user_role(user)
+    if role not in ROLE_PROFILES:
+        return None
+
+    def load():
+        profile = user.instance.profile if isinstance(user, ClaimsUser) else user.profile
+        return getattr(profile, ROLE_PROFILES[role], None)
+    return remember('role_profile', user.pk, load)
+
+
+def role_profile_id(user):
+    """
+    The ID of the user's role profile (e.g. their EmployerProfile), or None.
+    """
+    if isinstance(user, ClaimsUser):
+        return user.profile_id
+    profile = role_profile(user)
+    return profile.pk if profile else None
@@ -0,0 +1,105 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+
+from apps.accounts.tokens import ROLE_PROFILES
+from apps.cache_stats import record, stats
+
+CACHE_PREFIX = 'identity'
+
+_identity_map = ContextVar('identity_map', default=None)
+
+
+class IdentityMap:
+    """
+    Identity rows loaded during one request, keyed by kind and user ID, so
+    that permissions, views and serializers share a single fetch. `loads`
+    counts the fetches and `avoided` the lookups answered from the map.
+    """
+    def __init__(self):
+        self.rows = {}
+        self.loads = 0
+        self.avoided = 0
+
+    def get(self, key, load):
+        if key in self.rows:
+            self.avoided += 1
+            return self.rows[key]
+        self.loads += 1
+        row = self.rows[key] = load()
+        return row
+
+
+@contextmanager
+def identity_map():
+    """
+    Scope a fresh IdentityMap to the enclosed block, normally one request
+    (see IdentityMapMiddleware).
+    """
+    current = IdentityMap()
+    token = _identity_map.set(current)
+    try:
+        yield current
+    finally:
+        _identity_map.reset(token)
+
+
+def remember(kind, user_id, load):
+    """
+    `load()` memoized in the current identity map, if there is one.
+    """
+    current = _identity_map.get()
+    if current is None:
+        return load()
+    return current.get((kind, str(user_id)), load)
+
+
+def identity_key(user_id):
+    return f'{CACHE_PREFIX}:user:{user_id}'
+
+
+def get_identity(user_id):
+    """
+    The User with its UserProfile and role profile already loaded, from the
+    shared cache or, on a miss, with one query. None if there is no such
+    user. Entries are dropped by the accounts and providers signals whenever
+    any of the three rows changes.
+    """
+    return remember('identity', user_id, lambda: cached_identity(user_id))
+
+
+def cached_identity(user_id):
+    key = identity_key(user_id)
+    user = cache.get(key)
+    if user is not None:
+        record(CACHE_PREFIX, 'hits')
+        return user
+
+    record(CACHE_PREFIX, 'misses')
+    user = (
+        get_user_model().objects
+        .select_related('profile', *(f'profile__{name}' for name in ROLE_PROFILES.values()))
+        .filter(pk=user_id)
+        .first()
+    )
+    if user is not None:
+        cache.set(key, user, settings.IDENTITY_CACHE_TIMEOUT)
+    return user
+
+
+def invalidate_identities(user_ids):
+    """
+    Drop the cached identities of `user_ids` once the current transaction
+    commits. Dropping them earlier would let a concurrent request cache the
+    rows as they were before the commit again.
+    """
+    keys = [identity_key(user_id) for user_id in user_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def identity_cache_stats():
+    return stats(CACHE_PREFIX)
@@ -0,0 +1,87 @@
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connections
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Users updated per UPDATE ... SET last_login = CASE ... statement
+FLUSH_BATCH_SIZE = 500
+
+_lock = threading.Lock()
+_pending = {}
+_timer = None
+
+
+def record_login(user_id, when=None):
+    """
+    Buffer a login timestamp instead of writing it right away. Buffered
+    logins are written together by flush_last_logins() at most
+    LAST_LOGIN_FLUSH_INTERVAL seconds later; 0 writes them immediately.
+    """
+    buffer({user_id: when or timezone.now()})
+    if settings.LAST_LOGIN_FLUSH_INTERVAL <= 0:
+        flush_last_logins()
+
+
+def buffer(logins):
+    """
+    Merge `logins` ({user_id: timestamp}) into the buffer and make sure a
+    flush is scheduled.
+    """
+    global _timer
+    interval = settings.LAST_LOGIN_FLUSH_INTERVAL
+    with _lock:
+        for user_id, when in logins.items():
+            _pending[user_id] = max(when, _pending.get(user_id, when))
+        if interval > 0 and _timer is None:
+            _timer = threading.Timer(interval, flush_in_thread)
+            _timer.daemon = True
+            _timer.start()
+
+
+def flush_last_logins():
+    """
+    Write the buffered login timestamps, the latest per user, in batched
+    UPDATEs. Returns the number of users updated.
+    """
+    global _pending, _timer
+    with _lock:
+        pending, _pending = _pending, {}
+        if _timer is not None:
+            _timer.cancel()
+            _timer = None
+    if not pending:
+        return 0
+
+    User = get_user_model()
+    items = list(pending.items())
+    updated = 0
+    try:
+        for start in range(0, len(items), FLUSH_BATCH_SIZE):
+            batch = dict(items[start:start + FLUSH_BATCH_SIZE])
+            updated += User.objects.filter(pk__in=batch).update(last_login=Case(
+                *(When(pk=user_id, then=Value(when)) for user_id, when in batch.items()),
+                output_field=DateTimeField(),
+            ))
+    except DatabaseError:
+        logger.exception("Could not write %d buffered last_login updates", len(pending))
+        # Keep them for the next flush; newer logins buffered since win
+        buffer(pending)
+    return updated
+
+
+def flush_in_thread():
+    try:
+        flush_last_logins()
+    finally:
+        # The timer thread opened its own connection
+        connections.close_all()
+
+
+atexit.register(flush_last_logins)
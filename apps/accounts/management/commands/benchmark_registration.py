@@ -0,0 +1,81 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from apps.accounts.models import User, UserProfile
+from apps.accounts.onboarding import onboard_user
+from apps.accounts.tokens import RoleRefreshToken
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Time registrations through onboarding.onboard_user, tokens included, "
+        "and report milliseconds and queries per user. Nothing is kept: the "
+        "accounts are created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help="Number of registrations.")
+        parser.add_argument(
+            '--role',
+            default='EMPLOYEE',
+            choices=[role for role, _ in UserProfile.USER_ROLES],
+        )
+        parser.add_argument(
+            '--fast-hasher',
+            action='store_true',
+            help="Hash passwords with MD5 to time the database work alone.",
+        )
+        parser.add_argument(
+            '--signals',
+            action='store_true',
+            help="Time the previous path instead: User save plus the UserProfile signal cascade.",
+        )
+
+    def handle(self, *args, **options):
+        register = self.register_with_signals if options['signals'] else self.register
+        hashers = ['django.contrib.auth.hashers.MD5PasswordHasher'] if options['fast_hasher'] else None
+        run = uuid.uuid4().hex[:8]
+
+        with override_settings(**({'PASSWORD_HASHERS': hashers} if hashers else {})):
+            try:
+                with transaction.atomic(), CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    for i in range(options['users']):
+                        user = register(f'bench-{run}-{i}@example.com', options['role'])
+                        RoleRefreshToken.for_user(user)
+                    elapsed = time.perf_counter() - start
+                    raise Rollback
+            except Rollback:
+                pass
+
+        # Savepoints only exist because the run is wrapped in a transaction
+        statements = [
+            query for query in queries.captured_queries
+            if not query['sql'].startswith(('SAVEPOINT', 'RELEASE SAVEPOINT'))
+        ]
+        users = max(options['users'], 1)
+        self.stdout.write(
+            f"{options['users']} {options['role']} registration(s) in {elapsed:.2f}s: "
+            f"{elapsed * 1000 / users:.2f} ms and {len(statements) / users:.1f} statements per user."
+        )
+
+    def register(self, email, role):
+        return onboard_user(
+            email=email, password='benchmark-password', role=role,
+            first_name='Bench', last_name='User',
+        )
+
+    def register_with_signals(self, email, role):
+        user = User(email=email, first_name='Bench', last_name='User')
+        user.set_password('benchmark-password')
+        user.save()
+        UserProfile.objects.create(user=user, role=role)
+        return user
@@ -0,0 +1,28 @@
+import logging
+
+from django.conf import settings
+
+from apps.accounts.identity import identity_map
+
+logger = logging.getLogger(__name__)
+
+
+class IdentityMapMiddleware:
+    """
+    Gives every request its own identity map, so the user's profile and
+    role profile are fetched at most once per request. With DEBUG on, the
+    X-Identity-Map response header reports the loads made and avoided.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with identity_map() as current:
+            response = self.get_response(request)
+        logger.debug(
+            "Identity map for %s: %d loads, %d avoided",
+            request.path, current.loads, current.avoided
+        )
+        if settings.DEBUG:
+            response['X-Identity-Map'] = f'loads={current.loads}; avoided={current.avoided}'
+        return response
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractUser
 import uuid
 
@@ -18,7 +19,7 @@ class User(AbstractUser):
     is_staff = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
     date_joined = models.DateTimeField(auto_now_add=True)
-    last_login = models.DateTimeField(auto_now=True)
+    # last_login is inherited and only written by accounts.last_login
     
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['first_name', 'last_name', 'username']
@@ -27,6 +28,11 @@ class User(AbstractUser):
         db_table = 'users'
         verbose_name = 'User'
         verbose_name_plural = 'Users'
+        indexes = [
+            # Serves the case-insensitive email lookups of registration,
+            # provisioning and enrollee linking
+            models.Index(Lower('email'), name='users_email_lower_idx'),
+        ]
     
     def __str__(self):
         return self.email
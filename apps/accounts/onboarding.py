@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from apps.accounts.models import EmployeeProfile, EmployerProfile, HMOProfile, UserProfile
+from apps.enrollees.models import Enrollees
+from apps.providers.models import ProviderProfile
+
+
+@transaction.atomic
+def onboard_user(email, password, role, phone=None, **user_fields):
+    """
+    Create a User with its UserProfile and role profile in one transaction,
+    with one INSERT each. Employees are linked to the enrollee registered
+    with their email, looked up on the indexed email_lower column.
+
+    The profile post_save signals are skipped, as this does their work.
+    The returned user has its profile and role profile cached, so issuing
+    tokens and serializing the response need no further queries.
+    """
+    user = get_user_model()(email=email, **user_fields)
+    user.set_password(password)
+    user.save()
+
+    profile = UserProfile(user=user, role=role, phone=phone)
+    profile.onboarding = True
+    profile.save()
+
+    role_profile = build_role_profile(profile)
+    if role_profile is not None:
+        role_profile.save()
+    return user
+
+
+def build_role_profile(profile):
+    """
+    The unsaved role profile of a new UserProfile, filled with placeholders
+    for the user to complete later. Employees are linked to their enrollee
+    record right away, unless another account already claimed it.
+    """
+    email = profile.user.email
+    if profile.role == 'EMPLOYER':
+        return EmployerProfile(
+            user_profile=profile,
+            company_name=f"Company for {email}",  # Placeholder
+            company_phone=profile.phone or "",
+            company_email=email
+        )
+    if profile.role == 'EMPLOYEE':
+        employee_profile = EmployeeProfile(user_profile=profile)
+        enrollee = (
+            Enrollees.objects.filter(email_lower=email.lower())
+            .exclude(Exists(EmployeeProfile.objects.filter(employee_id=OuterRef('enrollee_id'))))
+            .values('employer_id', 'enrollee_id', 'dob')
+            .first()
+        )
+        if enrollee:
+            employee_profile.employer_id = enrollee['employer_id']
+            employee_profile.employee_id = enrollee['enrollee_id']
+            employee_profile.date_of_birth = enrollee['dob']
+            employee_profile.job_title = "Employee"  # Default
+        return employee_profile
+    if profile.role == 'PROVIDER':
+        # Completed with facility details later
+        return ProviderProfile(
+            user_profile=profile,
+            facility_name=f"Facility - {email}",  # Placeholder
+            facility_type='HOSPITAL',
+            contact_phone=profile.phone or '',
+            contact_email=email,
+            accreditation_status='PENDING'
+        )
+    if profile.role == 'HMO':
+        return HMOProfile(
+            user_profile=profile,
+            hmo_name=f"HMO for {email}",
+            contact_email=email,
+            contact_phone=profile.phone or ""
+        )
+    return None
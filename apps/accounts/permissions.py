@@ -1,59 +1,49 @@
 from rest_framework.permissions import BasePermission
 
-class IsEmployer(BasePermission):
+from apps.accounts.authentication import user_role
+
+
+class RolePermission(BasePermission):
     """
-    Permission class to check if the user is an employer
+    Grants access to authenticated users whose role is `role`. The role is
+    read from the token claims, without a query, when present.
     """
+    role = None
+
     def has_permission(self, request, view):
-        return (
-            request.user and request.user.is_authenticated
-            and hasattr(request.user, 'profile')
-            and request.user.profile.role == 'EMPLOYER'
-        )
+        return user_role(request.user) == self.role
+
+
+class IsEmployer(RolePermission):
+    """
+    Permission class to check if the user is an employer
+    """
+    role = 'EMPLOYER'
 
 
-class IsEmployee(BasePermission):
+class IsEmployee(RolePermission):
     """
     Permission class to check if the user is an employee
     """
-    def has_permission(self, request, view):
-        return (
-            request.user and request.user.is_authenticated
-            and hasattr(request.user, 'profile')
-            and request.user.profile.role == 'EMPLOYEE'
-        )
+    role = 'EMPLOYEE'
+
 
-class IsProvider(BasePermission):
+class IsProvider(RolePermission):
     """
     Permission class to check if the user is a provider.
     """
-    def has_permission(self, request, view):
-        return (
-            request.user and request.user.is_authenticated
-            and hasattr(request.user, 'profile')
-            and request.user.profile.role == 'PROVIDER'
-        )
+    role = 'PROVIDER'
+
 
-class IsAdmin(BasePermission):
+class IsAdmin(RolePermission):
     """
     Permission class to check if the user is an admin.
     """
-    def has_permission(self, request, view):
-        return (
-            request.user and request.user.is_authenticated
-            and hasattr(request.user, 'profile')
-            and request.user.profile.role == 'ADMIN'
-        )
-
+    role = 'ADMIN'
 
 
-class IsHMO(BasePermission):
+class IsHMO(RolePermission):
     """
     Permission class to check if the user is an HMO.
     """
-    def has_permission(self, request, view):
-        return (
-            request.user and request.user.is_authenticated
-            and hasattr(request.user, 'profile')
-            and request.user.profile.role == 'HMO')
-
+    role = 'HMO'
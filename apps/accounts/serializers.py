@@ -1,14 +1,25 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
+from django.contrib.auth.tokens import default_token_generator
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models.functions import Lower
+from django.utils.encoding import force_str
+from django.utils.http import urlsafe_base64_decode
 from .models import (
     UserProfile,
     EmployeeProfile,
     EmployerProfile
 )
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework_simplejwt.serializers import (
-    TokenObtainPairSerializer
+    TokenObtainPairSerializer,
+    TokenRefreshSerializer,
 )
+from rest_framework_simplejwt.settings import api_settings
+from .last_login import record_login
+from .onboarding import onboard_user
+from .tokens import RoleRefreshToken, role_claims
 
 User = get_user_model()
 
@@ -79,6 +90,19 @@ class RegisterSerializer(serializers.ModelSerializer):
             'password2',
             'role'
         ]
+        # Uniqueness is checked case-insensitively in validate_email
+        extra_kwargs = {'email': {'validators': []}}
+
+    def validate_email(self, value):
+        # lower() rather than iexact, so users_email_lower_idx serves it
+        taken = (
+            User.objects.alias(email_lower=Lower('email'))
+            .filter(email_lower=value.lower())
+            .exists()
+        )
+        if taken:
+            raise serializers.ValidationError('A user with this email already exists.')
+        return value
     
     def validate(self, attrs):
         if attrs['password'] != attrs['password2']:
@@ -94,16 +118,43 @@ class RegisterSerializer(serializers.ModelSerializer):
         """
         Create and return a new User instance, given the validated data.
         """
-        role = validated_data.pop('role')
-        password = validated_data.pop('password')
-        user = User(**validated_data)
-        user.set_password(password)
-        user.save()
-        # UserProfile is created via signals or we need to create it here to trigger the signal?
-        # Wait, the signal is on UserProfile. So we MUST create UserProfile here.
-        # But we should NOT create the child profile (EmployerProfile, etc) here anymore.
-        
-        UserProfile.objects.create(user=user, role=role)
+        return onboard_user(**validated_data)
+
+
+class AcceptInviteSerializer(serializers.Serializer):
+    """
+    Sets the password of an account provisioned in bulk from the enrollee
+    roster, given the uid and token of its invite.
+    """
+    uid = serializers.CharField()
+    token = serializers.CharField()
+    password = serializers.CharField(write_only=True, validators=[validate_password])
+    password2 = serializers.CharField(write_only=True)
+
+    def validate(self, attrs):
+        if attrs['password'] != attrs['password2']:
+            raise serializers.ValidationError(
+                {
+                    "password": "Password fields do not match."
+                }
+            )
+        try:
+            user = User.objects.get(pk=force_str(urlsafe_base64_decode(attrs['uid'])))
+        except (TypeError, ValueError, OverflowError, DjangoValidationError, User.DoesNotExist):
+            user = None
+        if user is None or not default_token_generator.check_token(user, attrs['token']):
+            raise serializers.ValidationError(
+                {
+                    "token": "Invalid or expired invite."
+                }
+            )
+        attrs['user'] = user
+        return attrs
+
+    def save(self):
+        user = self.validated_data['user']
+        user.set_password(self.validated_data['password'])
+        user.save(update_fields=['password'])
         return user
 
 
@@ -111,12 +162,46 @@ class LoginSerializer(TokenObtainPairSerializer):
     """
     Serializer for login - handles user authentication
     """
+    token_class = RoleRefreshToken
+
     def validate(self, attrs):
+        # `refresh` and `access` are issued by TokenObtainPairSerializer
         data = super().validate(attrs)
-        refresh = self.get_token(self.user)
-        data['refresh'] = str(refresh)
-        data['access'] = str(refresh.access_token)
+        record_login(self.user.pk)
         data['user'] = UserSerializer(self.user).data
         return data
-        
-    
+
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Token refresh that re-stamps the user's current role claims on the new
+    access and refresh tokens, so a role or profile change is picked up by
+    the next refresh instead of being copied along with the old token.
+    """
+    token_class = RoleRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.filter(
+            **{api_settings.USER_ID_FIELD: refresh.payload.get(api_settings.USER_ID_CLAIM)}
+        ).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(
+                self.error_messages['no_active_account'], 'no_active_account'
+            )
+        refresh['role'], refresh['profile_id'] = role_claims(user)
+
+        data = {'access': str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                try:
+                    refresh.blacklist()
+                except AttributeError:
+                    # No blacklist without rest_framework_simplejwt.token_blacklist
+                    pass
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data['refresh'] = str(refresh)
+        return data
@@ -1,71 +1,84 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from apps.accounts.identity import invalidate_identities
+from apps.accounts.onboarding import build_role_profile
+from apps.accounts.tokens import ROLE_PROFILES
 from apps.accounts.models import (
+    User,
     UserProfile,
     EmployerProfile,
     EmployeeProfile,
     HMOProfile
 )
-from apps.enrollees.models import Enrollees
-from apps.providers.models import ProviderProfile
 
 
 @receiver(post_save, sender=UserProfile)
 def create_related_profile(sender, instance, created, **kwargs):
     """
     Automatically create the specific role profile when a UserProfile is created.
-    Also implements the 'Claim' logic for Employees.
+    Also implements the 'Claim' logic for Employees. Registration goes
+    through onboarding.onboard_user instead, which does this itself.
     """
-    if created:
-        if instance.role == 'EMPLOYER':
-            EmployerProfile.objects.create(
-                user_profile=instance,
-                company_name=f"Company for {instance.user.email}", # Placeholder
-                company_phone=instance.phone or "",
-                company_email=instance.user.email
-            )
-        
-        elif instance.role == 'EMPLOYEE':
-            # Hybrid/Claim Logic: Check if this user exists as an Enrollee
-            employee_profile = EmployeeProfile.objects.create(
-                user_profile=instance
-            )
-            
-            # Try to link to an existing Enrollee record by email
-            # We use filter().first() to avoid errors if duplicates exist (though email should be unique)
-            enrollee = Enrollees.objects.filter(email=instance.user.email).first()
-            
-            if enrollee:
-                # Link the profile to the employer and enrollee details
-                employee_profile.employer = enrollee.employer
-                employee_profile.employee_id = enrollee.enrollee_id
-                employee_profile.job_title = "Employee" # Default
-                employee_profile.save()
-                
-                # Optional: Update the Enrollee record to link back to the user?
-                # For now, the link is established via the EmployeeProfile.
-            
-        elif instance.role == 'HMO':
-            HMOProfile.objects.create(
-                user_profile=instance,
-                hmo_name=f"HMO for {instance.user.email}",
-                contact_email=instance.user.email,
-                contact_phone=instance.phone or ""
-            )
+    if created and not getattr(instance, 'onboarding', False):
+        role_profile = build_role_profile(instance)
+        if role_profile is not None:
+            role_profile.save()
 
 @receiver(post_save, sender=UserProfile)
 def save_related_profile(sender, instance, **kwargs):
     """
     Ensure the related profile is saved when the UserProfile is saved.
+    Only a role profile already loaded on the instance can hold unsaved
+    changes; fetching one just to save it again would cost two statements.
     """
-    if instance.role == 'EMPLOYER' and hasattr(instance, 'employer_profile'):
-        instance.employer_profile.save()
-    elif instance.role == 'EMPLOYEE' and hasattr(instance, 'employee_profile'):
-        instance.employee_profile.save()
-    elif instance.role == 'PROVIDER' and hasattr(instance, 'provider_profile'):
-        instance.provider_profile.save()
-    elif instance.role == 'HMO' and hasattr(instance, 'hmo_profile'):
-        instance.hmo_profile.save()
+    relation = ROLE_PROFILES.get(instance.role)
+    if relation is None or getattr(instance, 'onboarding', False):
+        return
+    role_profile = instance._meta.get_field(relation).get_cached_value(instance, default=None)
+    if role_profile is not None:
+        role_profile.save()
 
 
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_identity(sender, instance, created=False, update_fields=None, **kwargs):
+    """
+    Drop the cached identity of a changed user. New users and bare
+    last_login updates cannot have a stale entry.
+    """
+    if created or (update_fields and set(update_fields) == {'last_login'}):
+        return
+    invalidate_identities([instance.pk])
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_profile_identity(sender, instance, created=False, **kwargs):
+    if not created:
+        invalidate_identities([instance.user_id])
 
+
+@receiver(post_save, sender=EmployerProfile)
+@receiver(post_delete, sender=EmployerProfile)
+@receiver(post_save, sender=EmployeeProfile)
+@receiver(post_delete, sender=EmployeeProfile)
+@receiver(post_save, sender=HMOProfile)
+@receiver(post_delete, sender=HMOProfile)
+def invalidate_role_profile_identity(sender, instance, **kwargs):
+    invalidate_role_profile(instance)
+
+
+def invalidate_role_profile(instance):
+    """
+    Drop the cached identity of the user owning a role profile.
+    """
+    field = instance._meta.get_field('user_profile')
+    if field.is_cached(instance):
+        user_id = instance.user_profile.user_id
+    else:
+        user_id = (
+            UserProfile.objects.filter(pk=instance.user_profile_id)
+            .values_list('user_id', flat=True).first()
+        )
+    if user_id is not None:
+        invalidate_identities([user_id])
@@ -0,0 +1,90 @@
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from django.contrib.auth import get_user_model
+from apps.accounts.last_login import flush_last_logins
+from apps.accounts.models import UserProfile
+from apps.accounts.tokens import RoleRefreshToken, role_claims
+from apps.enrollees.models import Enrollees
+from apps.testing import QueryBudgetMixin
+
+User = get_user_model()
+
+
+class ClaimsAuthenticationTest(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='employer@example.com', password='password123', username='employer'
+        )
+        self.profile = UserProfile.objects.create(user=self.user, role='EMPLOYER', phone='08100000001')
+        Enrollees.objects.create(
+            first_name='Ada', last_name='Obi', gender='F', phone='08011111111',
+            employer=self.profile.employer_profile
+        )
+        self.addCleanup(flush_last_logins)
+
+    def login(self):
+        response = self.client.post(reverse('login'), {
+            'email': 'employer@example.com', 'password': 'password123'
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def use(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def test_tokens_carry_role_claims(self):
+        tokens = self.login()
+        access = RefreshToken(tokens['refresh']).access_token
+        self.assertEqual(access['role'], 'EMPLOYER')
+        self.assertEqual(access['profile_id'], str(self.profile.employer_profile.id))
+
+        response = self.client.post(reverse('refresh'), {'refresh': tokens['refresh']})
+        self.assertEqual(RefreshToken(response.data['refresh'])['role'], 'EMPLOYER')
+
+    def test_refresh_restamps_changed_role_claims(self):
+        tokens = self.login()
+        self.profile.role = 'HMO'
+        self.profile.save()
+        role, profile_id = role_claims(User.objects.get(pk=self.user.pk))
+        self.assertEqual(role, 'HMO')
+
+        response = self.client.post(reverse('refresh'), {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for token in (RefreshToken(response.data['refresh']), AccessToken(response.data['access'])):
+            self.assertEqual((token['role'], token['profile_id']), (role, profile_id))
+
+    def test_refresh_for_deleted_user(self):
+        refresh = RoleRefreshToken.for_user(self.user)
+        self.user.delete()
+        response = self.client.post(reverse('refresh'), {'refresh': str(refresh)})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_role_checks_skip_user_and_profile_queries(self):
+        self.use(self.login()['access'])
+        # Only the page and the aggregate behind its ETag
+        with self.assertMaxQueries(2):
+            response = self.client.get(reverse('enrollee-list-create'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_full_user_is_loaded_on_demand(self):
+        self.use(self.login()['access'])
+        response = self.client.get(reverse('profile'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['role'], 'EMPLOYER')
+
+        response = self.client.get(reverse('employee-dashboard'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_tokens_without_claims_still_work(self):
+        self.use(RefreshToken.for_user(self.user).access_token)
+        response = self.client.get(reverse('enrollee-list-create'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_deleted_user(self):
+        self.use(RoleRefreshToken.for_user(self.user).access_token)
+        self.user.delete()
+        response = self.client.get(reverse('profile'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
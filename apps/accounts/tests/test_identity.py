@@ -0,0 +1,121 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from apps.accounts.identity import get_identity, identity_cache_stats
+from apps.accounts.models import UserProfile
+from apps.accounts.tokens import RoleRefreshToken
+from apps.enrollees.linking import link_enrollees_to_users
+from apps.enrollees.models import Enrollees
+from apps.providers.models import ProviderProfile
+from apps.testing import QueryBudgetMixin
+
+User = get_user_model()
+
+
+class IdentityCacheTest(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='employer@example.com', password='pw', username='employer'
+        )
+        self.profile = UserProfile.objects.create(user=self.user, role='EMPLOYER', phone='08100000001')
+
+    def test_read_through(self):
+        user = get_identity(self.user.pk)
+        with self.assertNumQueries(0):
+            user = get_identity(self.user.pk)
+            self.assertEqual(user.profile.employer_profile, self.profile.employer_profile)
+        self.assertEqual(
+            identity_cache_stats(), {'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+        )
+        self.assertIsNone(get_identity(User._meta.pk.to_python('00000000-0000-0000-0000-000000000000')))
+
+    def test_invalidated_by_writes(self):
+        employer_profile = self.profile.employer_profile
+        get_identity(self.user.pk)
+        employer_profile.company_name = 'Renamed Ltd'
+        with self.captureOnCommitCallbacks(execute=True):
+            employer_profile.save()
+        self.assertEqual(get_identity(self.user.pk).profile.employer_profile.company_name, 'Renamed Ltd')
+
+        self.user.first_name = 'Ada'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(get_identity(self.user.pk).first_name, 'Ada')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.delete()
+        self.assertFalse(hasattr(get_identity(self.user.pk), 'profile'))
+
+    def test_invalidated_only_on_commit(self):
+        get_identity(self.user.pk)
+        self.user.first_name = 'Ada'
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.save()
+        # Until the commit, other requests still read the committed row.
+        self.assertEqual(get_identity(self.user.pk).first_name, '')
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(get_identity(self.user.pk).first_name, 'Ada')
+
+    def test_invalidated_by_provider_profile(self):
+        user = User.objects.create_user(email='provider@example.com', password='pw', username='provider')
+        UserProfile.objects.create(user=user, role='PROVIDER', phone='08100000002')
+        get_identity(user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            ProviderProfile.objects.filter(user_profile__user=user).get().delete()
+        self.assertFalse(hasattr(get_identity(user.pk).profile, 'provider'))
+
+    def test_invalidated_by_bulk_linking(self):
+        user = User.objects.create_user(email='ada@example.com', password='pw', username='ada')
+        UserProfile.objects.create(user=user, role='EMPLOYEE', phone='08100000002')
+        self.assertIsNone(get_identity(user.pk).profile.employee_profile.employer_id)
+        enrollee = Enrollees(
+            enrollee_id='HL-240101-0001', email='ada@example.com',
+            employer=self.profile.employer_profile
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            link_enrollees_to_users([enrollee])
+
+        self.assertEqual(
+            get_identity(user.pk).profile.employee_profile.employer_id,
+            self.profile.employer_profile.id
+        )
+
+    def test_profile_view_served_from_cache(self):
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {RoleRefreshToken.for_user(self.user).access_token}'
+        )
+        self.client.get(reverse('profile'))
+        with self.assertMaxQueries(0):
+            response = self.client.get(reverse('profile'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['role'], 'EMPLOYER')
+
+
+class IdentityMapTest(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='employer@example.com', password='pw', username='employer'
+        )
+        UserProfile.objects.create(user=self.user, role='EMPLOYER', phone='08100000001')
+
+    def test_profiles_loaded_once_per_request(self):
+        # A user without role claims, resolved through its profile rows
+        self.client.force_authenticate(user=User.objects.get(pk=self.user.pk))
+        with self.settings(DEBUG=True), self.assertMaxQueries(7):
+            response = self.client.post(reverse('enrollee-list-create'), {
+                'first_name': 'New', 'last_name': 'Member', 'gender': 'F', 'phone': '08099999999',
+            })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # The serializer reuses the profile the permission loaded
+        self.assertEqual(response['X-Identity-Map'], 'loads=2; avoided=1')
+
+    def test_unchanged_role_profile_is_not_saved_again(self):
+        profile = UserProfile.objects.get(user=self.user)
+        with self.assertNumQueries(1):
+            profile.save()
@@ -0,0 +1,60 @@
+import datetime
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from apps.accounts.last_login import flush_last_logins, record_login
+from apps.accounts.models import UserProfile
+
+User = get_user_model()
+
+
+@override_settings(LAST_LOGIN_FLUSH_INTERVAL=3600)
+class LastLoginWriteBehindTest(TestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(email=f'user{i}@example.com', password='password123', username=f'user{i}')
+            for i in range(2)
+        ]
+        self.addCleanup(flush_last_logins)
+
+    def test_logins_are_written_in_one_batch(self):
+        first, second = self.users
+        earlier = timezone.now() - datetime.timedelta(minutes=5)
+        later = timezone.now()
+        with self.assertNumQueries(0):
+            record_login(first.pk, later)
+            record_login(first.pk, earlier)
+            record_login(second.pk, earlier)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(flush_last_logins(), 2)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.last_login, second.last_login), (later, earlier))
+        self.assertEqual(flush_last_logins(), 0)
+
+    def test_login_is_buffered(self):
+        user = self.users[0]
+        UserProfile.objects.create(user=user, role='EMPLOYEE', phone='08100000001')
+        self.client.post(reverse('login'), {'email': user.email, 'password': 'password123'})
+        user.refresh_from_db()
+        self.assertIsNone(user.last_login)
+
+        flush_last_logins()
+        user.refresh_from_db()
+        self.assertIsNotNone(user.last_login)
+
+    def test_saves_do_not_touch_last_login(self):
+        user = self.users[0]
+        user.first_name = 'Ada'
+        user.save()
+        user.refresh_from_db()
+        self.assertIsNone(user.last_login)
+
+    @override_settings(LAST_LOGIN_FLUSH_INTERVAL=0)
+    def test_zero_interval_writes_through(self):
+        user = self.users[0]
+        record_login(user.pk)
+        user.refresh_from_db()
+        self.assertIsNotNone(user.last_login)
@@ -0,0 +1,75 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import TestCase
+from apps.accounts.models import EmployeeProfile, UserProfile
+from apps.accounts.onboarding import onboard_user
+from apps.accounts.tokens import role_claims
+from apps.enrollees.models import Enrollees
+from apps.providers.models import ProviderProfile
+
+User = get_user_model()
+
+
+class OnboardUserTest(TestCase):
+    def setUp(self):
+        employer = User.objects.create_user(email='employer@example.com', password='pw', username='employer')
+        self.employer_profile = UserProfile.objects.create(
+            user=employer, role='EMPLOYER', phone='08100000001'
+        ).employer_profile
+        self.enrollee = Enrollees.objects.create(
+            first_name='Ada', last_name='Obi', gender='F', phone='08010000001',
+            email='Ada.Obi@example.com', dob='1990-05-01', employer=self.employer_profile
+        )
+
+    def test_links_employee_to_enrollee(self):
+        # User, UserProfile, enrollee lookup and EmployeeProfile, in one transaction
+        with self.assertNumQueries(6):
+            user = onboard_user(
+                email='ada.obi@example.com', password='password123####', role='EMPLOYEE',
+                first_name='Ada', last_name='Obi'
+            )
+        employee_profile = EmployeeProfile.objects.get(user_profile__user=user)
+        self.assertEqual(employee_profile.employer, self.employer_profile)
+        self.assertEqual(employee_profile.employee_id, self.enrollee.enrollee_id)
+        self.assertEqual(str(employee_profile.date_of_birth), '1990-05-01')
+        self.assertTrue(user.check_password('password123####'))
+
+        # The claims for the tokens come from the profiles it just created
+        with self.assertNumQueries(0):
+            self.assertEqual(role_claims(user), ('EMPLOYEE', str(employee_profile.pk)))
+
+    def test_creates_provider_profile(self):
+        user = onboard_user(email='clinic@example.com', password='pw', role='PROVIDER')
+        provider = ProviderProfile.objects.get(user_profile__user=user)
+        self.assertEqual(provider.contact_email, 'clinic@example.com')
+        self.assertEqual(provider.accreditation_status, 'PENDING')
+
+    def test_rolls_back_on_failure(self):
+        with mock.patch.object(EmployeeProfile, 'save', side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                onboard_user(email='ada.obi@example.com', password='pw', role='EMPLOYEE')
+        self.assertFalse(User.objects.filter(email='ada.obi@example.com').exists())
+
+    def test_claimed_enrollee_is_not_linked_again(self):
+        onboard_user(email='ada.obi@example.com', password='pw', role='EMPLOYEE')
+        # The enrollee ID is already taken by the first account's profile
+        user = onboard_user(email='ADA.OBI@example.com', password='pw', role='EMPLOYEE')
+        employee_profile = user.profile.employee_profile
+        self.assertIsNone(employee_profile.employee_id)
+        self.assertIsNone(employee_profile.employer_id)
+
+    def test_signal_path_still_creates_role_profiles(self):
+        user = User.objects.create_user(email='hmo@example.com', password='pw', username='hmo')
+        profile = UserProfile.objects.create(user=user, role='HMO', phone='08100000002')
+        self.assertEqual(profile.hmo_profile.contact_email, 'hmo@example.com')
+
+    def test_benchmark_command_keeps_nothing(self):
+        out = StringIO()
+        call_command('benchmark_registration', users=3, fast_hasher=True, stdout=out)
+        self.assertIn('3 EMPLOYEE registration(s)', out.getvalue())
+        self.assertIn('4.0 statements per user', out.getvalue())
+        self.assertFalse(User.objects.filter(email__startswith='bench-').exists())
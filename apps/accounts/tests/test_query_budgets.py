@@ -0,0 +1,62 @@
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from apps.accounts.last_login import flush_last_logins
+from apps.accounts.models import UserProfile
+from apps.testing import QueryBudgetMixin
+
+User = get_user_model()
+
+
+class AccountsQueryBudgetTest(QueryBudgetMixin, APITestCase):
+    def _create_user(self, email, role, phone):
+        user = User.objects.create_user(email=email, password='password123', username=email)
+        UserProfile.objects.create(user=user, role=role, phone=phone)
+        return user
+
+    def authenticate(self, user):
+        # A fresh user per request so no relation is cached across requests.
+        self.client.force_authenticate(user=User.objects.get(pk=user.pk))
+
+    def test_register(self):
+        # Email check, then the user, its profiles and the enrollee lookup
+        # in one transaction; the role claims come from the new instances
+        with self.assertMaxQueries(7):
+            response = self.client.post(reverse('register'), {
+                'email': 'new@example.com', 'first_name': 'New', 'last_name': 'User',
+                'password': 'password123####', 'password2': 'password123####',
+                'role': 'EMPLOYEE'
+            })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_login(self):
+        self._create_user('login@example.com', 'EMPLOYEE', '08100000001')
+        self.addCleanup(flush_last_logins)
+        # The user and its role claims; last_login is written behind
+        with self.assertMaxQueries(2):
+            response = self.client.post(reverse('login'), {
+                'email': 'login@example.com', 'password': 'password123'
+            })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_profile(self):
+        user = self._create_user('profile@example.com', 'EMPLOYER', '08100000001')
+        self.authenticate(user)
+        with self.assertMaxQueries(1):
+            response = self.client.get(reverse('profile'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_employer_dashboard(self):
+        user = self._create_user('employer@example.com', 'EMPLOYER', '08100000001')
+        self.authenticate(user)
+        with self.assertMaxQueries(2):
+            response = self.client.get(reverse('employer-dashboard'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_employee_dashboard(self):
+        user = self._create_user('employee@example.com', 'EMPLOYEE', '08100000001')
+        self.authenticate(user)
+        with self.assertMaxQueries(2):
+            response = self.client.get(reverse('employee-dashboard'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -1,7 +1,11 @@
+from unittest import skipUnless
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 from django.contrib.auth import get_user_model
+from apps.accounts.last_login import flush_last_logins
 from apps.accounts.models import UserProfile
 
 User = get_user_model()
@@ -42,6 +46,31 @@ class RegisterViewTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn('email', response.data)
 
+        response = self.client.post(self.url, {**self.valid_payload, 'email': 'NewUser@example.com'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('email', response.data)
+
+    @skipUnless(connection.vendor == 'postgresql', 'expression index plans are Postgres specific')
+    def test_duplicate_check_uses_the_lowercased_email_index(self):
+        # Enough rows, analyzed, that no full index scan looks as cheap
+        User.objects.bulk_create(
+            User(email=f'other{i}@test.com', username=f'other{i}') for i in range(500)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE users')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(self.url, self.valid_payload)
+        sql = next(query['sql'] for query in queries if 'LOWER("users"."email")' in query['sql'])
+
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            try:
+                cursor.execute(f'EXPLAIN {sql}')
+                plan = '\n'.join(line for line, in cursor.fetchall())
+            finally:
+                cursor.execute('RESET enable_seqscan')
+        self.assertIn('users_email_lower_idx', plan)
+
 
 class LoginViewTest(APITestCase):
     def setUp(self):
@@ -54,6 +83,8 @@ class LoginViewTest(APITestCase):
             username='loginuser'
         )
         UserProfile.objects.create(user=self.user, role='EMPLOYEE')
+        # Write buffered logins while the test database is still there
+        self.addCleanup(flush_last_logins)
 
     def test_login_success(self):
         data = {
@@ -0,0 +1,49 @@
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.accounts.models import UserProfile
+
+# UserProfile relation holding the profile of each role. ADMIN has none.
+ROLE_PROFILES = {
+    'EMPLOYER': 'employer_profile',
+    'EMPLOYEE': 'employee_profile',
+    'PROVIDER': 'provider',
+    'HMO': 'hmo_profile',
+}
+
+
+class RoleRefreshToken(RefreshToken):
+    """
+    Refresh token carrying the user's `role` and `profile_id` (the ID of
+    their role profile) as claims. Access tokens minted from it, at login or
+    on refresh, inherit both, so ClaimsJWTAuthentication can authorize
+    requests without loading the user.
+    """
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token['role'], token['profile_id'] = role_claims(user)
+        return token
+
+
+def role_claims(user):
+    """
+    (role, role profile ID) of a user, read with a single query unless the
+    profiles are already loaded on it, as after onboarding.onboard_user.
+    """
+    profile = cached_relation(user, 'profile')
+    relation = ROLE_PROFILES.get(profile.role) if profile else None
+    if profile is None or (relation and cached_relation(profile, relation) is None):
+        profile = (
+            UserProfile.objects
+            .select_related(*ROLE_PROFILES.values())
+            .filter(user=user)
+            .first()
+        )
+    if profile is None:
+        return None, None
+    role_profile = getattr(profile, ROLE_PROFILES.get(profile.role, ''), None)
+    return profile.role, str(role_profile.pk) if role_profile else None
+
+
+def cached_relation(instance, name):
+    return instance._meta.get_field(name).get_cached_value(instance, default=None)
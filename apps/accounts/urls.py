@@ -4,8 +4,10 @@ from . import views
 urlpatterns = [
     path('register/', views.register, name='register'),
     path('login/', views.login, name='login'),
+    path('accept-invite/', views.accept_invite, name='accept-invite'),
     path('refresh/', views.refresh, name='refresh'),
     path('profile/', views.profile_view, name="profile"),
+    path('identity-cache-stats/', views.identity_cache_stats_view, name='identity-cache-stats'),
     path('employer/dashboard/', views.employer_dashboard, name='employer-dashboard'),
     path('employee/dashboard/', views.employee_dashboard, name='employee-dashboard'),
 ]
\ No newline at end of file
@@ -1,12 +1,20 @@
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework import status
-from .serializers import RegisterSerializer, UserSerializer, LoginSerializer, UserProfileSerializer
-from rest_framework_simplejwt.tokens import RefreshToken
+from .serializers import (
+    AcceptInviteSerializer,
+    RegisterSerializer,
+    UserSerializer,
+    LoginSerializer,
+    RoleTokenRefreshSerializer,
+    UserProfileSerializer
+)
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.serializers import TokenRefreshSerializer
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
-from .permissions import IsEmployer, IsEmployee
+from .authentication import role_profile
+from .identity import identity_cache_stats
+from .permissions import IsAdmin, IsEmployer, IsEmployee
+from .tokens import RoleRefreshToken
 
 
 @api_view(['POST'])
@@ -16,7 +24,7 @@ def register(request):
     if serializer.is_valid():
         user = serializer.save()
 
-        refresh = RefreshToken.for_user(user)
+        refresh = RoleRefreshToken.for_user(user)
         return Response(
             {
                 "user": UserProfileSerializer(user.profile).data,
@@ -27,6 +35,28 @@ def register(request):
         )
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def accept_invite(request):
+    """
+    Set the password of an account provisioned from the enrollee roster
+    (uid, token, password, password2) and log it in.
+    """
+    serializer = AcceptInviteSerializer(data=request.data)
+    if serializer.is_valid():
+        user = serializer.save()
+
+        refresh = RoleRefreshToken.for_user(user)
+        return Response(
+            {
+                "user": UserProfileSerializer(user.profile).data,
+                "refresh": str(refresh),
+                "access": str(refresh.access_token)
+            },
+            status=status.HTTP_200_OK
+        )
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def login(request):
@@ -37,7 +67,7 @@ def login(request):
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def refresh(request):
-    serializer = TokenRefreshSerializer(data=request.data)
+    serializer = RoleTokenRefreshSerializer(data=request.data)
     try:
         serializer.is_valid(raise_exception=True)
         return Response(serializer.validated_data, status=status.HTTP_200_OK)
@@ -61,18 +91,15 @@ def employer_dashboard(request):
     """
     Get employer dashboard.
     """
-    profile = request.user.profile
+    employer_profile = role_profile(request.user)
     employer_data = None
     
-    if hasattr(profile, 'employer_profile'):
-        try:
-            employer_data = {
-                "company_name": profile.employer_profile.company_name,
-                "number_of_employees": profile.employer_profile.number_of_employees,
-                "industry": profile.employer_profile.industry,
-            }
-        except profile.employer_profile.RelatedObjectDoesNotExist:
-            pass
+    if employer_profile is not None:
+        employer_data = {
+            "company_name": employer_profile.company_name,
+            "number_of_employees": employer_profile.number_of_employees,
+            "industry": employer_profile.industry,
+        }
     
     return Response(
         {
@@ -89,20 +116,16 @@ def employee_dashboard(request):
     """
     Get employee dashboard.
     """
-    profile = request.user.profile
+    emp_profile = role_profile(request.user)
     employee_data = None
     
-    if hasattr(profile, 'employee_profile'):
-        try:
-            emp_profile = profile.employee_profile
-            employee_data = {
-                "employee_id": emp_profile.employee_id,
-                "department": emp_profile.department,
-                "job_title": emp_profile.job_title,
-                "employer": emp_profile.employer.company_name if emp_profile.employer else None
-            }
-        except profile.employee_profile.RelatedObjectDoesNotExist:
-            pass
+    if emp_profile is not None:
+        employee_data = {
+            "employee_id": emp_profile.employee_id,
+            "department": emp_profile.department,
+            "job_title": emp_profile.job_title,
+            "employer": emp_profile.employer.company_name if emp_profile.employer else None
+        }
     
     return Response(
         {
@@ -111,3 +134,12 @@ def employee_dashboard(request):
         },
         status=status.HTTP_200_OK
     )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdmin])
+def identity_cache_stats_view(request):
+    """
+    Hit/miss counters of the authenticated identity cache.
+    """
+    return Response(identity_cache_stats(), status=status.HTTP_200_OK)
@@ -0,0 +1,36 @@
+from django.core.cache import cache
+
+OUTCOMES = ('hits', 'misses')
+
+
+def stats_key(prefix, name):
+    return f'{prefix}:stats:{name}'
+
+
+def record(prefix, name):
+    """
+    Count a cache hit or miss (`name`) under `prefix` in the shared cache, so
+    the counts cover every worker.
+    """
+    key = stats_key(prefix, name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def stats(prefix):
+    """
+    Hits, misses and hit rate counted by `record` under `prefix`.
+    """
+    keys = {name: stats_key(prefix, name) for name in OUTCOMES}
+    counts = cache.get_many(list(keys.values()))
+    hits = counts.get(keys['hits'], 0)
+    misses = counts.get(keys['misses'], 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total, 4) if total else None,
+    }
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 # Register your models here.
-from .models import Enrollees
+from .models import Enrollees, EnrolleeImportJob
 
-admin.site.register(Enrollees)
\ No newline at end of file
+admin.site.register(Enrollees)
+admin.site.register(EnrolleeImportJob)
@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class EnrolleesConfig(AppConfig):
@@ -7,4 +8,6 @@ class EnrolleesConfig(AppConfig):
 
     def ready(self):
         import apps.enrollees.signals
+        from apps.enrollees.search import create_name_search_index
+        post_migrate.connect(create_name_search_index, sender=self)
 
@@ -0,0 +1,62 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest())
+
+
+def enrollee_validators(enrollee):
+    """
+    (etag, last_modified) of an enrollee detail response. The nested plan
+    is part of the response, so its updated_at counts too.
+    """
+    plan_updated = enrollee.plan.updated_at if enrollee.plan else None
+    last_modified = max(filter(None, [enrollee.updated_at, plan_updated]))
+    etag = make_etag(enrollee.pk, enrollee.updated_at.isoformat(), plan_updated and plan_updated.isoformat())
+    return etag, last_modified
+
+
+def list_validators(queryset, request):
+    """
+    (etag, last_modified) of a list response, from one aggregate over the
+    listed queryset: the count catches deletions, the max(updated_at) of the
+    enrollees and their plans every other change. The query string (cursor,
+    page size, expand) picks the page and shape, so it is part of the ETag.
+
+    Lists get no Last-Modified: a deletion, or a row leaving the filter,
+    changes the list without advancing any updated_at.
+    """
+    stats = queryset.aggregate(
+        count=Count('id'), updated=Max('updated_at'), plan_updated=Max('plan__updated_at')
+    )
+    etag = make_etag(
+        request.get_full_path(), stats['count'],
+        stats['updated'] and stats['updated'].isoformat(),
+        stats['plan_updated'] and stats['plan_updated'].isoformat(),
+    )
+    return etag, None
+
+
+def not_modified(request, etag, last_modified):
+    """
+    A 304 response if the request's If-None-Match / If-Modified-Since
+    validators still match, else None.
+    """
+    response = get_conditional_response(
+        request, etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
@@ -0,0 +1,73 @@
+from django.db.models import Case, Q, Value, When
+from django.utils import timezone
+
+from apps.enrollees.models import Enrollees
+
+
+def covered_q(today):
+    """
+    The database form of Enrollees.is_coverage_active() for `today`.
+    """
+    return Q(status='ACTIVE', coverage_start__lte=today, coverage_end__gte=today)
+
+
+def lapsed_q(today):
+    """
+    Coverage dates that do not include `today`, missing dates included.
+    """
+    return (
+        Q(coverage_start__isnull=True)
+        | Q(coverage_end__isnull=True)
+        | Q(coverage_start__gt=today)
+        | Q(coverage_end__lt=today)
+    )
+
+
+def covered_enrollees(queryset=None):
+    """
+    Enrollees whose coverage is active, per the materialized flag. Filters on
+    exactly the condition of the `enrollees_covered_idx` partial index.
+    """
+    if queryset is None:
+        queryset = Enrollees.objects.all()
+    return queryset.filter(status='ACTIVE', coverage_active=True)
+
+
+def refresh_coverage_state(queryset, today=None):
+    """
+    Recompute coverage_active for a queryset with one UPDATE, for writes
+    that bypass pre_save. Returns the number of rows updated.
+    """
+    today = today or timezone.now().date()
+    # CASE rather than the bare condition, which is NULL for missing dates
+    return queryset.update(
+        coverage_active=Case(When(covered_q(today), then=Value(True)), default=Value(False))
+    )
+
+
+def sweep_coverage_state(today=None, batch_size=1000):
+    """
+    Flip coverage_active for coverages that started or ended since the last
+    sweep, `batch_size` rows per UPDATE. Returns (activated, deactivated).
+
+    Each side filters on the condition of one partial index: only ACTIVE
+    enrollees can be flagged, so the covered ones to deactivate are exactly
+    those of `enrollees_covered_idx` whose dates lapsed.
+    """
+    today = today or timezone.now().date()
+    activated = flip(
+        Enrollees.objects.filter(covered_q(today), coverage_active=False), True, batch_size
+    )
+    deactivated = flip(covered_enrollees().filter(lapsed_q(today)), False, batch_size)
+    return activated, deactivated
+
+
+def flip(queryset, value, batch_size):
+    flipped = 0
+    while True:
+        ids = list(queryset.order_by().values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return flipped
+        flipped += Enrollees.objects.filter(id__in=ids).update(
+            coverage_active=value, updated_at=timezone.now()
+        )
@@ -0,0 +1,139 @@
+import csv
+import io
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+
+EXPORT_FIELDS = [
+    'enrollee_id', 'first_name', 'last_name', 'dob', 'gender', 'phone',
+    'email', 'national_id', 'address', 'plan_id', 'status',
+    'coverage_start', 'coverage_end', 'created_at', 'updated_at'
+]
+# Oldest first, read straight off the (employer, -created_at, id) index
+# scanned backwards; (created_at, id) would sort the whole roster first
+EXPORT_ORDERING = ('created_at', '-id')
+
+
+def roster_rows(queryset, chunk_size=None):
+    """
+    Iterate an employer's roster as dicts from a server-side cursor, so only
+    `chunk_size` rows are held in memory at a time.
+    """
+    chunk_size = chunk_size or settings.ENROLLEE_EXPORT_CHUNK_SIZE
+    return (
+        queryset
+        .order_by(*EXPORT_ORDERING)
+        .values(*EXPORT_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def batched(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def export_csv(rows, batch_size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for batch in batched(rows, batch_size):
+        writer.writerows(
+            [json.dumps(row[field]) if field == 'address' else row[field] for field in EXPORT_FIELDS]
+            for row in batch
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_ndjson(rows, batch_size):
+    for batch in batched(rows, batch_size):
+        yield ''.join(json.dumps(row, cls=DjangoJSONEncoder) + '\n' for row in batch)
+
+
+class ParquetSink:
+    """
+    Write-only file object that hands back what pyarrow wrote since the last
+    drain, so each record batch can be streamed as soon as it is encoded.
+    """
+    closed = False
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.position = 0
+
+    def write(self, data):
+        self.buffer.extend(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def parquet_schema():
+    return pa.schema([
+        ('enrollee_id', pa.string()),
+        ('first_name', pa.string()),
+        ('last_name', pa.string()),
+        ('dob', pa.date32()),
+        ('gender', pa.string()),
+        ('phone', pa.string()),
+        ('email', pa.string()),
+        ('national_id', pa.string()),
+        ('address', pa.string()),
+        ('plan_id', pa.string()),
+        ('status', pa.string()),
+        ('coverage_start', pa.date32()),
+        ('coverage_end', pa.date32()),
+        ('created_at', pa.timestamp('us', tz='UTC')),
+        ('updated_at', pa.timestamp('us', tz='UTC')),
+    ])
+
+
+def export_parquet(rows, batch_size):
+    schema = parquet_schema()
+    sink = ParquetSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema)
+    for batch in batched(rows, batch_size):
+        for row in batch:
+            row['address'] = json.dumps(row['address'])
+            row['plan_id'] = str(row['plan_id']) if row['plan_id'] else None
+        writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+EXPORT_FORMATS = {
+    'csv': (export_csv, 'text/csv', 'csv'),
+    'ndjson': (export_ndjson, 'application/x-ndjson', 'ndjson'),
+    'parquet': (export_parquet, 'application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def parquet_available():
+    return pq is not None
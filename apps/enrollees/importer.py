@@ -0,0 +1,312 @@
+import json
+import uuid
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from apps.enrollees.models import Enrollees
+from apps.enrollees.sequences import allocate_enrollee_ids
+from apps.enrollees.signals import enrollees_bulk_changed
+from apps.enrollees.linking import link_enrollees_to_users
+from apps.enrollees.utils import StageTimer, iter_chunks, normalize_phone
+from apps.plans.models import Plan
+
+
+REQUIRED_COLUMNS = [
+    'first_name',
+    'last_name',
+    'dob',
+    'gender',
+    'phone',
+    'plan_id',
+    'email',
+    'national_id',
+    'address'
+]
+OPTIONAL_COLUMNS = ['status', 'coverage_start', 'coverage_end']
+
+NOT_BLANK_FIELDS = ['first_name', 'last_name', 'gender', 'phone']
+MAX_LENGTHS = {
+    'first_name': 100,
+    'last_name': 100,
+    'phone': 20,
+    'email': 254,
+    'national_id': 50,
+}
+DATE_FIELDS = ['dob', 'coverage_start', 'coverage_end']
+GENDER_CHOICES = {choice for choice, _ in Enrollees._meta.get_field('gender').choices}
+STATUS_CHOICES = {choice for choice, _ in Enrollees.STATUS_CHOICES}
+EMAIL_PATTERN = r'^[^@\s]+@[^@\s]+\.[^@\s]+$'
+
+
+def import_enrollees(file, employer, chunk_size=None):
+    """
+    Import enrollees for `employer` from an uploaded CSV/Excel file.
+
+    The file is read `chunk_size` rows at a time. Each chunk is validated
+    column-wise and its valid rows are written with a single bulk_create
+    inside one transaction. Returns the totals, the per-row error report and
+    the seconds spent parsing, validating and writing.
+    """
+    result = {'total_rows': 0, 'created': 0, 'failed': 0, 'errors': []}
+    timer = StageTimer()
+
+    for rows, created, errors in iter_import(file, employer, chunk_size, timer):
+        result['total_rows'] += rows
+        result['created'] += created
+        result['failed'] += len(errors)
+        result['errors'].extend(errors)
+
+    result['timings'] = timer.as_dict()
+    return result
+
+
+def iter_import(file, employer, chunk_size=None, timer=None, skip_rows=0):
+    """
+    Import the file chunk by chunk, yielding (rows, created, errors) after
+    each chunk has been committed so callers can report progress.
+    Only one chunk of the upload is held in memory at a time. The first
+    `skip_rows` data rows, already imported by an earlier run, are skipped.
+    """
+    chunk_size = chunk_size or settings.ENROLLEE_IMPORT_CHUNK_SIZE
+    timer = timer or StageTimer()
+    seen_phones = set()
+    position = 0
+
+    for chunk in timer.iterate('parse', iter_chunks(file, chunk_size)):
+        missing = [column for column in REQUIRED_COLUMNS if column not in chunk.columns]
+        if missing:
+            raise ValueError("File must contain all required columns")
+
+        start, position = position, position + len(chunk)
+        if position <= skip_rows:
+            continue
+        chunk = chunk.iloc[max(skip_rows - start, 0):]
+
+        created, errors = import_chunk(chunk, employer, seen_phones, timer)
+        yield len(chunk), created, errors
+
+
+def import_chunk(chunk, employer, seen_phones, timer=None):
+    """
+    Validate one chunk and bulk insert its valid rows.
+    Returns the number of enrollees created and the chunk's error report.
+    """
+    timer = timer or StageTimer()
+    with timer.stage('validate'):
+        valid, errors = split_chunk(chunk, seen_phones)
+    if valid.empty:
+        return 0, errors
+
+    enrollees = build_enrollees(valid, employer)
+    try:
+        with timer.stage('write'), transaction.atomic():
+            Enrollees.objects.bulk_create(enrollees)
+            # bulk_create bypasses post_save, so link matching users here.
+            link_enrollees_to_users(enrollees)
+            transaction.on_commit(lambda: enrollees_bulk_changed.send(
+                sender=Enrollees, enrollee_ids=[enrollee.pk for enrollee in enrollees]
+            ))
+    except Exception as e:
+        errors.extend(
+            {
+                'row': index + 2,
+                'error': str(e),
+                'data': row_data(chunk, index),
+            }
+            for index in valid.index
+        )
+        errors.sort(key=lambda error: error['row'])
+        return 0, errors
+
+    seen_phones.update(valid['phone_e164'])
+    return len(enrollees), errors
+
+
+def split_chunk(chunk, seen_phones, check_existing_phones=True):
+    """
+    Validate a raw chunk and return its prepared valid rows together with
+    the error report for the invalid ones.
+    """
+    values = prepare_chunk(chunk)
+    field_errors = validate_chunk(values, seen_phones, check_existing_phones)
+
+    invalid = values.index.isin(list(field_errors))
+    errors = [
+        {
+            'row': index + 2,  # +2 for header row and 0-indexing
+            'data': row_data(chunk, index),
+            'errors': field_errors[index],
+        }
+        for index in values.index[invalid]
+    ]
+    return values[~invalid], errors
+
+
+def prepare_chunk(chunk):
+    """
+    Return a copy of the chunk with stripped string values, blanks as NaN
+    and the optional columns present.
+    """
+    values = chunk.copy()
+    for column in OPTIONAL_COLUMNS:
+        if column not in values.columns:
+            values[column] = ''
+
+    columns = REQUIRED_COLUMNS + OPTIONAL_COLUMNS
+    values = values[columns].astype(str).apply(lambda column: column.str.strip())
+    values = values.mask(values == '')
+    values['status'] = values['status'].fillna('ACTIVE')
+    return values
+
+
+def validate_chunk(values, seen_phones, check_existing_phones=True):
+    """
+    Validate a prepared chunk column by column.
+    Returns {row index: {field: [messages]}} for the invalid rows only.
+    `check_existing_phones=False` skips the database uniqueness check, for
+    roster syncs where a known phone identifies the enrollee to update.
+    """
+    errors = {}
+
+    def flag(mask, field, message, column=None):
+        for index in values.index[mask]:
+            value = values.at[index, column or field]
+            errors.setdefault(index, {}).setdefault(field, []).append(
+                message(value) if callable(message) else message
+            )
+
+    for field in NOT_BLANK_FIELDS:
+        flag(values[field].isna(), field, "This field may not be blank.")
+
+    for field, max_length in MAX_LENGTHS.items():
+        flag(
+            values[field].str.len() > max_length, field,
+            f"Ensure this field has no more than {max_length} characters."
+        )
+
+    flag(
+        values['gender'].notna() & ~values['gender'].isin(GENDER_CHOICES),
+        'gender', lambda value: f'"{value}" is not a valid choice.'
+    )
+    flag(
+        ~values['status'].isin(STATUS_CHOICES),
+        'status', lambda value: f'"{value}" is not a valid choice.'
+    )
+    flag(
+        values['email'].notna() & ~values['email'].str.match(EMAIL_PATTERN, na=False),
+        'email', "Enter a valid email address."
+    )
+
+    for field in DATE_FIELDS:
+        parsed = pd.to_datetime(values[field], errors='coerce', format='ISO8601')
+        flag(
+            values[field].notna() & parsed.isna(), field,
+            "Date has wrong format. Use one of these formats instead: YYYY-MM-DD."
+        )
+        values[field] = parsed.dt.date.where(parsed.notna(), None)
+
+    # Phones are compared in E.164 so "0801..." and "+234801..." collide.
+    phones = values['phone']
+    e164 = phones.map(normalize_phone, na_action='ignore')
+    flag(phones.notna() & e164.isna(), 'phone', "Enter a valid phone number.")
+    values['phone_e164'] = e164
+
+    # Phone numbers must be unique within the file and against the database.
+    duplicated = e164.notna() & (
+        e164.duplicated(keep='first') | e164.isin(seen_phones)
+    )
+    existing = set()
+    if check_existing_phones:
+        # Rows saved before phone_e164 existed only match on the raw phone.
+        for phone, phone_e164 in Enrollees.objects.filter(
+            Q(phone__in=phones.dropna().unique().tolist())
+            | Q(phone_e164__in=e164.dropna().unique().tolist())
+        ).values_list('phone', 'phone_e164'):
+            existing.update((phone, phone_e164 or normalize_phone(phone)))
+        existing.discard(None)
+    flag(
+        duplicated | phones.isin(existing) | e164.isin(existing),
+        'phone', "enrollees with this phone already exists."
+    )
+
+    # Resolve every plan referenced by the chunk in one query.
+    plan_ids = {
+        value: str(uuid.UUID(value))
+        for value in values['plan_id'].dropna().unique() if is_uuid(value)
+    }
+    known_plans = {
+        str(plan_id) for plan_id in
+        Plan.objects.filter(id__in=plan_ids.values()).values_list('id', flat=True)
+    }
+    plan_id = values['plan_id'].map(plan_ids)
+    flag(
+        values['plan_id'].notna() & ~plan_id.isin(known_plans),
+        'plan', lambda value: f'Invalid pk "{value}" - object does not exist.',
+        column='plan_id'
+    )
+    values['plan_id'] = plan_id
+
+    return errors
+
+
+def build_enrollees(valid, employer):
+    """
+    Build unsaved Enrollees instances for the validated rows.
+    """
+    enrollee_ids = allocate_enrollee_ids(len(valid))
+    records = valid.replace({np.nan: None}).to_dict('records')
+    enrollees = [
+        Enrollees(
+            enrollee_id=enrollee_id,
+            first_name=record['first_name'],
+            last_name=record['last_name'],
+            dob=record['dob'],
+            gender=record['gender'],
+            phone=record['phone'],
+            email=record['email'],
+            national_id=record['national_id'],
+            address=parse_address(record['address']),
+            employer=employer,
+            plan_id=record['plan_id'],
+            status=record['status'],
+            coverage_start=record['coverage_start'],
+            coverage_end=record['coverage_end'],
+        )
+        for enrollee_id, record in zip(enrollee_ids, records)
+    ]
+    # bulk_create skips pre_save
+    for enrollee in enrollees:
+        enrollee.set_lookup_fields()
+        enrollee.set_coverage_state()
+    return enrollees
+
+
+def parse_address(value):
+    """
+    Addresses may be uploaded as JSON objects or as plain text.
+    """
+    if value is None:
+        return {}
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def row_data(chunk, index):
+    """
+    Return the original row as a JSON-safe dict for the error report.
+    """
+    return chunk.loc[index].replace({np.nan: None}).to_dict()
+
+
+def is_uuid(value):
+    try:
+        uuid.UUID(str(value))
+    except ValueError:
+        return False
+    return True
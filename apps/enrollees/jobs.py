@@ -0,0 +1,118 @@
+import datetime
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from apps.enrollees.importer import iter_import
+from apps.enrollees.models import EnrolleeImportJob, EnrolleeImportError
+from apps.enrollees.provisioning import provision_employee_accounts, send_invites
+from apps.enrollees.sync import sync_roster
+from apps.enrollees.utils import StageTimer
+
+logger = logging.getLogger(__name__)
+
+
+def claim_next_job():
+    """
+    Atomically move the oldest pending import job to PROCESSING and return it.
+    SKIP LOCKED lets several workers poll the same table without contention.
+
+    A PROCESSING job whose worker stopped sending heartbeats for
+    ENROLLEE_IMPORT_JOB_TIMEOUT seconds is claimed again; it resumes after
+    the rows it had already processed.
+    """
+    now = timezone.now()
+    stale = now - datetime.timedelta(seconds=settings.ENROLLEE_IMPORT_JOB_TIMEOUT)
+    with transaction.atomic():
+        job = (
+            EnrolleeImportJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(Q(status='PENDING') | Q(status='PROCESSING', heartbeat_at__lt=stale))
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+
+        if job.status == 'PROCESSING':
+            logger.warning("Reclaiming enrollee import job %s from a stalled worker", job.pk)
+        job.status = 'PROCESSING'
+        job.started_at = job.started_at or now
+        job.heartbeat_at = now
+        job.save(update_fields=['status', 'started_at', 'heartbeat_at'])
+        return job
+
+
+def run_import_job(job):
+    """
+    Run an import job chunk by chunk, persisting progress and rejected rows
+    after every chunk. Roster sync jobs are applied in one pass instead.
+    Provisioning jobs create the accounts, record the counts, then email
+    the invites and record how many were sent.
+    """
+    jobs = EnrolleeImportJob.objects.filter(pk=job.pk)
+    try:
+        if job.mode == 'PROVISION':
+            result = provision_employee_accounts(job.employer_id, enrollee_ids=job.enrollee_ids)
+            invites = result.pop('invites')
+            jobs.update(
+                processed_rows=(
+                    result['created'] + result['linked'] + result['reinvited'] + result['skipped']
+                ),
+                created_count=result['created'],
+                summary=result,
+                heartbeat_at=timezone.now(),
+            )
+            sent = send_invites(invites)
+            jobs.update(summary={
+                **result, 'invites_sent': sent, 'invites_failed': len(invites) - sent,
+            })
+        else:
+            with job.file.open('rb') as file:
+                if job.mode == 'SYNC':
+                    result = sync_roster(file, job.employer, dry_run=job.dry_run)
+                    save_errors(job, result['errors'])
+                    summary = result['summary']
+                    jobs.update(
+                        processed_rows=result['total_rows'],
+                        created_count=0 if job.dry_run else summary['inserts'],
+                        failed_count=len(result['errors']),
+                        summary=summary,
+                    )
+                else:
+                    timer = StageTimer()
+                    chunks = iter_import(
+                        file, job.employer, timer=timer, skip_rows=job.processed_rows
+                    )
+                    for rows, created, errors in chunks:
+                        save_errors(job, errors)
+                        jobs.update(
+                            processed_rows=F('processed_rows') + rows,
+                            created_count=F('created_count') + created,
+                            failed_count=F('failed_count') + len(errors),
+                            summary={'timings': timer.as_dict()},
+                            heartbeat_at=timezone.now(),
+                        )
+    except Exception as e:
+        logger.exception("Enrollee import job %s failed", job.pk)
+        jobs.update(status='FAILED', error_message=str(e), finished_at=timezone.now())
+    else:
+        jobs.update(status='COMPLETED', finished_at=timezone.now())
+
+    job.refresh_from_db()
+    return job
+
+
+def save_errors(job, errors):
+    EnrolleeImportError.objects.bulk_create(
+        EnrolleeImportError(
+            job=job,
+            row=error['row'],
+            data=error['data'],
+            errors=error.get('errors') or {'non_field_errors': [error['error']]},
+        )
+        for error in errors
+    )
@@ -0,0 +1,71 @@
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from apps.accounts.identity import invalidate_identities
+from apps.accounts.models import EmployeeProfile, UserProfile
+
+
+def link_enrollees_to_users(enrollees):
+    """
+    Link enrollees to the EMPLOYEE accounts registered with the same email,
+    compared case-insensitively like registration and provisioning do.
+
+    Users without an EmployeeProfile get one and unlinked profiles are
+    attached to the enrollee's employer, as the post_save signal does for a
+    single enrollee. Runs one lookup query plus at most one insert and one
+    update, however many enrollees are passed. Returns the number linked.
+    """
+    by_email = {}
+    for enrollee in enrollees:
+        if enrollee.email:
+            by_email.setdefault(enrollee.email.lower(), enrollee)
+    if not by_email:
+        return 0
+
+    profiles = (
+        UserProfile.objects
+        .annotate(email_lower=Lower('user__email'))
+        .filter(role='EMPLOYEE', email_lower__in=list(by_email))
+        .select_related('user', 'employee_profile')
+    )
+
+    now = timezone.now()
+    created, updated, linked_user_ids = [], [], []
+    for profile in profiles:
+        enrollee = by_email[profile.email_lower]
+        employee_profile = getattr(profile, 'employee_profile', None)
+        if employee_profile is None:
+            linked_user_ids.append(profile.user_id)
+            created.append(EmployeeProfile(
+                user_profile=profile,
+                employer_id=enrollee.employer_id,
+                employee_id=enrollee.enrollee_id,
+                date_of_birth=enrollee.dob,
+            ))
+        elif employee_profile.employer_id is None:
+            linked_user_ids.append(profile.user_id)
+            employee_profile.employer_id = enrollee.employer_id
+            employee_profile.employee_id = enrollee.enrollee_id
+            employee_profile.date_of_birth = enrollee.dob
+            employee_profile.updated_at = now
+            updated.append(employee_profile)
+
+    EmployeeProfile.objects.bulk_create(created)
+    EmployeeProfile.objects.bulk_update(
+        updated, ['employer', 'employee_id', 'date_of_birth', 'updated_at']
+    )
+    # Bulk writes skip the signals that keep the identity cache fresh
+    invalidate_identities(linked_user_ids)
+    return len(created) + len(updated)
+
+
+def unlinked_employee_emails():
+    """
+    Lowercased emails of EMPLOYEE accounts that are not attached to an
+    employer yet.
+    """
+    return UserProfile.objects.filter(
+        Q(employee_profile__isnull=True) | Q(employee_profile__employer__isnull=True),
+        role='EMPLOYEE',
+    ).values(email_lower=Lower('user__email'))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from apps.enrollees.models import Enrollees
+
+
+class Command(BaseCommand):
+    help = "Fill the normalized phone/email/enrollee_id lookup columns of existing enrollees."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Number of enrollees updated per query.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        enrollees = (
+            Enrollees.objects
+            .filter(
+                Q(phone_e164__isnull=True)
+                | Q(email_lower__isnull=True, email__isnull=False)
+                | Q(enrollee_id_upper__isnull=True)
+            )
+            .only('id', 'phone', 'email', 'enrollee_id')
+            .order_by('id')
+        )
+
+        updated, batch = 0, []
+        for enrollee in enrollees.iterator(chunk_size=batch_size):
+            enrollee.set_lookup_fields()
+            batch.append(enrollee)
+            if len(batch) == batch_size:
+                updated += Enrollees.objects.bulk_update(batch, Enrollees.LOOKUP_FIELDS)
+                batch = []
+        updated += Enrollees.objects.bulk_update(batch, Enrollees.LOOKUP_FIELDS)
+
+        self.stdout.write(f"Updated lookup columns of {updated} enrollee(s).")
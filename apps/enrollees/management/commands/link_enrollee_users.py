@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from apps.enrollees.linking import link_enrollees_to_users, unlinked_employee_emails
+from apps.enrollees.models import Enrollees
+
+
+class Command(BaseCommand):
+    help = "Link EMPLOYEE accounts that are missing an employer to their enrollee record."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Number of enrollees linked per batch.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        enrollees = (
+            Enrollees.objects
+            .filter(email_lower__in=unlinked_employee_emails())
+            .only('id', 'enrollee_id', 'email', 'dob', 'employer_id')
+            .order_by('created_at', 'id')
+        )
+
+        linked, batch = 0, []
+        for enrollee in enrollees.iterator(chunk_size=batch_size):
+            batch.append(enrollee)
+            if len(batch) == batch_size:
+                linked += link_enrollees_to_users(batch)
+                batch = []
+        linked += link_enrollees_to_users(batch)
+
+        self.stdout.write(f"Linked {linked} employee profile(s) to their enrollee record.")
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.enrollees.jobs import claim_next_job, run_import_job
+
+
+class Command(BaseCommand):
+    help = "Process queued enrollee bulk upload jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help="Process the jobs currently queued and exit instead of polling.",
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5,
+            help="Seconds to wait between polls when the queue is empty.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f"Processing import job {job.pk}")
+            job = run_import_job(job)
+            self.stdout.write(
+                f"Import job {job.pk} {job.status.lower()}: "
+                f"{job.created_count} created, {job.failed_count} failed"
+            )
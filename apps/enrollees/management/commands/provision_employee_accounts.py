@@ -0,0 +1,64 @@
+import csv
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.accounts.models import EmployerProfile
+from apps.enrollees.provisioning import provision_employee_accounts
+
+
+class Command(BaseCommand):
+    help = (
+        "Create EMPLOYEE accounts for an employer's enrollees, linked to their "
+        "enrollee record, and write their invites (uid and token for "
+        "auth/accept-invite/) to a CSV file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('employer_id', help="ID of the EmployerProfile.")
+        parser.add_argument(
+            '--invites',
+            default='invites.csv',
+            help="CSV file the invites are written to.",
+        )
+        parser.add_argument(
+            '--password',
+            help="Initial password of every account, instead of an unusable one.",
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help="Processes hashing --password (default: ACCOUNT_PROVISIONING_WORKERS).",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Number of rows per bulk INSERT.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            employer = EmployerProfile.objects.get(pk=options['employer_id'])
+        except (EmployerProfile.DoesNotExist, ValidationError):
+            raise CommandError(f"Employer {options['employer_id']} not found.")
+
+        result = provision_employee_accounts(
+            employer.pk,
+            password=options['password'],
+            workers=options['workers'],
+            batch_size=options['batch_size'],
+        )
+
+        with open(options['invites'], 'w', newline='') as file:
+            writer = csv.DictWriter(
+                file, fieldnames=['enrollee_id', 'email', 'uid', 'token'], extrasaction='ignore'
+            )
+            writer.writeheader()
+            writer.writerows(result['invites'])
+
+        timings = ', '.join(f"{stage} {seconds}s" for stage, seconds in result['timings'].items())
+        self.stdout.write(
+            f"{result['created']} account(s) created, {result['linked']} linked, "
+            f"{result['reinvited']} reinvited, {result['skipped']} skipped ({timings}). Invites written to {options['invites']}."
+        )
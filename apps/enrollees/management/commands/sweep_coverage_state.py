@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from apps.enrollees.coverage import sweep_coverage_state
+
+
+class Command(BaseCommand):
+    help = (
+        "Flip the materialized coverage_active flag of enrollees whose "
+        "coverage started or expired. Run daily, shortly after midnight."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Number of enrollees updated per query.",
+        )
+
+    def handle(self, *args, **options):
+        activated, deactivated = sweep_coverage_state(batch_size=options['batch_size'])
+        self.stdout.write(
+            f"Coverage sweep: {activated} activated, {deactivated} deactivated."
+        )
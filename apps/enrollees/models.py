@@ -1,6 +1,8 @@
 from django.db import models
+from django.db.models.functions import Lower
 from apps.accounts.models import EmployerProfile
 from apps.plans.models import Plan
+from apps.enrollees.utils import normalize_phone
 import uuid
 
 # Create your models here.
@@ -42,9 +44,22 @@ class Enrollees(models.Model):
     plan = models.ForeignKey(Plan, on_delete=models.PROTECT, related_name='enrollees', null=True, blank=True)
     
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='ACTIVE')
+    # Date the current status took effect, when set by a termination, a bulk
+    # status transition or a roster sync
+    status_effective_date = models.DateField(null=True, blank=True)
     coverage_start = models.DateField(null=True, blank=True)
     coverage_end = models.DateField(null=True, blank=True)
+    # Materialized is_coverage_active(), set on save and flipped by the daily
+    # `sweep_coverage_state` command as coverages start and expire
+    coverage_active = models.BooleanField(default=False, editable=False)
     
+    # Normalized lookup keys for exact-match verification, kept in sync with
+    # phone/email/enrollee_id by set_lookup_fields()
+    LOOKUP_FIELDS = ['phone_e164', 'email_lower', 'enrollee_id_upper']
+    phone_e164 = models.CharField(max_length=20, null=True, blank=True, editable=False)
+    email_lower = models.CharField(max_length=254, null=True, blank=True, editable=False)
+    enrollee_id_upper = models.CharField(max_length=50, null=True, blank=True, editable=False)
+
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -56,16 +71,151 @@ class Enrollees(models.Model):
             models.Index(fields=['enrollee_id']),
             models.Index(fields=['phone']),
             models.Index(fields=['status', 'coverage_start']),
+            # Keyset pagination of an employer's roster (EnrolleeCursorPagination)
+            models.Index(fields=['employer', '-created_at', 'id']),
+            # Incremental change feed (EnrolleeChangeFeedPagination)
+            models.Index(fields=['employer', 'updated_at', 'id'], name='enrollees_change_feed_idx'),
+            # Provider eligibility lookups (providers.views.verify_user)
+            models.Index(fields=['phone_e164'], name='enrollees_phone_e164_idx'),
+            models.Index(fields=['email_lower'], name='enrollees_email_lower_idx'),
+            models.Index(fields=['enrollee_id_upper'], name='enrollees_id_upper_idx'),
+            # Exact, case-insensitive name matches (providers.views.verify_user)
+            models.Index(Lower('first_name'), Lower('last_name'), name='enrollees_name_lower_idx'),
+            # Active-member lists/counts (coverage.covered_enrollees) and the
+            # coverage sweep only touch the rows these partial indexes cover
+            models.Index(
+                fields=['employer', 'coverage_end'],
+                condition=models.Q(status='ACTIVE', coverage_active=True),
+                name='enrollees_covered_idx',
+            ),
+            models.Index(
+                fields=['coverage_start'],
+                condition=models.Q(status='ACTIVE', coverage_active=False),
+                name='enrollees_pending_cover_idx',
+            ),
         ]
     
     def __str__(self):
         return f"{self.enrollee_id} - {self.first_name} {self.last_name}"
     
+    def set_lookup_fields(self):
+        """
+        Derive the normalized lookup columns. Called from pre_save; bulk
+        writes that bypass signals must call it themselves.
+        """
+        self.phone_e164 = normalize_phone(self.phone) if self.phone else None
+        self.email_lower = self.email.lower() if self.email else None
+        self.enrollee_id_upper = self.enrollee_id.upper() if self.enrollee_id else None
+
+    def set_coverage_state(self):
+        """
+        Materialize is_coverage_active() into coverage_active. Called from
+        pre_save; bulk writes must call it or refresh_coverage_state().
+        """
+        for field in ('coverage_start', 'coverage_end'):
+            setattr(self, field, self._meta.get_field(field).to_python(getattr(self, field)))
+        self.coverage_active = self.is_coverage_active()
+
     def is_coverage_active(self):
         """Check if enrollee's coverage is currently active"""
         from django.utils import timezone
+        if not self.coverage_start or not self.coverage_end:
+            return False
         today = timezone.now().date()
         return (
             self.status == 'ACTIVE' and
             self.coverage_start <= today <= self.coverage_end
-        )
\ No newline at end of file
+        )
+
+class EnrolleeIdSequence(models.Model):
+    """
+    Per-day counter behind the HL-YYMMDD-XXXX enrollee IDs.
+    Incremented atomically by apps.enrollees.sequences.allocate_enrollee_ids.
+    """
+    day = models.DateField(primary_key=True)
+    last_value = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'enrollee_id_sequences'
+
+    def __str__(self):
+        return f"{self.day} - {self.last_value}"
+
+
+class EnrolleeImportJob(models.Model):
+    """
+    A bulk enrollee upload, or a run of employee account provisioning,
+    waiting for or processed by the import worker
+    (`manage.py process_enrollee_imports`).
+    """
+    STATUS_CHOICES = (
+        ('PENDING', 'Pending'),
+        ('PROCESSING', 'Processing'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed'),
+    )
+    MODE_CHOICES = (
+        ('CREATE', 'Create new enrollees'),
+        ('SYNC', 'Sync full roster'),
+        ('PROVISION', 'Provision employee accounts'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    employer = models.ForeignKey(
+        EmployerProfile,
+        on_delete=models.CASCADE,
+        related_name='enrollee_import_jobs'
+    )
+    # Empty for PROVISION jobs
+    file = models.FileField(upload_to='enrollee_imports/', blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES, default='CREATE')
+    dry_run = models.BooleanField(default=False)
+    # Enrollees a PROVISION job is limited to; null for the whole roster
+    enrollee_ids = models.JSONField(null=True, blank=True)
+
+    # Progress, updated after every committed chunk
+    processed_rows = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    error_message = models.TextField(blank=True, default='')
+    # Per-stage timings, plus the change counts and previews of a roster sync
+    summary = models.JSONField(default=dict, blank=True)
+
+    # Metadata
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Refreshed by the worker after every chunk; a PROCESSING job whose
+    # heartbeat is older than ENROLLEE_IMPORT_JOB_TIMEOUT is reclaimed
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'enrollee_import_jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.id} - {self.get_status_display()}"
+
+
+class EnrolleeImportError(models.Model):
+    """
+    One rejected row of an import job, kept for the downloadable error report.
+    """
+    job = models.ForeignKey(EnrolleeImportJob, on_delete=models.CASCADE, related_name='errors')
+    row = models.PositiveIntegerField()
+    data = models.JSONField(default=dict)
+    errors = models.JSONField(default=dict)
+
+    class Meta:
+        db_table = 'enrollee_import_errors'
+        ordering = ['row']
+        indexes = [
+            models.Index(fields=['job', 'row']),
+        ]
+
+    def __str__(self):
+        return f"{self.job_id} - row {self.row}"
@@ -0,0 +1,251 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import BooleanField, Expression, F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on a (field, id) key.
+
+    Each page is fetched with a `WHERE (field, id) < cursor` style filter and
+    `LIMIT page_size + 1`, so deep pages cost the same as the first one: no
+    OFFSET scan and no COUNT(*). `ordering` must match an index to stay cheap,
+    and the filter always bounds `field` so the index scan starts at the
+    cursor.
+    """
+    ordering = ('-created_at', 'id')
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor['reverse'])
+
+        ordering = self.get_ordering(reverse)
+        if cursor:
+            try:
+                queryset = queryset.filter(
+                    self.get_position_filter(queryset.model, ordering, cursor)
+                )
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+        results = list(queryset.order_by(*ordering)[:page_size + 1])
+
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+
+        # Walking backwards we came from a later page, so there is always a
+        # next page; walking forwards there is a previous page once we moved.
+        has_next = has_more if not reverse else True
+        has_previous = has_more if reverse else cursor is not None
+
+        self.next_position = self.previous_position = None
+        if results and has_next:
+            self.next_position = self.get_position(results[-1])
+        if results and has_previous:
+            self.previous_position = self.get_position(results[0])
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_ordering(self, reverse=False):
+        if not reverse:
+            return self.ordering
+        return tuple(
+            field[1:] if field.startswith('-') else f'-{field}'
+            for field in self.ordering
+        )
+
+    def get_position_filter(self, model, ordering, cursor):
+        """
+        Rows strictly after the cursor position in `ordering`.
+
+        With both fields sorted the same way this is a row comparison, which
+        Postgres turns into an index range. Otherwise the OR of the strict
+        and tie-breaking conditions is led by an inclusive bound on `field`,
+        as the OR alone cannot start the index scan at the cursor.
+        """
+        (field, tie_field), (value, tie_value) = ordering, cursor['position']
+        name, tie_name = field.lstrip('-'), tie_field.lstrip('-')
+        descending, tie_descending = field.startswith('-'), tie_field.startswith('-')
+        # Validated here, so a malformed cursor is a 404 rather than a 500
+        value = model._meta.get_field(name).to_python(value)
+        tie_value = model._meta.get_field(tie_name).to_python(tie_value)
+        if descending == tie_descending:
+            return RowComparison([name, tie_name], '<' if descending else '>', [value, tie_value])
+
+        lookup, bound = ('lt', 'lte') if descending else ('gt', 'gte')
+        tie_lookup = 'lt' if tie_descending else 'gt'
+        return Q(**{f'{name}__{bound}': value}) & (
+            Q(**{f'{name}__{lookup}': value})
+            | Q(**{name: value, f'{tie_name}__{tie_lookup}': tie_value})
+        )
+
+    def get_position(self, instance):
+        return [
+            self.to_cursor_value(getattr(instance, field.lstrip('-')))
+            for field in self.ordering
+        ]
+
+    def to_cursor_value(self, value):
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return str(value)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            position = cursor['p']
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise ValueError
+            return {'position': position, 'reverse': bool(cursor.get('r'))}
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_position(self, position, reverse=False):
+        cursor = {'p': position}
+        if reverse:
+            cursor['r'] = 1
+        return base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+
+    def encode_cursor(self, position, reverse):
+        encoded = self.encode_position(position, reverse)
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+
+class RowComparison(Expression):
+    """
+    `(field, ...) <operator> (value, ...)` as a filter condition.
+    """
+    output_field = BooleanField()
+    conditional = True
+
+    def __init__(self, fields, operator, values):
+        super().__init__()
+        self.fields, self.operator, self.values = fields, operator, values
+
+    def resolve_expression(self, query=None, allow_joins=True, reuse=None, summarize=False, for_save=False):
+        clone = self.copy()
+        clone.columns = [
+            F(field).resolve_expression(query, allow_joins, reuse, summarize)
+            for field in self.fields
+        ]
+        return clone
+
+    def as_sql(self, compiler, connection):
+        columns, params = [], []
+        for column in self.columns:
+            sql, column_params = compiler.compile(column)
+            columns.append(sql)
+            params.extend(column_params)
+        params.extend(
+            column.output_field.get_db_prep_value(value, connection)
+            for column, value in zip(self.columns, self.values)
+        )
+        placeholders = ', '.join(['%s'] * len(self.values))
+        return f"({', '.join(columns)}) {self.operator} ({placeholders})", params
+
+
+class EnrolleeCursorPagination(KeysetPagination):
+    """
+    Newest enrollees first; served by the (employer, -created_at, id) index.
+    """
+    ordering = ('-created_at', 'id')
+
+
+class EnrolleeChangeFeedPagination(KeysetPagination):
+    """
+    Oldest change first on (updated_at, id); served by the
+    (employer, updated_at, id) index. Every page, the last one included,
+    returns a `cursor` to pass back as ?since= to fetch later changes.
+    """
+    ordering = ('updated_at', 'id')
+    cursor_query_param = 'since'
+    page_size = 500
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        cursor = self.decode_cursor(request)
+        if cursor and cursor['reverse']:
+            raise NotFound(self.invalid_cursor_message)
+        results = super().paginate_queryset(queryset, request, view)
+        # With nothing new, the client resumes from where it already was.
+        self.position = cursor['position'] if cursor else None
+        if results:
+            self.position = self.get_position(results[-1])
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('cursor', self.encode_position(self.position) if self.position else None),
+            ('has_more', self.next_position is not None),
+            ('results', data),
+        ]))
+
+
+def change_feed_horizon(now, lag, using='default'):
+    """
+    Latest updated_at the change feed may return: `lag` before `now`, and on
+    Postgres also `lag` before the start of the oldest transaction still
+    writing. Imports and syncs stamp updated_at when they write, not when
+    they commit, so a long one would otherwise commit rows older than a
+    cursor already handed out. Only sessions of the same database role are
+    visible in pg_stat_activity.
+    """
+    horizon = now - lag
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            # Activity is read once per transaction unless the snapshot is dropped
+            cursor.execute("SELECT pg_stat_clear_snapshot()")
+            cursor.execute(
+                "SELECT min(xact_start) FROM pg_stat_activity "
+                "WHERE datname = current_database() AND backend_xid IS NOT NULL "
+                "AND pid <> pg_backend_pid()"
+            )
+            oldest = cursor.fetchone()[0]
+        if oldest is not None:
+            horizon = min(horizon, oldest - lag)
+    return horizon
@@ -0,0 +1,255 @@
+import logging
+import math
+import os
+import smtplib
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX, make_password
+from django.contrib.auth.tokens import default_token_generator
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Lower
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from apps.accounts.models import EmployeeProfile, UserProfile
+from apps.enrollees.linking import link_enrollees_to_users
+from apps.enrollees.models import Enrollees
+from apps.enrollees.utils import StageTimer
+
+logger = logging.getLogger(__name__)
+
+INVITE_SUBJECT = "Your employee health portal account"
+INVITE_MESSAGE = (
+    "Hello {first_name},\n\n"
+    "Your employer has set up a health portal account for you. "
+    "Choose your password to sign in:\n\n{url}\n"
+)
+
+
+def provision_employee_accounts(employer_id, enrollee_ids=None, password=None,
+                                workers=None, batch_size=1000):
+    """
+    Create EMPLOYEE accounts for an employer's enrollees (all the non-terminated
+    ones with an email, or only `enrollee_ids`), linked to their enrollee
+    record like registration does.
+
+    Users, profiles and employee profiles are written with one bulk INSERT
+    per `batch_size` rows each, in one transaction; signals do not fire.
+    Accounts get `password` when given, else an unusable password, and an
+    invite token for accounts.views.accept_invite. A given password is
+    hashed in a pool of `workers` processes.
+
+    Enrollees with an existing EMPLOYEE account are linked to it instead;
+    those whose email belongs to another account are skipped. Accounts an
+    earlier run created that were never claimed (still no password, never
+    signed in) are invited again, so a lost or failed invite is retried by
+    running again. Returns the created/linked/reinvited/skipped counts,
+    stage timings and the invites; pass those to send_invites, never back
+    to the employer.
+    """
+    User = get_user_model()
+    timer = StageTimer()
+    with timer.stage('select'):
+        enrollees = (
+            Enrollees.objects
+            .filter(employer_id=employer_id, email_lower__isnull=False)
+            .exclude(status='TERMINATED')
+            .only('id', 'enrollee_id', 'first_name', 'last_name', 'email',
+                  'email_lower', 'phone', 'dob', 'employer_id')
+            .order_by('-created_at', 'id')
+        )
+        if enrollee_ids is not None:
+            enrollees = enrollees.filter(enrollee_id__in=enrollee_ids)
+        # One account per email; the newest enrollee with it wins
+        by_email, total = {}, 0
+        for enrollee in enrollees.iterator(chunk_size=batch_size):
+            by_email.setdefault(enrollee.email_lower, enrollee)
+            total += 1
+        enrollees = list(by_email.values())
+
+        emails, employee_ids, phones = set(), set(), set()
+        for batch in batches(enrollees, batch_size):
+            emails.update(
+                User.objects.annotate(email_lower=Lower('email'))
+                .filter(email_lower__in=[enrollee.email_lower for enrollee in batch])
+                .values_list('email_lower', flat=True)
+            )
+            employee_ids.update(
+                EmployeeProfile.objects
+                .filter(employee_id__in=[enrollee.enrollee_id for enrollee in batch])
+                .values_list('employee_id', flat=True)
+            )
+            phones.update(
+                UserProfile.objects
+                .filter(phone__in=[enrollee.phone for enrollee in batch])
+                .values_list('phone', flat=True)
+            )
+
+    existing = [enrollee for enrollee in enrollees if enrollee.email_lower in emails]
+    new = [
+        enrollee for enrollee in enrollees
+        if enrollee.email_lower not in emails and enrollee.enrollee_id not in employee_ids
+    ]
+    users = [
+        User(email=enrollee.email, first_name=enrollee.first_name, last_name=enrollee.last_name)
+        for enrollee in new
+    ]
+
+    with timer.stage('credentials'):
+        credentials = compute_credentials(
+            [(user.pk, user.email) for user in users], password, workers
+        )
+        for user, (password_hash, _) in zip(users, credentials):
+            user.password = password_hash
+
+        unclaimed = []
+        for batch in batches(existing, batch_size):
+            unclaimed.extend(
+                User.objects
+                .filter(
+                    profile__role='EMPLOYEE',
+                    profile__employee_profile__employer_id=employer_id,
+                    profile__employee_profile__employee_id__in=[
+                        enrollee.enrollee_id for enrollee in batch
+                    ],
+                    password__startswith=UNUSABLE_PASSWORD_PREFIX,
+                    last_login__isnull=True,
+                )
+                .annotate(enrollee_id=F('profile__employee_profile__employee_id'))
+            )
+
+    with timer.stage('write'), transaction.atomic():
+        User.objects.bulk_create(users, batch_size=batch_size)
+        profiles = [
+            UserProfile(user=user, role='EMPLOYEE', phone=profile_phone(enrollee, phones))
+            for user, enrollee in zip(users, new)
+        ]
+        UserProfile.objects.bulk_create(profiles, batch_size=batch_size)
+        EmployeeProfile.objects.bulk_create(
+            [
+                EmployeeProfile(
+                    user_profile=profile,
+                    employer_id=enrollee.employer_id,
+                    employee_id=enrollee.enrollee_id,
+                    date_of_birth=enrollee.dob,
+                    job_title="Employee",
+                )
+                for profile, enrollee in zip(profiles, new)
+            ],
+            batch_size=batch_size,
+        )
+        linked = 0
+        for batch in batches(existing, batch_size):
+            linked += link_enrollees_to_users(batch)
+
+    return {
+        'created': len(users),
+        'linked': linked,
+        'reinvited': len(unclaimed),
+        'skipped': total - len(users) - linked - len(unclaimed),
+        'timings': timer.as_dict(),
+        'invites': [
+            invite(user, enrollee.enrollee_id, token)
+            for user, enrollee, (_, token) in zip(users, new, credentials)
+        ] + [
+            invite(user, user.enrollee_id, default_token_generator.make_token(user))
+            for user in unclaimed
+        ],
+    }
+
+
+def invite(user, enrollee_id, token):
+    return {
+        'enrollee_id': enrollee_id,
+        'email': user.email,
+        'first_name': user.first_name,
+        'uid': invite_uid(user),
+        'token': token,
+    }
+
+
+def send_invites(invites):
+    """
+    Email each invite to its account holder, all over one connection. The
+    link is ACCOUNT_INVITE_URL with the invite's uid and token.
+
+    Messages go one at a time, so a recipient the server rejects is logged
+    and the rest are still sent; its account stays unclaimed and the next
+    provisioning run invites it again. Returns the number sent.
+    """
+    sent = 0
+    with get_connection() as connection:
+        for invite in invites:
+            message = EmailMessage(
+                INVITE_SUBJECT,
+                INVITE_MESSAGE.format(
+                    first_name=invite['first_name'] or invite['email'],
+                    url=settings.ACCOUNT_INVITE_URL.format(uid=invite['uid'], token=invite['token']),
+                ),
+                to=[invite['email']],
+                connection=connection,
+            )
+            try:
+                sent += message.send()
+            except (smtplib.SMTPException, OSError):
+                logger.exception("Could not send the account invite to %s", invite['email'])
+    return sent
+
+
+def compute_credentials(users, password=None, workers=None):
+    """
+    (password hash, invite token) of each (pk, email) in `users`, in order.
+    With a `password`, spread over a process pool: one PBKDF2 hash costs a
+    few hundred milliseconds of CPU. Unusable passwords and tokens are cheap
+    enough to compute in place.
+    """
+    workers = workers or settings.ACCOUNT_PROVISIONING_WORKERS or os.cpu_count() or 1
+    if password is None or workers == 1 or len(users) < 2:
+        return hash_credentials(users, password)
+
+    size = math.ceil(len(users) / (workers * 4))
+    chunks = list(batches(users, size))
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), initializer=django.setup) as pool:
+        return [
+            result
+            for results in pool.map(hash_credentials, chunks, repeat(password))
+            for result in results
+        ]
+
+
+def hash_credentials(users, password=None):
+    """
+    Process pool worker of compute_credentials.
+    """
+    User = get_user_model()
+    results = []
+    for pk, email in users:
+        user = User(pk=pk, email=email, password=make_password(password))
+        results.append((user.password, default_token_generator.make_token(user)))
+    return results
+
+
+def profile_phone(enrollee, taken):
+    """
+    The enrollee's phone for their UserProfile, unless another account
+    already uses it or it does not fit.
+    """
+    max_length = UserProfile._meta.get_field('phone').max_length
+    if enrollee.phone in taken or len(enrollee.phone) > max_length:
+        return None
+    return enrollee.phone
+
+
+def invite_uid(user):
+    return urlsafe_base64_encode(force_bytes(user.pk))
+
+
+def batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
@@ -0,0 +1,128 @@
+import logging
+from difflib import SequenceMatcher
+
+from django.db import DatabaseError, connections, transaction
+from django.db.models import BooleanField, Case, FloatField, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+from apps.enrollees.models import Enrollees
+
+logger = logging.getLogger(__name__)
+
+# Must match the expression of the trigram index exactly for it to be used.
+NAME_SQL = "lower(enrollees.first_name || ' ' || enrollees.last_name)"
+NAME_INDEX = 'enrollees_name_trgm_idx'
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+# pg_trgm's default similarity threshold, used by the fallback as well.
+MIN_SIMILARITY = 0.3
+# Candidate rows the fallback ranks in Python.
+FALLBACK_CANDIDATES = 2000
+
+_trigram_support = {}
+
+
+def search_enrollees(name, dob=None, limit=DEFAULT_LIMIT, queryset=None):
+    """
+    Return up to `limit` enrollees whose full name resembles `name`, best
+    match first, each annotated with a `similarity` between 0 and 1.
+
+    On Postgres with pg_trgm this is a `%` lookup served by the trigram GIN
+    index. Other backends rank a bounded set of candidates sharing a name
+    prefix in Python. `dob` narrows the search to that date of birth.
+    """
+    name = ' '.join(name.lower().split())
+    limit = max(1, min(limit, MAX_LIMIT))
+    if queryset is None:
+        queryset = Enrollees.objects.all()
+    if not name:
+        return []
+    if dob:
+        queryset = queryset.filter(dob=dob)
+
+    if has_trigram_support(queryset.db):
+        return list(
+            queryset
+            .filter(RawSQL(f'{NAME_SQL} %% %s', [name], output_field=BooleanField()))
+            .annotate(similarity=RawSQL(f'similarity({NAME_SQL}, %s)', [name], output_field=FloatField()))
+            .order_by('-similarity', 'id')[:limit]
+        )
+    return fallback_search(queryset, name, limit)
+
+
+def fallback_search(queryset, name, limit):
+    """
+    Rank in Python the enrollees sharing a name prefix with `name`. Only
+    FALLBACK_CANDIDATES rows are ranked, so they are taken best first by a
+    coarse score: whole name parts, then longer prefixes, score higher.
+    """
+    prefixes = Q()
+    score = Value(0)
+    for part in name.split():
+        prefixes |= name_part_q('istartswith', part[:2])
+        score += Case(
+            When(name_part_q('iexact', part), then=Value(3)),
+            When(name_part_q('istartswith', part), then=Value(2)),
+            When(name_part_q('istartswith', part[:4]), then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+
+    candidates = (
+        queryset.filter(prefixes)
+        .annotate(prefix_score=score)
+        .order_by('-prefix_score', 'id')[:FALLBACK_CANDIDATES]
+    )
+    ranked = []
+    for enrollee in candidates:
+        full_name = f'{enrollee.first_name} {enrollee.last_name}'.lower()
+        enrollee.similarity = SequenceMatcher(None, name, full_name).ratio()
+        if enrollee.similarity >= MIN_SIMILARITY:
+            ranked.append(enrollee)
+    ranked.sort(key=lambda enrollee: (-enrollee.similarity, str(enrollee.id)))
+    return ranked[:limit]
+
+
+def name_part_q(lookup, part):
+    return Q(**{f'first_name__{lookup}': part}) | Q(**{f'last_name__{lookup}': part})
+
+
+def has_trigram_support(using):
+    """
+    Whether the database has pg_trgm installed; checked once per alias.
+    """
+    if using not in _trigram_support:
+        connection = connections[using]
+        supported = False
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                supported = cursor.fetchone() is not None
+        _trigram_support[using] = supported
+    return _trigram_support[using]
+
+
+def create_name_search_index(using, **kwargs):
+    """
+    post_migrate handler installing pg_trgm and the trigram GIN index on
+    enrollee names. Postgres only; the index is created here because it
+    needs an operator class the model Meta cannot express without
+    django.contrib.postgres.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+    _trigram_support.pop(using, None)
+    try:
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {NAME_INDEX} ON enrollees '
+                f"USING gin ((lower(first_name || ' ' || last_name)) gin_trgm_ops)"
+            )
+    except DatabaseError:
+        logger.warning(
+            "pg_trgm is not available; enrollee name search falls back to "
+            "prefix matching", exc_info=True
+        )
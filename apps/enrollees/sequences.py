@@ -0,0 +1,64 @@
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.enrollees.models import Enrollees, EnrolleeIdSequence
+
+
+def allocate_enrollee_ids(count=1, day=None):
+    """
+    Reserve `count` consecutive enrollee IDs in format: HL-YYMMDD-XXXX.
+    Example: HL-241210-0001
+
+    The whole block is taken from the per-day counter row in one atomic
+    increment, so concurrent writers never receive the same ID.
+    """
+    day = day or timezone.now().date()
+    last_value = reserve_block(day, count)
+    date_part = day.strftime('%y%m%d')  # YYMMDD format
+    return [
+        f"HL-{date_part}-{str(number).zfill(4)}"
+        for number in range(last_value - count + 1, last_value + 1)
+    ]
+
+
+def reserve_block(day, count):
+    """
+    Advance the counter for `day` by `count` and return its new value.
+    """
+    connection = connections[EnrolleeIdSequence.objects.db]
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        return reserve_block_locked(day, count)
+
+    quote = connection.ops.quote_name
+    table = quote(EnrolleeIdSequence._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} SET last_value = last_value + %s "
+            f"WHERE day = %s RETURNING last_value",
+            [count, day]
+        )
+        row = cursor.fetchone()
+        if row is None:
+            # First ID of the day: seed the counter from IDs that were
+            # already issued today before the counter row existed.
+            cursor.execute(
+                f"INSERT INTO {table} (day, last_value) "
+                f"SELECT %s, COUNT(*) + %s FROM {quote(Enrollees._meta.db_table)} "
+                f"WHERE enrollee_id LIKE %s "
+                f"ON CONFLICT (day) DO UPDATE "
+                f"SET last_value = {table}.last_value + %s RETURNING last_value",
+                [day, count, f"HL-{day.strftime('%y%m%d')}-%", count]
+            )
+            row = cursor.fetchone()
+    return row[0]
+
+
+def reserve_block_locked(day, count):
+    """
+    Fallback for backends without UPDATE ... RETURNING: lock the counter row.
+    """
+    with transaction.atomic():
+        sequence, _ = EnrolleeIdSequence.objects.select_for_update().get_or_create(day=day)
+        EnrolleeIdSequence.objects.filter(day=day).update(last_value=F('last_value') + count)
+        return sequence.last_value + count
@@ -1,5 +1,8 @@
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
-from apps.enrollees.models import Enrollees
+from apps.accounts.authentication import role_profile_id
+from apps.enrollees.models import Enrollees, EnrolleeImportJob
 from apps.plans.serializers import PlanSerializer
 
 
@@ -16,16 +19,33 @@ class EnrolleeSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'enrollee_id', 'first_name', 'last_name', 'dob',
             'gender', 'phone', 'email', 'national_id', 'address',
-            'employer', 'plan', 'plan_details', 'status',
-            'coverage_start', 'coverage_end',
+            'employer', 'plan', 'plan_details', 'status', 'status_effective_date',
+            'coverage_start', 'coverage_end', 'coverage_active',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = [
+            'id', 'enrollee_id', 'status_effective_date', 'coverage_active',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'enrollee_id', 'created_at', 'updated_at']
     
     def get_is_active(self, obj):
         return obj.is_coverage_active()
 
 
+class EnrolleeSidecarSerializer(EnrolleeSerializer):
+    """
+    Enrollee without the nested plan, for list responses that send each
+    distinct plan once in a top-level `plans` map (?expand=plans:sidecar).
+    """
+    plan_details = None
+
+    class Meta(EnrolleeSerializer.Meta):
+        fields = [
+            field for field in EnrolleeSerializer.Meta.fields
+            if field != 'plan_details'
+        ]
+
+
 class EnrolleeCreateSerializer(serializers.ModelSerializer):
     """
     Serializer to create an Enrollee.
@@ -45,7 +65,88 @@ class EnrolleeCreateSerializer(serializers.ModelSerializer):
 
         # Get request from serializer context.
         request = self.context.get('request')
-        employer = request.user.profile.employer_profile
-        validated_data['employer']  = employer
+        validated_data['employer_id'] = role_profile_id(request.user)
         return Enrollees.objects.create(**validated_data)
 
+
+class EnrolleeStatusFilterSerializer(serializers.Serializer):
+    """
+    Selects an employer's enrollees for a bulk status transition.
+    """
+    status = serializers.ChoiceField(choices=Enrollees.STATUS_CHOICES, required=False)
+    plan = serializers.UUIDField(required=False)
+    coverage_end_before = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        # An empty filter would select the whole roster
+        if not attrs:
+            raise serializers.ValidationError("Provide at least one filter criterion.")
+        return attrs
+
+    @staticmethod
+    def to_lookups(data):
+        """
+        A validated filter as Enrollees queryset lookups.
+        """
+        names = {
+            'status': 'status',
+            'plan': 'plan_id',
+            'coverage_end_before': 'coverage_end__lt',
+        }
+        return {names[name]: value for name, value in data.items()}
+
+
+class EnrolleeStatusTransitionSerializer(serializers.Serializer):
+    """
+    A bulk status change: the enrollees, by enrollee_ids or by filter, the
+    target status and the date it takes effect (today by default).
+    """
+    enrollee_ids = serializers.ListField(
+        child=serializers.CharField(max_length=50), allow_empty=False, required=False
+    )
+    filter = EnrolleeStatusFilterSerializer(required=False)
+    status = serializers.ChoiceField(choices=Enrollees.STATUS_CHOICES)
+    effective_date = serializers.DateField(required=False)
+
+    def validate_enrollee_ids(self, value):
+        max_ids = settings.ENROLLEE_STATUS_TRANSITION_MAX_IDS
+        if len(value) > max_ids:
+            raise serializers.ValidationError(f"At most {max_ids} enrollees can be updated at once.")
+        return value
+
+    def validate_effective_date(self, value):
+        if value > timezone.now().date():
+            raise serializers.ValidationError("Effective date cannot be in the future.")
+        return value
+
+    def validate(self, attrs):
+        if ('enrollee_ids' in attrs) == ('filter' in attrs):
+            raise serializers.ValidationError("Provide either enrollee_ids or filter.")
+        return attrs
+
+
+class EnrolleeAccountProvisioningSerializer(serializers.Serializer):
+    """
+    Enrollees to create portal accounts for; the whole roster by default.
+    """
+    enrollee_ids = serializers.ListField(
+        child=serializers.CharField(max_length=50), allow_empty=False, required=False
+    )
+
+
+class EnrolleeImportJobSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the progress of a bulk upload job.
+    """
+    job_id = serializers.UUIDField(source='id', read_only=True)
+    created = serializers.IntegerField(source='created_count', read_only=True)
+    failed = serializers.IntegerField(source='failed_count', read_only=True)
+
+    class Meta:
+        model = EnrolleeImportJob
+        fields = [
+            'job_id', 'status', 'mode', 'dry_run', 'processed_rows', 'created',
+            'failed', 'summary', 'error_message', 'created_at', 'started_at',
+            'finished_at'
+        ]
+        read_only_fields = fields
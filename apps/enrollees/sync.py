@@ -0,0 +1,566 @@
+import csv
+import io
+import json
+
+import numpy as np
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.enrollees.coverage import refresh_coverage_state
+from apps.enrollees.importer import REQUIRED_COLUMNS, parse_address, split_chunk
+from apps.enrollees.models import Enrollees
+from apps.enrollees.sequences import allocate_enrollee_ids
+from apps.enrollees.signals import enrollees_bulk_changed
+from apps.enrollees.linking import link_enrollees_to_users
+from apps.enrollees.utils import StageTimer, iter_chunks, normalize_phone
+
+
+# Enrollee fields a roster row can set, with their staging column types.
+SYNC_FIELDS = [
+    ('first_name', 'text'),
+    ('last_name', 'text'),
+    ('dob', 'date'),
+    ('gender', 'text'),
+    ('phone', 'text'),
+    ('email', 'text'),
+    ('national_id', 'text'),
+    ('address', 'jsonb'),
+    ('plan_id', 'uuid'),
+    ('status', 'text'),
+    ('coverage_start', 'date'),
+    ('coverage_end', 'date'),
+]
+# Existing enrollees are matched on these keys, in order of preference.
+# Phones are compared in E.164 and emails case-insensitively.
+MATCH_KEYS = ['national_id', 'phone', 'email']
+
+PHONE_TAKEN = "enrollees with this phone already exists."
+
+
+def sync_roster(file, employer, dry_run=False, chunk_size=None):
+    """
+    Reconcile `employer`'s enrollees with a full roster upload.
+
+    Rows are matched to existing enrollees by national_id, phone or email.
+    Unmatched rows are inserted, matched rows that differ are updated and
+    enrollees missing from the roster are terminated. An enrollee matched by
+    a rejected row is left untouched rather than terminated. With `dry_run`
+    the changes are only summarized. Returns the row count, the summary and
+    the per-row error report.
+    """
+    connection = connections[Enrollees.objects.db]
+    engine = PostgresRosterSync if connection.vendor == 'postgresql' else RosterSync
+    return engine(employer, connection).run(
+        file, dry_run, chunk_size or settings.ENROLLEE_IMPORT_CHUNK_SIZE
+    )
+
+
+class RosterSync:
+    """
+    Portable roster sync: rows are matched in memory against a single query
+    of the employer's enrollees and written with bulk_create/bulk_update.
+    """
+    def __init__(self, employer, connection):
+        self.employer = employer
+        self.connection = connection
+        self.preview_limit = settings.ENROLLEE_SYNC_PREVIEW_LIMIT
+        self.fields = None
+        self.total_rows = 0
+        self.timer = StageTimer()
+
+    def run(self, file, dry_run, chunk_size):
+        errors = []
+        seen_phones = set()
+
+        self.begin()
+        try:
+            for chunk in self.timer.iterate('parse', iter_chunks(file, chunk_size)):
+                missing = [column for column in REQUIRED_COLUMNS if column not in chunk.columns]
+                if missing:
+                    raise ValueError("File must contain all required columns")
+                if self.fields is None:
+                    # Optional columns left out of the file are not synced.
+                    self.fields = [
+                        field for field, _ in SYNC_FIELDS if field in chunk.columns
+                    ]
+
+                with self.timer.stage('validate'):
+                    valid, chunk_errors = split_chunk(
+                        chunk, seen_phones, check_existing_phones=False
+                    )
+                seen_phones.update(valid['phone_e164'])
+                errors.extend(chunk_errors)
+                self.total_rows += len(chunk)
+                with self.timer.stage('match'):
+                    self.load(self.to_records(valid) + self.rejected_records(chunk_errors))
+
+            if self.fields is None:
+                raise ValueError("File must contain all required columns")
+
+            with self.timer.stage('match'):
+                errors.extend(self.match())
+                summary = self.summarize()
+            if not dry_run:
+                with self.timer.stage('write'):
+                    # Reserved before the write transaction, so the counter row
+                    # is not locked against every other insert until it commits
+                    enrollee_ids = (
+                        allocate_enrollee_ids(self.insert_count) if self.insert_count else []
+                    )
+                    with transaction.atomic(using=self.connection.alias):
+                        changed = self.apply(enrollee_ids)
+                        transaction.on_commit(
+                            lambda: enrollees_bulk_changed.send(sender=Enrollees, enrollee_ids=changed),
+                            using=self.connection.alias
+                        )
+        finally:
+            self.end()
+
+        summary['dry_run'] = dry_run
+        summary['timings'] = self.timer.as_dict()
+        errors.sort(key=lambda error: error['row'])
+        return {'total_rows': self.total_rows, 'summary': summary, 'errors': errors}
+
+    def to_records(self, valid):
+        records = valid.replace({np.nan: None}).to_dict('records')
+        for index, record in zip(valid.index, records):
+            record['row'] = index + 2  # +2 for header row and 0-indexing
+            record['valid'] = True
+            record['address'] = parse_address(record['address'])
+        return records
+
+    def rejected_records(self, errors):
+        """
+        Keep only the match keys of rejected rows: they still protect the
+        enrollees they identify from being terminated.
+        """
+        records = []
+        for error in errors:
+            record = dict.fromkeys((field for field, _ in SYNC_FIELDS), None)
+            for key in MATCH_KEYS:
+                record[key] = str(error['data'].get(key) or '').strip() or None
+            record['phone_e164'] = normalize_phone(record['phone']) if record['phone'] else None
+            record.update(row=error['row'], valid=False)
+            records.append(record)
+        return records
+
+    def begin(self):
+        self.rows = []
+
+    def load(self, records):
+        self.rows.extend(records)
+
+    def end(self):
+        pass
+
+    def match(self):
+        """
+        Attach each row to an existing enrollee and reject the valid rows
+        that cannot be applied. Returns the error report for those rows.
+        """
+        columns = dict.fromkeys(
+            ['id', 'enrollee_id', 'first_name', 'last_name', 'status', 'status_effective_date', 'phone_e164']
+            + MATCH_KEYS + self.fields
+        )
+        existing = list(Enrollees.objects.filter(employer=self.employer).values(*columns))
+        lookup = {key: {} for key in MATCH_KEYS}
+        for enrollee in existing:
+            for key in MATCH_KEYS:
+                value = self.match_value(key, enrollee)
+                if value:
+                    lookup[key].setdefault(value, enrollee)
+
+        errors, claimed = [], {}
+        for row in self.rows:
+            row['match'] = next(
+                (
+                    lookup[key][value] for key in MATCH_KEYS
+                    if (value := self.match_value(key, row)) in lookup[key]
+                ),
+                None
+            )
+            if row['valid'] and row['match'] is not None:
+                first = claimed.setdefault(row['match']['id'], row)
+                if first is not row:
+                    errors.append(self.reject(
+                        row, 'non_field_errors',
+                        f"Matches the same enrollee as row {first['row']}."
+                    ))
+
+        # Phone numbers are unique across all employers. Rows saved before
+        # phone_e164 existed only match on the raw phone.
+        valid = [row for row in self.rows if row['valid']]
+        owners = {}
+        for enrollee in Enrollees.objects.filter(
+            Q(phone__in=[row['phone'] for row in valid])
+            | Q(phone_e164__in=[row['phone_e164'] for row in valid if row['phone_e164']])
+        ).values('id', 'phone', 'phone_e164'):
+            owners.setdefault(self.match_value('phone', enrollee), set()).add(enrollee['id'])
+        for row in valid:
+            others = owners.get(self.match_value('phone', row), set()) - {(row['match'] or {}).get('id')}
+            if others:
+                errors.append(self.reject(row, 'phone', PHONE_TAKEN))
+
+        matched = {row['match']['id'] for row in self.rows if row['match'] is not None}
+        self.terminations = [
+            enrollee for enrollee in existing
+            if enrollee['status'] != 'TERMINATED' and enrollee['id'] not in matched
+        ]
+        return errors
+
+    def match_value(self, key, record):
+        value = record[key]
+        if value and key == 'email':
+            return value.lower()
+        if value and key == 'phone':
+            return record.get('phone_e164') or normalize_phone(value) or value
+        return value
+
+    def changes(self, row):
+        return [
+            field for field in self.fields
+            if self.comparable(row['match'][field]) != self.comparable(row[field])
+        ]
+
+    def comparable(self, value):
+        if value is None or isinstance(value, (dict, list)):
+            return value
+        return str(value)
+
+    def summarize(self):
+        valid = [row for row in self.rows if row['valid']]
+        self.inserts = [row for row in valid if row['match'] is None]
+        self.insert_count = len(self.inserts)
+        self.updates = []
+        for row in valid:
+            if row['match'] is not None:
+                row['changes'] = self.changes(row)
+                if row['changes']:
+                    self.updates.append(row)
+
+        return self.build_summary(
+            inserts=[self.insert_preview(row) for row in self.inserts[:self.preview_limit]],
+            updates=[
+                {'row': row['row'], 'enrollee_id': row['match']['enrollee_id'], 'changes': row['changes']}
+                for row in self.updates[:self.preview_limit]
+            ],
+            terminations=[
+                self.termination_preview(enrollee)
+                for enrollee in self.terminations[:self.preview_limit]
+            ],
+            counts=(
+                len(self.inserts), len(self.updates), len(self.terminations),
+                len(valid) - len(self.inserts) - len(self.updates)
+            ),
+        )
+
+    def build_summary(self, inserts, updates, terminations, counts):
+        insert_count, update_count, termination_count, unchanged_count = counts
+        return {
+            'inserts': insert_count,
+            'updates': update_count,
+            'terminations': termination_count,
+            'unchanged': unchanged_count,
+            'preview': {
+                'inserts': inserts,
+                'updates': updates,
+                'terminations': terminations,
+            },
+        }
+
+    def insert_preview(self, row):
+        return {
+            'row': row['row'],
+            'first_name': row['first_name'],
+            'last_name': row['last_name'],
+            'phone': row['phone'],
+        }
+
+    def termination_preview(self, enrollee):
+        return {
+            'enrollee_id': enrollee['enrollee_id'],
+            'first_name': enrollee['first_name'],
+            'last_name': enrollee['last_name'],
+        }
+
+    def apply(self, enrollee_ids):
+        """
+        Write the inserts, taking `enrollee_ids` in order, the updates and the
+        terminations. Returns the primary keys of every enrollee written.
+        """
+        now = timezone.now()
+        today = now.date()
+        inserts = [
+            Enrollees(
+                enrollee_id=enrollee_id,
+                employer=self.employer,
+                **{field: row[field] for field, _ in SYNC_FIELDS},
+            )
+            for enrollee_id, row in zip(enrollee_ids, self.inserts)
+        ]
+        updates = [
+            Enrollees(
+                id=row['match']['id'],
+                updated_at=now,
+                status_effective_date=(
+                    today if 'status' in row['changes'] else row['match']['status_effective_date']
+                ),
+                **{field: row[field] for field in self.fields},
+            )
+            for row in self.updates
+        ]
+        update_fields = self.fields + ['phone_e164', 'email_lower', 'updated_at']
+        if 'status' in self.fields:
+            update_fields.append('status_effective_date')
+        # Bulk writes skip pre_save, so derive the lookup columns here.
+        for enrollee in inserts + updates:
+            enrollee.set_lookup_fields()
+        for enrollee in inserts:
+            enrollee.set_coverage_state()
+
+        created = Enrollees.objects.bulk_create(inserts)
+        Enrollees.objects.bulk_update(updates, update_fields, batch_size=1000)
+        # Updates may only carry some of the coverage fields.
+        refresh_coverage_state(Enrollees.objects.filter(id__in=[enrollee.pk for enrollee in updates]))
+        terminated = [enrollee['id'] for enrollee in self.terminations]
+        Enrollees.objects.filter(id__in=terminated).update(
+            status='TERMINATED', status_effective_date=today, coverage_active=False, updated_at=now
+        )
+        # Inserts bypass post_save, so link matching users here.
+        link_enrollees_to_users(created)
+        return [enrollee.pk for enrollee in created + updates] + terminated
+
+    def reject(self, row, field, message):
+        row['valid'] = False
+        return self.error(row, field, message)
+
+    def error(self, row, field, message):
+        data = {
+            name: row.get(name) for name, _ in SYNC_FIELDS
+        }
+        return {
+            'row': row['row'],
+            'data': json.loads(json.dumps(data, default=str)),
+            'errors': {field: [message]},
+        }
+
+
+class PostgresRosterSync(RosterSync):
+    """
+    Roster sync for Postgres: the roster is COPY'd into a temporary staging
+    table, then matched and applied with a handful of set-based statements.
+    """
+    staging_table = 'enrollee_sync_staging'
+
+    def begin(self):
+        self.cursor = self.connection.cursor()
+        columns = ', '.join(f'{field} {column_type}' for field, column_type in SYNC_FIELDS)
+        self.cursor.execute(f'DROP TABLE IF EXISTS {self.staging_table}')
+        self.cursor.execute(
+            f'CREATE TEMPORARY TABLE {self.staging_table} ('
+            f'row_number integer PRIMARY KEY, valid boolean NOT NULL, {columns}, '
+            f'phone_e164 text, enrollee_pk uuid, new_enrollee_id text)'
+        )
+
+    def load(self, records):
+        if not records:
+            return
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for record in records:
+            writer.writerow(
+                [record['row'], record['valid']]
+                + [
+                    json.dumps(record[field]) if field == 'address' and record['valid']
+                    else record[field]
+                    for field, _ in SYNC_FIELDS
+                ]
+                + [record.get('phone_e164')]
+            )
+        buffer.seek(0)
+        fields = ', '.join(field for field, _ in SYNC_FIELDS)
+        self.cursor.copy_expert(
+            f'COPY {self.staging_table} (row_number, valid, {fields}, phone_e164) '
+            f'FROM STDIN WITH (FORMAT csv)',
+            buffer
+        )
+
+    def end(self):
+        self.cursor.execute(f'DROP TABLE IF EXISTS {self.staging_table}')
+        self.cursor.close()
+
+    def match(self):
+        staging = self.staging_table
+        columns = {'phone': '{}.phone_e164', 'email': 'lower({}.email)'}
+        for key in MATCH_KEYS:
+            column = columns.get(key, f'{{}}.{key}')
+            self.cursor.execute(
+                f'UPDATE {staging} s SET enrollee_pk = e.id FROM enrollees e '
+                f'WHERE s.enrollee_pk IS NULL AND s.{key} IS NOT NULL '
+                f'AND e.employer_id = %s AND {column.format("e")} = {column.format("s")}',
+                [self.employer.pk]
+            )
+
+        errors = []
+        returning = ', '.join(['s.row_number'] + [f's.{field}' for field, _ in SYNC_FIELDS])
+        self.cursor.execute(
+            f'UPDATE {staging} s SET valid = false FROM {staging} f '
+            f'WHERE s.valid AND f.valid AND s.enrollee_pk = f.enrollee_pk '
+            f'AND s.row_number > f.row_number '
+            f'RETURNING {returning}, f.row_number'
+        )
+        for *row, first_row in self.cursor.fetchall():
+            errors.append(self.error(
+                self.staging_row(row), 'non_field_errors',
+                f"Matches the same enrollee as row {first_row}."
+            ))
+
+        self.cursor.execute(
+            f'UPDATE {staging} s SET valid = false FROM enrollees e '
+            f'WHERE s.valid AND (e.phone_e164 = s.phone_e164 OR e.phone = s.phone) '
+            f'AND e.id IS DISTINCT FROM s.enrollee_pk '
+            f'RETURNING {returning}'
+        )
+        for row in self.cursor.fetchall():
+            errors.append(self.error(self.staging_row(row), 'phone', PHONE_TAKEN))
+        return errors
+
+    def staging_row(self, values):
+        return dict(zip(['row'] + [field for field, _ in SYNC_FIELDS], values))
+
+    def changed_fields_sql(self):
+        """
+        SQL array naming the synced fields that differ between the staged
+        row `s` and the enrollee `e`.
+        """
+        return 'array_remove(ARRAY[{}]::text[], NULL)'.format(', '.join(
+            f"CASE WHEN e.{field} IS DISTINCT FROM s.{field} THEN '{field}' END"
+            for field in self.fields
+        ))
+
+    def termination_filter_sql(self):
+        return (
+            f'e.employer_id = %s AND e.status <> %s AND NOT EXISTS ('
+            f'SELECT 1 FROM {self.staging_table} s WHERE s.enrollee_pk = e.id)'
+        )
+
+    def summarize(self):
+        staging = self.staging_table
+        changed = self.changed_fields_sql()
+        self.cursor.execute(
+            f'SELECT count(*) FILTER (WHERE s.enrollee_pk IS NULL), '
+            f'count(*) FILTER (WHERE s.enrollee_pk IS NOT NULL AND cardinality({changed}) > 0), '
+            f'count(*) '
+            f'FROM {staging} s LEFT JOIN enrollees e ON e.id = s.enrollee_pk '
+            f'WHERE s.valid'
+        )
+        insert_count, update_count, valid_count = self.cursor.fetchone()
+        self.insert_count = insert_count
+
+        self.cursor.execute(
+            f'SELECT count(*) FROM enrollees e WHERE {self.termination_filter_sql()}',
+            [self.employer.pk, 'TERMINATED']
+        )
+        termination_count = self.cursor.fetchone()[0]
+
+        self.cursor.execute(
+            f'SELECT row_number, first_name, last_name, phone FROM {staging} '
+            f'WHERE valid AND enrollee_pk IS NULL ORDER BY row_number LIMIT %s',
+            [self.preview_limit]
+        )
+        inserts = [
+            self.insert_preview(dict(zip(['row', 'first_name', 'last_name', 'phone'], row)))
+            for row in self.cursor.fetchall()
+        ]
+
+        self.cursor.execute(
+            f'SELECT row_number, enrollee_id, changes FROM ('
+            f'SELECT s.row_number, e.enrollee_id, {changed} AS changes '
+            f'FROM {staging} s JOIN enrollees e ON e.id = s.enrollee_pk WHERE s.valid'
+            f') changed WHERE cardinality(changes) > 0 ORDER BY row_number LIMIT %s',
+            [self.preview_limit]
+        )
+        updates = [
+            {'row': row, 'enrollee_id': enrollee_id, 'changes': changes}
+            for row, enrollee_id, changes in self.cursor.fetchall()
+        ]
+
+        self.cursor.execute(
+            f'SELECT e.enrollee_id, e.first_name, e.last_name FROM enrollees e '
+            f'WHERE {self.termination_filter_sql()} ORDER BY e.created_at, e.id LIMIT %s',
+            [self.employer.pk, 'TERMINATED', self.preview_limit]
+        )
+        terminations = [
+            self.termination_preview(dict(zip(['enrollee_id', 'first_name', 'last_name'], row)))
+            for row in self.cursor.fetchall()
+        ]
+
+        return self.build_summary(
+            inserts, updates, terminations,
+            (
+                insert_count, update_count, termination_count,
+                valid_count - insert_count - update_count
+            ),
+        )
+
+    def apply(self, enrollee_ids):
+        staging = self.staging_table
+        # New enrollees take every column; defaults were filled in on load.
+        fields = ', '.join(field for field, _ in SYNC_FIELDS)
+        today = timezone.now().date()
+
+        # Terminate first: inserted enrollees are not in the staging table.
+        self.cursor.execute(
+            f'UPDATE enrollees e SET status = %s, status_effective_date = %s, '
+            f'coverage_active = false, updated_at = now() '
+            f'WHERE {self.termination_filter_sql()} RETURNING e.id',
+            ['TERMINATED', today, self.employer.pk, 'TERMINATED']
+        )
+        changed = [pk for pk, in self.cursor.fetchall()]
+
+        created = []
+        if self.insert_count:
+            self.cursor.execute(
+                f'UPDATE {staging} s SET new_enrollee_id = ids.enrollee_id '
+                f'FROM unnest(%s::text[]) WITH ORDINALITY AS ids(enrollee_id, position) '
+                f'JOIN (SELECT row_number, row_number() OVER (ORDER BY row_number) AS position '
+                f'FROM {staging} WHERE valid AND enrollee_pk IS NULL) pending '
+                f'ON pending.position = ids.position '
+                f'WHERE s.row_number = pending.row_number',
+                [enrollee_ids]
+            )
+            self.cursor.execute(
+                f'INSERT INTO enrollees (id, enrollee_id, employer_id, {fields}, '
+                f'phone_e164, email_lower, enrollee_id_upper, coverage_active, created_at, updated_at) '
+                f'SELECT gen_random_uuid(), new_enrollee_id, %s, {fields}, '
+                f'phone_e164, lower(email), upper(new_enrollee_id), false, now(), now() '
+                f'FROM {staging} WHERE valid AND enrollee_pk IS NULL ORDER BY row_number '
+                f'RETURNING id',
+                [self.employer.pk]
+            )
+            created = [pk for pk, in self.cursor.fetchall()]
+
+        assignments = ', '.join(f'{field} = s.{field}' for field in self.fields)
+        params = []
+        if 'status' in self.fields:
+            # e.status is still the old value on the right-hand side
+            assignments += (
+                ', status_effective_date = CASE WHEN e.status IS DISTINCT FROM s.status '
+                'THEN %s ELSE e.status_effective_date END'
+            )
+            params.append(today)
+        self.cursor.execute(
+            f'UPDATE enrollees e SET {assignments}, phone_e164 = s.phone_e164, '
+            f'email_lower = lower(s.email), updated_at = now() '
+            f'FROM {staging} s WHERE s.valid AND e.id = s.enrollee_pk '
+            f'AND cardinality({self.changed_fields_sql()}) > 0 RETURNING e.id',
+            params
+        )
+        updated = [pk for pk, in self.cursor.fetchall()]
+        changed.extend(updated)
+        # New and updated rows take their coverage state from their dates
+        refresh_coverage_state(Enrollees.objects.filter(id__in=updated + created))
+        link_enrollees_to_users(Enrollees.objects.filter(id__in=created).exclude(email=None))
+        return changed + created
@@ -0,0 +1,44 @@
+import datetime
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from apps.enrollees.models import Enrollees
+
+
+class BackfillEnrolleeLookupsTest(TestCase):
+    def test_fills_missing_lookup_columns(self):
+        enrollee = Enrollees.objects.create(
+            enrollee_id='hl-240101-0001', first_name='Ada', last_name='Obi',
+            gender='F', phone='08011111111', email='Ada@Test.com'
+        )
+        # Rows written before the lookup columns existed
+        Enrollees.objects.update(phone_e164=None, email_lower=None, enrollee_id_upper=None)
+        out = StringIO()
+
+        call_command('backfill_enrollee_lookups', stdout=out)
+
+        enrollee.refresh_from_db()
+        self.assertEqual(
+            (enrollee.phone_e164, enrollee.email_lower, enrollee.enrollee_id_upper),
+            ('+2348011111111', 'ada@test.com', 'HL-240101-0001')
+        )
+        self.assertIn('1 enrollee', out.getvalue())
+
+
+class SweepCoverageStateTest(TestCase):
+    def test_deactivates_expired_coverage(self):
+        yesterday = timezone.now().date() - datetime.timedelta(days=1)
+        enrollee = Enrollees.objects.create(
+            first_name='Ada', last_name='Obi', gender='F', phone='08011111111',
+            coverage_start=yesterday, coverage_end=timezone.now().date()
+        )
+        # Saved yesterday, when the coverage was still running
+        Enrollees.objects.update(coverage_end=yesterday)
+        out = StringIO()
+
+        call_command('sweep_coverage_state', stdout=out)
+
+        enrollee.refresh_from_db()
+        self.assertFalse(enrollee.coverage_active)
+        self.assertIn('0 activated, 1 deactivated', out.getvalue())
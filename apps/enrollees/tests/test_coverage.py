@@ -0,0 +1,77 @@
+import datetime
+from unittest import skipUnless
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from apps.enrollees.coverage import covered_enrollees, refresh_coverage_state, sweep_coverage_state
+from apps.enrollees.models import Enrollees
+
+
+class CoverageStateTest(TestCase):
+    def setUp(self):
+        self.today = timezone.now().date()
+        self.day = datetime.timedelta(days=1)
+
+    def create(self, phone, start, end, status='ACTIVE'):
+        return Enrollees.objects.create(
+            first_name='Ada', last_name='Obi', gender='F', phone=phone,
+            status=status, coverage_start=start, coverage_end=end
+        )
+
+    def test_save_materializes_coverage_state(self):
+        covered = self.create('08011111111', self.today - self.day, self.today + self.day)
+        suspended = self.create('08022222222', self.today - self.day, self.today, status='SUSPENDED')
+        undated = self.create('08033333333', None, None)
+        parsed = self.create('08044444444', '2000-01-01', (self.today + self.day).isoformat())
+
+        self.assertEqual(
+            [e.coverage_active for e in (covered, suspended, undated, parsed)],
+            [True, False, False, True]
+        )
+        self.assertEqual(set(covered_enrollees()), {covered, parsed})
+
+    def test_sweep_flips_started_and_expired_coverage(self):
+        starting = self.create('08011111111', self.today + self.day, self.today + 10 * self.day)
+        expiring = self.create('08022222222', self.today - 10 * self.day, self.today)
+        lasting = self.create('08033333333', self.today - self.day, self.today + 10 * self.day)
+        self.assertEqual((starting.coverage_active, expiring.coverage_active), (False, True))
+
+        self.assertEqual(sweep_coverage_state(self.today), (0, 0))
+        self.assertEqual(sweep_coverage_state(self.today + self.day, batch_size=1), (1, 1))
+
+        self.assertEqual(
+            set(covered_enrollees().values_list('id', flat=True)), {starting.pk, lasting.pk}
+        )
+
+    @skipUnless(connection.vendor == 'postgresql', 'Checks the Postgres plans')
+    def test_sweep_reads_only_the_partial_indexes(self):
+        self.create('08011111111', self.today + self.day, self.today + 10 * self.day)
+        self.create('08022222222', self.today - 10 * self.day, self.today)
+        with CaptureQueriesContext(connection) as queries:
+            sweep_coverage_state(self.today + self.day)
+        selects = [query['sql'] for query in queries if query['sql'].startswith('SELECT')]
+
+        plans = []
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            try:
+                for sql in selects:
+                    cursor.execute(f'EXPLAIN {sql}')
+                    plans.append(' '.join(line for line, in cursor.fetchall()))
+            finally:
+                cursor.execute('RESET enable_seqscan')
+        self.assertTrue(plans)
+        for plan in plans:
+            self.assertNotIn('Seq Scan', plan)
+        self.assertTrue(any('enrollees_pending_cover_idx' in plan for plan in plans))
+        self.assertTrue(any('enrollees_covered_idx' in plan for plan in plans))
+
+    def test_refresh_recomputes_after_bulk_update(self):
+        enrollee = self.create('08011111111', self.today - self.day, self.today + self.day)
+        Enrollees.objects.update(status='SUSPENDED')
+
+        self.assertEqual(refresh_coverage_state(Enrollees.objects.all()), 1)
+
+        enrollee.refresh_from_db()
+        self.assertFalse(enrollee.coverage_active)
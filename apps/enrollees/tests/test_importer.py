@@ -0,0 +1,134 @@
+import datetime
+from io import BytesIO
+import openpyxl
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from apps.accounts.models import User, UserProfile, EmployeeProfile
+from apps.enrollees.importer import import_enrollees
+from apps.enrollees.models import Enrollees
+from apps.plans.models import Plan
+
+HEADER = 'first_name,last_name,dob,gender,phone,plan_id,email,national_id,address\n'
+
+
+class ImportEnrolleesTest(TestCase):
+    def setUp(self):
+        self.plan = Plan.objects.create(
+            plan_code='PLAN001',
+            name='Gold Plan',
+            description='Premium coverage',
+            annual_cap=1000000.00,
+            visit_cap=10,
+            covered_services=['consultation'],
+            co_pay_rules={'consultation': 1000}
+        )
+        user = User.objects.create_user(email='employer@test.com', password='pw', username='emp')
+        profile = UserProfile.objects.create(user=user, role='EMPLOYER')
+        self.employer = profile.employer_profile
+
+    def _file(self, *rows, name='roster.csv'):
+        content = HEADER + ''.join(row + '\n' for row in rows)
+        return SimpleUploadedFile(name, content.encode())
+
+    def test_imports_valid_rows_across_chunks(self):
+        rows = [
+            f'First{i},Last{i},1990-01-0{i},M,0801234567{i},{self.plan.id},u{i}@test.com,NIN{i},Lagos'
+            for i in range(1, 6)
+        ]
+        result = import_enrollees(self._file(*rows), self.employer, chunk_size=2)
+
+        self.assertEqual(result['total_rows'], 5)
+        self.assertEqual(result['created'], 5)
+        self.assertEqual(result['errors'], [])
+        enrollee = Enrollees.objects.get(phone='08012345671')
+        self.assertEqual(enrollee.employer, self.employer)
+        self.assertEqual(enrollee.plan, self.plan)
+        self.assertEqual(enrollee.status, 'ACTIVE')
+        self.assertTrue(enrollee.enrollee_id.startswith('HL-'))
+        self.assertEqual(enrollee.phone_e164, '+2348012345671')
+        self.assertEqual(enrollee.enrollee_id_upper, enrollee.enrollee_id)
+        self.assertEqual(
+            Enrollees.objects.values('enrollee_id').distinct().count(), 5
+        )
+        self.assertEqual(set(result['timings']), {'parse', 'validate', 'write'})
+
+    def test_imports_xlsx(self):
+        workbook = openpyxl.Workbook()
+        workbook.active.append(HEADER.strip().split(','))
+        workbook.active.append([
+            'Ada', 'Obi', datetime.datetime(1990, 1, 1), 'F', '08011111111',
+            str(self.plan.id), 'ada@test.com', None, None
+        ])
+        buffer = BytesIO()
+        workbook.save(buffer)
+
+        result = import_enrollees(
+            SimpleUploadedFile('roster.xlsx', buffer.getvalue()), self.employer
+        )
+
+        self.assertEqual(result['created'], 1, result['errors'])
+        enrollee = Enrollees.objects.get(phone='08011111111')
+        self.assertEqual(enrollee.dob, datetime.date(1990, 1, 1))
+
+    def test_reports_invalid_rows_with_row_numbers(self):
+        Enrollees.objects.create(
+            first_name='Existing', last_name='Member', gender='F', phone='08000000001'
+        )
+        result = import_enrollees(self._file(
+            f'Ada,Obi,1990-01-01,F,08011111111,{self.plan.id},ada@test.com,,',
+            f',Obi,not-a-date,X,08011111111,{self.plan.id},bad-email,,',
+            'Ngozi,Eze,1991-02-02,F,08000000001,00000000-0000-0000-0000-000000000000,,,',
+        ), self.employer)
+
+        self.assertEqual(result['created'], 1)
+        self.assertEqual(result['failed'], 2)
+        second, third = result['errors']
+        self.assertEqual(second['row'], 3)
+        self.assertEqual(second['data']['phone'], '08011111111')
+        self.assertEqual(
+            set(second['errors']),
+            {'first_name', 'dob', 'gender', 'email', 'phone'}
+        )
+        self.assertEqual(third['row'], 4)
+        self.assertEqual(set(third['errors']), {'phone', 'plan'})
+
+    def test_phones_are_compared_in_e164(self):
+        Enrollees.objects.create(
+            first_name='Existing', last_name='Member', gender='F', phone='+2348000000001'
+        )
+        result = import_enrollees(self._file(
+            f'Ada,Obi,1990-01-01,F,08011111111,{self.plan.id},,,',
+            f'Ada,Obi,1990-01-01,F,+234 801 111 1111,{self.plan.id},,,',
+            f'Ngozi,Eze,1991-02-02,F,08000000001,{self.plan.id},,,',
+            f'Tunde,Bello,1992-03-03,M,not-a-phone,{self.plan.id},,,',
+        ), self.employer, chunk_size=1)
+
+        self.assertEqual(result['created'], 1)
+        self.assertEqual(
+            [(error['row'], error['errors']['phone']) for error in result['errors']],
+            [
+                (3, ["enrollees with this phone already exists."]),
+                (4, ["enrollees with this phone already exists."]),
+                (5, ["Enter a valid phone number."]),
+            ]
+        )
+
+    def test_missing_columns(self):
+        file = SimpleUploadedFile('roster.csv', b'first_name,last_name\nAda,Obi\n')
+        with self.assertRaises(ValueError):
+            import_enrollees(file, self.employer)
+
+    def test_links_existing_employee_user(self):
+        user = User.objects.create_user(email='ada@test.com', password='pw', username='ada')
+        profile = UserProfile.objects.create(user=user, role='EMPLOYEE')
+
+        import_enrollees(self._file(
+            f'Ada,Obi,1990-01-01,F,08011111111,{self.plan.id},ada@test.com,,'
+        ), self.employer)
+
+        employee_profile = EmployeeProfile.objects.get(user_profile=profile)
+        self.assertEqual(employee_profile.employer, self.employer)
+        self.assertEqual(
+            employee_profile.employee_id,
+            Enrollees.objects.get(email='ada@test.com').enrollee_id
+        )
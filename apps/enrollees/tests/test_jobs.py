@@ -0,0 +1,118 @@
+import csv
+import datetime
+import shutil
+import tempfile
+from io import StringIO
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from apps.accounts.models import User, UserProfile
+from apps.enrollees.jobs import claim_next_job
+from apps.enrollees.models import Enrollees, EnrolleeImportJob
+from apps.plans.models import Plan
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class BulkUploadJobTest(APITestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.plan = Plan.objects.create(
+            plan_code='PLAN001',
+            name='Gold Plan',
+            description='Premium coverage',
+            annual_cap=1000000.00,
+            visit_cap=10,
+            covered_services=['consultation'],
+            co_pay_rules={'consultation': 1000}
+        )
+        self.user = User.objects.create_user(email='employer@test.com', password='pw', username='emp')
+        UserProfile.objects.create(user=self.user, role='EMPLOYER', phone='08100000001')
+        self.client.force_authenticate(user=self.user)
+
+    def _upload(self):
+        content = (
+            'first_name,last_name,dob,gender,phone,plan_id,email,national_id,address\n'
+            f'Ada,Obi,1990-01-01,F,08011111111,{self.plan.id},ada@test.com,,\n'
+            f'Ngozi,Eze,1990-01-01,X,08022222222,{self.plan.id},ngozi@test.com,,\n'
+        )
+        file = SimpleUploadedFile('roster.csv', content.encode())
+        return self.client.post(reverse('bulk-upload'), {'file': file}, format='multipart')
+
+    def test_upload_returns_job_without_importing(self):
+        response = self._upload()
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], 'PENDING')
+        self.assertTrue(EnrolleeImportJob.objects.filter(id=response.data['job_id']).exists())
+        self.assertEqual(Enrollees.objects.count(), 0)
+
+    def test_upload_rejects_unsupported_file(self):
+        file = SimpleUploadedFile('roster.txt', b'hello')
+        response = self.client.post(reverse('bulk-upload'), {'file': file}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_upload_rejects_provision_mode(self):
+        file = SimpleUploadedFile('roster.csv', b'first_name\n')
+        response = self.client.post(
+            reverse('bulk-upload'), {'file': file, 'mode': 'PROVISION'}, format='multipart'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_worker_processes_job_and_reports_progress(self):
+        job_id = self._upload().data['job_id']
+        call_command('process_enrollee_imports', '--once', stdout=StringIO())
+
+        response = self.client.get(reverse('bulk-upload-status', args=[job_id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'COMPLETED')
+        self.assertEqual(response.data['processed_rows'], 2)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['failed'], 1)
+
+        response = self.client.get(reverse('bulk-upload-errors', args=[job_id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        report = list(csv.DictReader(
+            b''.join(response.streaming_content).decode().splitlines()
+        ))
+        self.assertEqual(len(report), 1)
+        self.assertEqual(report[0]['row'], '3')
+        self.assertEqual(report[0]['errors'], 'gender: "X" is not a valid choice.')
+        self.assertEqual(report[0]['first_name'], 'Ngozi')
+
+    def test_stalled_job_is_reclaimed_and_resumed(self):
+        job_id = self._upload().data['job_id']
+        # A worker died after committing the first row
+        EnrolleeImportJob.objects.filter(pk=job_id).update(
+            status='PROCESSING', processed_rows=1, created_count=1,
+            started_at=timezone.now(), heartbeat_at=timezone.now()
+        )
+        self.assertIsNone(claim_next_job())
+
+        EnrolleeImportJob.objects.filter(pk=job_id).update(
+            heartbeat_at=timezone.now() - datetime.timedelta(hours=1)
+        )
+        call_command('process_enrollee_imports', '--once', stdout=StringIO())
+
+        job = EnrolleeImportJob.objects.get(pk=job_id)
+        self.assertEqual(job.status, 'COMPLETED')
+        self.assertEqual((job.processed_rows, job.created_count, job.failed_count), (2, 1, 1))
+        # The first row was not imported again
+        self.assertFalse(Enrollees.objects.filter(first_name='Ada').exists())
+
+    def test_job_of_other_employer_not_found(self):
+        job_id = self._upload().data['job_id']
+        other = User.objects.create_user(email='other@test.com', password='pw', username='other')
+        UserProfile.objects.create(user=other, role='EMPLOYER', phone='08100000002')
+        self.client.force_authenticate(user=other)
+
+        response = self.client.get(reverse('bulk-upload-status', args=[job_id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,81 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from apps.accounts.models import User, UserProfile, EmployeeProfile
+from apps.enrollees.linking import link_enrollees_to_users
+from apps.enrollees.models import Enrollees
+from apps.testing import QueryBudgetMixin
+
+
+class LinkEnrolleesToUsersTest(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        user = User.objects.create_user(email='employer@test.com', password='pw', username='emp')
+        self.employer = UserProfile.objects.create(
+            user=user, role='EMPLOYER', phone='08100000001'
+        ).employer_profile
+
+        # Registered before being enrolled: EmployeeProfile without employer
+        self.profiles = [
+            UserProfile.objects.create(
+                user=User.objects.create_user(
+                    email=f'member{i}@test.com', password='pw', username=f'member{i}'
+                ),
+                role='EMPLOYEE'
+            )
+            for i in range(5)
+        ]
+        # One account never got its EmployeeProfile
+        self.profiles[0].employee_profile.delete()
+
+    def enroll(self, count):
+        # bulk_create skips post_save, so nothing is linked yet
+        enrollees = [
+            Enrollees(
+                enrollee_id=f'HL-240101-{i:04d}', first_name=f'Member{i}', last_name='Test',
+                gender='F', phone=f'0801000000{i}', email=f'member{i}@test.com',
+                employer=self.employer
+            )
+            for i in range(count)
+        ]
+        for enrollee in enrollees:
+            enrollee.set_lookup_fields()
+        return Enrollees.objects.bulk_create(enrollees)
+
+    def test_links_in_constant_queries(self):
+        enrollees = self.enroll(5)
+
+        with self.assertMaxQueries(3):
+            linked = link_enrollees_to_users(enrollees)
+
+        self.assertEqual(linked, 5)
+        for i, profile in enumerate(self.profiles):
+            employee_profile = EmployeeProfile.objects.get(user_profile=profile)
+            self.assertEqual(employee_profile.employer, self.employer)
+            self.assertEqual(employee_profile.employee_id, f'HL-240101-{i:04d}')
+
+    def test_matches_emails_in_any_case(self):
+        enrollees = self.enroll(2)
+        for enrollee in enrollees:
+            enrollee.email = enrollee.email.upper()
+
+        self.assertEqual(link_enrollees_to_users(enrollees), 2)
+        self.assertEqual(
+            EmployeeProfile.objects.get(user_profile=self.profiles[1]).employee_id, 'HL-240101-0001'
+        )
+
+    def test_already_linked_profiles_are_left_alone(self):
+        enrollees = self.enroll(2)
+        link_enrollees_to_users(enrollees)
+
+        self.assertEqual(link_enrollees_to_users(enrollees), 0)
+
+    def test_repair_command_links_unlinked_profiles(self):
+        self.enroll(3)
+        out = StringIO()
+
+        call_command('link_enrollee_users', batch_size=2, stdout=out)
+
+        self.assertIn('Linked 3', out.getvalue())
+        self.assertEqual(
+            EmployeeProfile.objects.filter(employer=self.employer).count(), 3
+        )
@@ -0,0 +1,183 @@
+import datetime
+from unittest import skipUnless
+from django.db import connection, connections
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from apps.accounts.models import User, UserProfile
+from apps.enrollees.models import Enrollees
+from apps.enrollees.pagination import change_feed_horizon
+
+
+def page_query(client, url, params=None):
+    """
+    SQL of the query fetching the page at `url`.
+    """
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url, params)
+    assert response.status_code == status.HTTP_200_OK, response.data
+    return next(query['sql'] for query in queries if 'LIMIT' in query['sql'])
+
+
+def index_condition(sql):
+    """
+    The Index Cond lines of the Postgres plan of `sql`, sequential scans
+    disabled as they win on tiny test tables.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        cursor.execute(f'EXPLAIN {sql}')
+        plan = [line for line, in cursor.fetchall()]
+        cursor.execute('RESET enable_seqscan')
+    return ' '.join(line for line in plan if 'Index Cond' in line)
+
+
+class EnrolleeListPaginationTest(APITestCase):
+    def setUp(self):
+        self.url = reverse('enrollee-list-create')
+        self.user = User.objects.create_user(email='employer@test.com', password='pw', username='emp')
+        profile = UserProfile.objects.create(user=self.user, role='EMPLOYER', phone='08100000001')
+        self.client.force_authenticate(user=self.user)
+
+        # Seven enrollees; the last three share a timestamp so ties fall back to id.
+        base = timezone.now()
+        for i in range(7):
+            enrollee = Enrollees.objects.create(
+                first_name=f'First{i}', last_name='Last', gender='M',
+                phone=f'0801000000{i}', employer=profile.employer_profile
+            )
+            created_at = base - datetime.timedelta(minutes=min(i, 4))
+            Enrollees.objects.filter(pk=enrollee.pk).update(created_at=created_at)
+
+        self.expected = [
+            str(pk) for pk in
+            Enrollees.objects.order_by('-created_at', 'id').values_list('id', flat=True)
+        ]
+
+    def _walk(self, url, link):
+        ids, pages = [], []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append(response.data)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data[link]
+        return ids, pages
+
+    def test_walks_forward_in_keyset_order(self):
+        ids, pages = self._walk(f'{self.url}?page_size=3', 'next')
+        self.assertEqual(ids, self.expected)
+        self.assertEqual([len(page['results']) for page in pages], [3, 3, 1])
+        self.assertIsNone(pages[0]['previous'])
+
+    def test_walks_back_with_previous_links(self):
+        _, pages = self._walk(f'{self.url}?page_size=3', 'next')
+        ids, back = self._walk(pages[-1]['previous'], 'previous')
+        self.assertEqual(ids, self.expected[3:6] + self.expected[0:3])
+        self.assertIsNotNone(back[0]['next'])
+
+    def test_deep_pages_start_the_index_scan_at_the_cursor(self):
+        _, pages = self._walk(f'{self.url}?page_size=3', 'next')
+        for link in ('next', 'previous'):
+            sql = page_query(self.client, pages[1][link])
+            # The inclusive bound leads the OR of the strict and tie conditions
+            self.assertRegex(sql, r'"created_at" (<|>)= ')
+            if connection.vendor == 'postgresql':
+                self.assertIn('created_at', index_condition(sql))
+
+    def test_invalid_cursor(self):
+        response = self.client.get(f'{self.url}?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(ENROLLEE_CHANGE_FEED_LAG=0)
+class EnrolleeChangeFeedTest(APITestCase):
+    def setUp(self):
+        self.url = reverse('enrollee-changes')
+        self.user = User.objects.create_user(email='employer@test.com', password='pw', username='emp')
+        profile = UserProfile.objects.create(user=self.user, role='EMPLOYER', phone='08100000001')
+        self.client.force_authenticate(user=self.user)
+
+        # Five enrollees, the last two updated at the same instant.
+        self.base = timezone.now() - datetime.timedelta(hours=1)
+        self.enrollees = []
+        for i in range(5):
+            enrollee = Enrollees.objects.create(
+                first_name=f'First{i}', last_name='Last', gender='M',
+                phone=f'0801000000{i}', employer=profile.employer_profile
+            )
+            updated_at = self.base + datetime.timedelta(minutes=min(i, 3))
+            Enrollees.objects.filter(pk=enrollee.pk).update(updated_at=updated_at)
+            self.enrollees.append(enrollee)
+
+    def _get(self, since=None, page_size=2):
+        params = {'page_size': page_size}
+        if since:
+            params['since'] = since
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_returns_only_changes_after_the_cursor(self):
+        expected = [
+            str(pk) for pk in
+            Enrollees.objects.order_by('updated_at', 'id').values_list('id', flat=True)
+        ]
+        ids, cursor, has_more = [], None, True
+        while has_more:
+            page = self._get(cursor)
+            ids.extend(item['id'] for item in page['results'])
+            cursor, has_more = page['cursor'], page['has_more']
+        self.assertEqual(ids, expected)
+
+        # Caught up: no results, and the same cursor to poll with.
+        page = self._get(cursor)
+        self.assertEqual((page['results'], page['cursor']), ([], cursor))
+
+        terminated = self.enrollees[1]
+        terminated.status = 'TERMINATED'
+        terminated.save()
+        page = self._get(cursor)
+        self.assertEqual(
+            [(item['id'], item['status']) for item in page['results']],
+            [(str(terminated.pk), 'TERMINATED')]
+        )
+
+    def test_hides_rows_inside_the_commit_lag(self):
+        with self.settings(ENROLLEE_CHANGE_FEED_LAG=60):
+            self.enrollees[0].save()
+            page = self._get(page_size=10)
+        self.assertNotIn(str(self.enrollees[0].pk), [item['id'] for item in page['results']])
+
+    def test_cursor_is_a_row_comparison(self):
+        cursor = self._get()['cursor']
+        sql = page_query(self.client, self.url, {'since': cursor})
+        self.assertIn('("enrollees"."updated_at", "enrollees"."id") > (', sql)
+        if connection.vendor == 'postgresql':
+            self.assertIn('ROW(updated_at, id) >', index_condition(sql))
+
+    @skipUnless(connection.vendor == 'postgresql', 'Needs another session writing')
+    def test_horizon_waits_for_open_writing_transactions(self):
+        now, lag = timezone.now(), datetime.timedelta(seconds=5)
+        self.assertEqual(change_feed_horizon(now, lag), now - lag)
+
+        other = connections.create_connection('default')
+        self.addCleanup(other.close)
+        other.set_autocommit(False)
+        with other.cursor() as cursor:
+            cursor.execute('CREATE TEMPORARY TABLE feed_writer (id integer)')
+            cursor.execute('INSERT INTO feed_writer VALUES (1)')
+            cursor.execute('SELECT xact_start FROM pg_stat_activity WHERE pid = pg_backend_pid()')
+            started = cursor.fetchone()[0]
+        later = now + datetime.timedelta(minutes=10)
+        self.assertEqual(change_feed_horizon(later, lag), started - lag)
+
+        other.rollback()
+        self.assertEqual(change_feed_horizon(later, lag), later - lag)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'since': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,231 @@
+import os
+import re
+import smtplib
+import tempfile
+from io import StringIO
+from unittest import mock, skipUnless
+from django.contrib.auth.tokens import default_token_generator
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from apps.accounts.models import User, UserProfile, EmployeeProfile
+from apps.enrollees.models import Enrollees
+from apps.enrollees.provisioning import (
+    compute_credentials, provision_employee_accounts, send_invites
+)
+from apps.testing import QueryBudgetMixin
+
+
+class ProvisioningTestMixin:
+    def setUp(self):
+        self.employer_user = User.objects.create_user(
+            email='employer@test.com', password='pw', username='emp'
+        )
+        self.employer = UserProfile.objects.create(
+            user=self.employer_user, role='EMPLOYER', phone='08100000001'
+        ).employer_profile
+        self.enrollees = [
+            Enrollees.objects.create(
+                first_name=f'Member{i}', last_name='Test', gender='F',
+                phone=f'0801000000{i}', email=f'Member{i}@test.com', employer=self.employer
+            )
+            for i in range(5)
+        ]
+        # No email, or no longer covered: no account
+        Enrollees.objects.create(
+            first_name='NoEmail', last_name='Test', gender='M', phone='08020000001',
+            employer=self.employer
+        )
+        Enrollees.objects.create(
+            first_name='Gone', last_name='Test', gender='M', phone='08020000002',
+            email='gone@test.com', status='TERMINATED', employer=self.employer
+        )
+
+
+class ProvisionEmployeeAccountsTest(ProvisioningTestMixin, QueryBudgetMixin, TestCase):
+    def test_creates_linked_accounts_with_invites(self):
+        # Lookups, then one INSERT per table
+        with self.assertMaxQueries(9):
+            result = provision_employee_accounts(self.employer.pk, workers=1)
+        self.assertEqual((result['created'], result['linked'], result['skipped']), (5, 0, 0))
+
+        enrollee = self.enrollees[0]
+        employee_profile = EmployeeProfile.objects.select_related('user_profile__user').get(
+            employee_id=enrollee.enrollee_id
+        )
+        user = employee_profile.user_profile.user
+        self.assertEqual(employee_profile.employer, self.employer)
+        self.assertEqual((user.email, user.first_name), ('Member0@test.com', 'Member0'))
+        self.assertEqual(employee_profile.user_profile.phone, enrollee.phone)
+        self.assertFalse(user.has_usable_password())
+        self.assertEqual(
+            {invite['enrollee_id'] for invite in result['invites']},
+            {enrollee.enrollee_id for enrollee in self.enrollees}
+        )
+
+    @skipUnless(connection.vendor == 'postgresql', 'expression index plans are Postgres specific')
+    def test_existing_emails_are_found_through_the_lowercased_index(self):
+        # Enough rows, analyzed, that no full index scan looks as cheap
+        User.objects.bulk_create(
+            User(email=f'other{i}@test.com', username=f'other{i}') for i in range(500)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE users')
+        with CaptureQueriesContext(connection) as queries:
+            provision_employee_accounts(self.employer.pk, workers=1)
+        sql = next(
+            query['sql'] for query in queries
+            if query['sql'].startswith('SELECT LOWER("users"."email")')
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            try:
+                cursor.execute(f'EXPLAIN {sql}')
+                plan = '\n'.join(line for line, in cursor.fetchall())
+            finally:
+                cursor.execute('RESET enable_seqscan')
+        self.assertIn('users_email_lower_idx', plan)
+
+    def test_links_existing_accounts_and_skips_others(self):
+        # Registered before the bulk run, not linked yet
+        registered = User.objects.create_user(email='Member1@test.com', password='pw', username='m1')
+        UserProfile.objects.create(user=registered, role='EMPLOYEE')
+        EmployeeProfile.objects.filter(user_profile__user=registered).update(employer=None, employee_id=None)
+        # Another role holds this email
+        provider = User.objects.create_user(email='member2@test.com', password='pw', username='m2')
+        UserProfile.objects.create(user=provider, role='PROVIDER')
+
+        result = provision_employee_accounts(self.employer.pk, workers=1)
+        self.assertEqual((result['created'], result['linked'], result['skipped']), (3, 1, 1))
+        registered.profile.employee_profile.refresh_from_db()
+        self.assertEqual(registered.profile.employee_profile.employer, self.employer)
+        self.assertFalse(User.objects.filter(email__iexact='member2@test.com').exclude(pk=provider.pk).exists())
+
+        # A second run has nothing left to create
+        result = provision_employee_accounts(self.employer.pk, workers=1)
+        self.assertEqual(result['created'], 0)
+
+    def test_unclaimed_accounts_are_invited_again(self):
+        result = provision_employee_accounts(self.employer.pk, workers=1)
+        rejected = 'Member1@test.com'
+        send_messages = EmailBackend.send_messages
+
+        def reject(backend, messages):
+            if messages[0].to == [rejected]:
+                raise smtplib.SMTPRecipientsRefused({rejected: (550, b'Mailbox unavailable')})
+            return send_messages(backend, messages)
+
+        with mock.patch.object(EmailBackend, 'send_messages', reject), \
+                self.assertLogs('apps.enrollees.provisioning', 'ERROR'):
+            self.assertEqual(send_invites(result['invites']), 4)
+        self.assertEqual(len(mail.outbox), 4)
+
+        # Member0 accepts their invite; the others are still waiting
+        claimed = User.objects.get(email='Member0@test.com')
+        claimed.set_password('password123####')
+        claimed.save()
+
+        result = provision_employee_accounts(self.employer.pk, workers=1)
+        self.assertEqual((result['created'], result['reinvited'], result['skipped']), (0, 4, 1))
+        self.assertEqual(
+            {invite['email'] for invite in result['invites']},
+            {f'Member{i}@test.com' for i in range(1, 5)}
+        )
+        for invite in result['invites']:
+            user = User.objects.get(email=invite['email'])
+            self.assertTrue(default_token_generator.check_token(user, invite['token']))
+
+    def test_only_given_enrollees(self):
+        result = provision_employee_accounts(
+            self.employer.pk, enrollee_ids=[self.enrollees[3].enrollee_id], workers=1
+        )
+        self.assertEqual([invite['email'] for invite in result['invites']], ['Member3@test.com'])
+
+    def test_credentials_in_process_pool(self):
+        users = [(User._meta.pk.default(), f'user{i}@test.com') for i in range(3)]
+        credentials = compute_credentials(users, 'Temp-password-1', workers=2)
+        self.assertEqual(len(credentials), 3)
+        for (pk, email), (password_hash, token) in zip(users, credentials):
+            user = User(pk=pk, email=email, password=password_hash)
+            self.assertTrue(user.check_password('Temp-password-1'))
+            self.assertTrue(token)
+
+    def test_invites_skip_the_process_pool(self):
+        users = [(User._meta.pk.default(), f'user{i}@test.com') for i in range(3)]
+        with mock.patch('apps.enrollees.provisioning.ProcessPoolExecutor') as pool:
+            credentials = compute_credentials(users, workers=2)
+        pool.assert_not_called()
+        self.assertFalse(User(password=credentials[0][0]).has_usable_password())
+
+    def test_command_writes_invites(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'invites.csv')
+            out = StringIO()
+            call_command(
+                'provision_employee_accounts', str(self.employer.pk),
+                invites=path, workers=1, stdout=out
+            )
+            with open(path) as file:
+                self.assertEqual(len(file.readlines()), 6)
+        self.assertIn('5 account(s) created, 0 linked, 0 reinvited, 0 skipped', out.getvalue())
+
+
+class ProvisionAccountsViewTest(ProvisioningTestMixin, APITestCase):
+    @override_settings(ACCOUNT_INVITE_URL='https://portal.test/invite/{uid}/{token}/')
+    def test_provision_and_accept_invite(self):
+        self.client.force_authenticate(user=self.employer_user)
+        response = self.client.post(
+            reverse('enrollee-provision-accounts'),
+            {'enrollee_ids': [self.enrollees[0].enrollee_id]}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['mode'], 'PROVISION')
+        self.assertEqual(mail.outbox, [])
+
+        call_command('process_enrollee_imports', once=True, stdout=StringIO())
+        response = self.client.get(reverse('bulk-upload-status', args=[response.data['job_id']]))
+        self.assertEqual(response.data['status'], 'COMPLETED')
+        self.assertEqual(
+            {key: response.data['summary'][key] for key in ('created', 'linked', 'skipped')},
+            {'created': 1, 'linked': 0, 'skipped': 0}
+        )
+        self.assertEqual(
+            (response.data['summary']['invites_sent'], response.data['summary']['invites_failed']),
+            (1, 0)
+        )
+        # The invite goes to the enrollee only, never back to the employer
+        self.assertNotIn('invites', response.data['summary'])
+        self.assertEqual([message.to for message in mail.outbox], [['Member0@test.com']])
+        uid, token = re.search(
+            r'https://portal\.test/invite/([^/]+)/([^/]+)/', mail.outbox[0].body
+        ).groups()
+
+        self.client.force_authenticate(user=None)
+        url = reverse('accept-invite')
+        data = {
+            'uid': uid, 'token': token,
+            'password': 'password123####', 'password2': 'password123####'
+        }
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('access', response.data)
+        self.assertTrue(User.objects.get(email='Member0@test.com').check_password('password123####'))
+
+        # The token is spent once the password changed
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('token', response.data)
+
+    def test_requires_employer(self):
+        employee = User.objects.create_user(email='member9@test.com', password='pw', username='m9')
+        UserProfile.objects.create(user=employee, role='EMPLOYEE')
+        self.client.force_authenticate(user=employee)
+        response = self.client.post(reverse('enrollee-provision-accounts'), {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,82 @@
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from apps.accounts.models import User, UserProfile
+from apps.enrollees.models import Enrollees, EnrolleeImportJob
+from apps.plans.models import Plan
+from apps.testing import QueryBudgetMixin
+
+
+class EnrolleeQueryBudgetTest(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='employer@test.com', password='pw', username='emp')
+        profile = UserProfile.objects.create(user=self.user, role='EMPLOYER', phone='08100000001')
+        self.employer = profile.employer_profile
+        self.plans = [
+            Plan.objects.create(
+                plan_code=f'PLAN00{i}', name=f'Plan {i}', description='Coverage',
+                annual_cap=1000000.00, visit_cap=10,
+                covered_services=['consultation'], co_pay_rules={'consultation': 1000}
+            )
+            for i in range(3)
+        ]
+        self.enrollees = [
+            Enrollees.objects.create(
+                first_name=f'First{i}', last_name='Last', gender='M',
+                phone=f'080100000{i:02d}', employer=self.employer,
+                plan=self.plans[i % 3]
+            )
+            for i in range(12)
+        ]
+
+    def authenticate(self):
+        # A fresh user per request so no relation is cached across requests.
+        self.client.force_authenticate(user=User.objects.get(pk=self.user.pk))
+
+    def test_list(self):
+        self.authenticate()
+        # The page plus the aggregate behind its ETag
+        with self.assertMaxQueries(4):
+            response = self.client.get(reverse('enrollee-list-create'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 12)
+
+        self.authenticate()
+        with self.assertMaxQueries(3):
+            response = self.client.get(
+                reverse('enrollee-list-create'), HTTP_IF_NONE_MATCH=response['ETag']
+            )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_create(self):
+        self.authenticate()
+        with self.assertMaxQueries(6):
+            response = self.client.post(reverse('enrollee-list-create'), {
+                'first_name': 'New', 'last_name': 'Member', 'gender': 'F',
+                'phone': '08099999999', 'plan': str(self.plans[0].id),
+            })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_detail(self):
+        url = reverse('enrollee-detail', args=[self.enrollees[0].enrollee_id])
+        self.authenticate()
+        with self.assertMaxQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.authenticate()
+        with self.assertMaxQueries(4):
+            response = self.client.patch(url, {'first_name': 'Renamed'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.authenticate()
+        with self.assertMaxQueries(4):
+            response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_bulk_upload_status(self):
+        job = EnrolleeImportJob.objects.create(employer=self.employer, file='enrollee_imports/roster.csv')
+        self.authenticate()
+        with self.assertMaxQueries(3):
+            response = self.client.get(reverse('bulk-upload-status', args=[job.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
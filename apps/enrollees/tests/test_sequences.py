@@ -0,0 +1,52 @@
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+from unittest import skipUnless
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from apps.enrollees.models import Enrollees
+from apps.enrollees.sequences import allocate_enrollee_ids
+
+
+class AllocateEnrolleeIdsTest(TestCase):
+    day = datetime.date(2024, 12, 10)
+
+    def test_allocates_consecutive_blocks(self):
+        self.assertEqual(allocate_enrollee_ids(day=self.day), ['HL-241210-0001'])
+        self.assertEqual(
+            allocate_enrollee_ids(3, day=self.day),
+            ['HL-241210-0002', 'HL-241210-0003', 'HL-241210-0004']
+        )
+        self.assertEqual(allocate_enrollee_ids(day=self.day + datetime.timedelta(days=1)), ['HL-241211-0001'])
+
+    def test_seeds_from_ids_already_issued_that_day(self):
+        for number in (1, 2):
+            Enrollees.objects.create(
+                enrollee_id=f'HL-241210-000{number}', first_name='A', last_name='B',
+                gender='M', phone=f'0801000000{number}'
+            )
+        self.assertEqual(allocate_enrollee_ids(day=self.day), ['HL-241210-0003'])
+
+    def test_enrollee_save_uses_allocator(self):
+        first = Enrollees.objects.create(first_name='A', last_name='B', gender='M', phone='08010000001')
+        second = Enrollees.objects.create(first_name='C', last_name='D', gender='F', phone='08010000002')
+        self.assertTrue(first.enrollee_id.endswith('-0001'))
+        self.assertTrue(second.enrollee_id.endswith('-0002'))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Concurrent writers need a server database')
+class ConcurrentAllocationTest(TransactionTestCase):
+    def test_concurrent_writers_get_distinct_ids(self):
+        day = datetime.date(2024, 12, 10)
+
+        def allocate(_):
+            try:
+                return allocate_enrollee_ids(5, day=day)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            blocks = list(pool.map(allocate, range(40)))
+
+        ids = [enrollee_id for block in blocks for enrollee_id in block]
+        self.assertEqual(len(set(ids)), 200)
+        self.assertEqual(max(ids), 'HL-241210-0200')
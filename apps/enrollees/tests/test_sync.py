@@ -0,0 +1,269 @@
+import datetime
+import shutil
+import tempfile
+from unittest import mock
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from apps.accounts.models import User, UserProfile
+from apps.enrollees.models import Enrollees, EnrolleeImportJob
+from apps.enrollees.sequences import allocate_enrollee_ids
+from apps.enrollees.signals import enrollees_bulk_changed
+from apps.enrollees.sync import sync_roster
+from apps.plans.models import Plan
+
+HEADER = 'first_name,last_name,dob,gender,phone,plan_id,email,national_id,address\n'
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def create_plan(code='PLAN001'):
+    return Plan.objects.create(
+        plan_code=code,
+        name=f'{code} Plan',
+        description='Premium coverage',
+        annual_cap=1000000.00,
+        visit_cap=10,
+        covered_services=['consultation'],
+        co_pay_rules={'consultation': 1000}
+    )
+
+
+def roster(*rows):
+    content = HEADER + ''.join(row + '\n' for row in rows)
+    return SimpleUploadedFile('roster.csv', content.encode())
+
+
+class SyncRosterTest(TestCase):
+    def setUp(self):
+        self.plan = create_plan()
+        user = User.objects.create_user(email='employer@test.com', password='pw', username='emp')
+        profile = UserProfile.objects.create(user=user, role='EMPLOYER', phone='08100000001')
+        self.employer = profile.employer_profile
+
+        self.ada = Enrollees.objects.create(
+            enrollee_id='HL-240101-0001', first_name='Ada', last_name='Obi',
+            dob=datetime.date(1990, 1, 1), gender='F', phone='08011111111',
+            email='ada@test.com', national_id='NIN1', employer=self.employer, plan=self.plan
+        )
+        self.ngozi = Enrollees.objects.create(
+            enrollee_id='HL-240101-0002', first_name='Ngozi', last_name='Eze',
+            dob=datetime.date(1991, 2, 2), gender='F', phone='08022222222',
+            email='ngozi@test.com', national_id='NIN2', employer=self.employer, plan=self.plan
+        )
+
+    def test_inserts_updates_and_terminates(self):
+        result = sync_roster(roster(
+            # Matched on national_id; last name and phone changed
+            f'Ada,Okafor,1990-01-01,F,08033333333,{self.plan.id},ada@test.com,NIN1,',
+            f'Tunde,Bello,1992-03-03,M,08044444444,{self.plan.id},tunde@test.com,NIN4,Lagos',
+        ), self.employer, chunk_size=1)
+
+        summary = result['summary']
+        self.assertEqual(result['total_rows'], 2)
+        self.assertEqual(result['errors'], [])
+        self.assertEqual(
+            (summary['inserts'], summary['updates'], summary['terminations'], summary['unchanged']),
+            (1, 1, 1, 0)
+        )
+        self.assertEqual(
+            sorted(summary['preview']['updates'][0]['changes']), ['last_name', 'phone']
+        )
+        self.assertEqual(summary['preview']['terminations'][0]['enrollee_id'], 'HL-240101-0002')
+
+        self.ada.refresh_from_db()
+        self.assertEqual((self.ada.last_name, self.ada.phone), ('Okafor', '08033333333'))
+        self.assertEqual(self.ada.phone_e164, '+2348033333333')
+        self.ngozi.refresh_from_db()
+        self.assertEqual(self.ngozi.status, 'TERMINATED')
+        tunde = Enrollees.objects.get(phone='08044444444')
+        self.assertEqual(tunde.employer, self.employer)
+        self.assertEqual(tunde.status, 'ACTIVE')
+        self.assertEqual(tunde.address, 'Lagos')
+        self.assertEqual((tunde.phone_e164, tunde.email_lower), ('+2348044444444', 'tunde@test.com'))
+        self.assertEqual(tunde.enrollee_id_upper, tunde.enrollee_id)
+        self.assertTrue(tunde.enrollee_id.startswith('HL-'))
+
+    def test_status_changes_record_their_effective_date(self):
+        earlier = datetime.date(2020, 1, 1)
+        Enrollees.objects.filter(pk=self.ngozi.pk).update(status_effective_date=earlier)
+        chi = Enrollees.objects.create(
+            enrollee_id='HL-240101-0003', first_name='Chi', last_name='Ude', gender='M',
+            phone='08055555555', employer=self.employer, plan=self.plan
+        )
+        content = (
+            HEADER.rstrip('\n') + ',status\n'
+            f'Ada,Obi,1990-01-01,F,08011111111,{self.plan.id},ada@test.com,NIN1,,SUSPENDED\n'
+            f'Ngozi,Okafor,1991-02-02,F,08022222222,{self.plan.id},ngozi@test.com,NIN2,,ACTIVE\n'
+        )
+        sync_roster(SimpleUploadedFile('roster.csv', content.encode()), self.employer)
+
+        today = timezone.now().date()
+        for enrollee, expected in ((self.ada, ('SUSPENDED', today)), (self.ngozi, ('ACTIVE', earlier)),
+                                   (chi, ('TERMINATED', today))):
+            enrollee.refresh_from_db()
+            self.assertEqual((enrollee.status, enrollee.status_effective_date), expected)
+
+    def test_unchanged_rows_are_not_written(self):
+        file_rows = (
+            # Matched on phone; email case and cleared national_id are changes
+            f'Ada,Obi,1990-01-01,F,08011111111,{self.plan.id},ADA@test.com,,',
+            f'Ngozi,Eze,1991-02-02,F,08022222222,{self.plan.id},ngozi@test.com,NIN2,',
+        )
+        summary = sync_roster(roster(*file_rows), self.employer)['summary']
+        self.assertEqual((summary['updates'], summary['unchanged']), (1, 1))
+        self.assertEqual(
+            sorted(summary['preview']['updates'][0]['changes']), ['email', 'national_id']
+        )
+        self.assertEqual(summary['terminations'], 0)
+
+        summary = sync_roster(roster(*file_rows), self.employer)['summary']
+        self.assertEqual((summary['updates'], summary['unchanged']), (0, 2))
+
+    def test_matches_phones_in_any_spelling(self):
+        other = UserProfile.objects.create(
+            user=User.objects.create_user(email='other@test.com', password='pw', username='other'),
+            role='EMPLOYER', phone='08100000002'
+        ).employer_profile
+        Enrollees.objects.create(
+            enrollee_id='HL-240101-0003', first_name='Chi', last_name='Ude',
+            gender='M', phone='08055555555', employer=other
+        )
+
+        result = sync_roster(roster(
+            # Only the phone identifies Ada and Ngozi, spelled in E.164
+            f'Ada,Obi,1990-01-01,F,+2348011111111,{self.plan.id},,,',
+            f'Ngozi,Eze,1991-02-02,F,+234 802 222 2222,{self.plan.id},,,',
+            # Another employer's enrollee, spelled differently
+            f'Chi,Ude,1993-01-01,M,+2348055555555,{self.plan.id},,,',
+        ), self.employer)
+
+        self.assertEqual(
+            [(error['row'], set(error['errors'])) for error in result['errors']],
+            [(4, {'phone'})]
+        )
+        summary = result['summary']
+        self.assertEqual((summary['inserts'], summary['updates'], summary['terminations']), (0, 2, 0))
+        self.assertEqual(Enrollees.objects.filter(employer=self.employer).count(), 2)
+        self.ada.refresh_from_db()
+        self.assertEqual((self.ada.status, self.ada.phone), ('ACTIVE', '+2348011111111'))
+
+    def test_dry_run_only_summarizes(self):
+        result = sync_roster(roster(
+            f'Tunde,Bello,1992-03-03,M,08044444444,{self.plan.id},tunde@test.com,NIN4,',
+        ), self.employer, dry_run=True)
+
+        summary = result['summary']
+        self.assertTrue(summary['dry_run'])
+        self.assertEqual((summary['inserts'], summary['terminations']), (1, 2))
+        self.assertEqual(summary['preview']['inserts'][0]['phone'], '08044444444')
+        self.assertFalse(Enrollees.objects.filter(phone='08044444444').exists())
+        self.assertFalse(Enrollees.objects.filter(status='TERMINATED').exists())
+
+    def test_ids_are_reserved_outside_the_write_transaction(self):
+        depths = []
+
+        def allocate(count):
+            depths.append(len(connection.atomic_blocks))
+            return allocate_enrollee_ids(count)
+
+        depth = len(connection.atomic_blocks)
+        with mock.patch('apps.enrollees.sync.allocate_enrollee_ids', side_effect=allocate):
+            sync_roster(roster(
+                f'Tunde,Bello,1992-03-03,M,08044444444,{self.plan.id},tunde@test.com,NIN4,',
+            ), self.employer)
+        self.assertEqual(depths, [depth])
+        self.assertTrue(Enrollees.objects.filter(phone='08044444444').exists())
+
+    def test_rejected_rows_do_not_terminate_their_enrollee(self):
+        other = UserProfile.objects.create(
+            user=User.objects.create_user(email='other@test.com', password='pw', username='other'),
+            role='EMPLOYER', phone='08100000002'
+        ).employer_profile
+        Enrollees.objects.create(
+            enrollee_id='HL-240101-0003', first_name='Chi', last_name='Ude',
+            gender='M', phone='08055555555', employer=other
+        )
+
+        result = sync_roster(roster(
+            # Invalid date, but still identifies Ada
+            f'Ada,Obi,not-a-date,F,08011111111,{self.plan.id},ada@test.com,NIN1,',
+            # Phone belongs to another employer's enrollee
+            f'Ngozi,Eze,1991-02-02,F,08055555555,{self.plan.id},ngozi@test.com,NIN2,',
+            # Matches Ngozi a second time
+            f'Ngozi,Eze,1991-02-02,F,08022222222,{self.plan.id},ngozi@test.com,,',
+        ), self.employer)
+
+        self.assertEqual(
+            [(error['row'], set(error['errors'])) for error in result['errors']],
+            [(2, {'dob'}), (3, {'phone'}), (4, {'non_field_errors'})]
+        )
+        summary = result['summary']
+        self.assertEqual((summary['inserts'], summary['updates'], summary['terminations']), (0, 0, 0))
+        self.assertFalse(Enrollees.objects.filter(status='TERMINATED').exists())
+
+    def test_announces_written_enrollees_after_commit(self):
+        received = []
+        def receiver(sender, enrollee_ids, **kwargs):
+            received.extend(enrollee_ids)
+        enrollees_bulk_changed.connect(receiver)
+        self.addCleanup(enrollees_bulk_changed.disconnect, receiver)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sync_roster(roster(
+                f'Ada,Okafor,1990-01-01,F,08011111111,{self.plan.id},ada@test.com,NIN1,',
+                f'Tunde,Bello,1992-03-03,M,08044444444,{self.plan.id},tunde@test.com,NIN4,',
+            ), self.employer)
+
+        self.assertEqual(
+            set(received),
+            {self.ada.pk, self.ngozi.pk, Enrollees.objects.get(phone='08044444444').pk}
+        )
+
+    def test_missing_columns(self):
+        file = SimpleUploadedFile('roster.csv', b'first_name,last_name\nAda,Obi\n')
+        with self.assertRaises(ValueError):
+            sync_roster(file, self.employer)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class SyncUploadTest(APITestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.plan = create_plan()
+        self.user = User.objects.create_user(email='employer@test.com', password='pw', username='emp')
+        UserProfile.objects.create(user=self.user, role='EMPLOYER', phone='08100000001')
+        self.client.force_authenticate(user=self.user)
+
+    def test_dry_run_sync_job_reports_summary(self):
+        response = self.client.post(reverse('bulk-upload'), {
+            'file': roster(f'Ada,Obi,1990-01-01,F,08011111111,{self.plan.id},ada@test.com,,'),
+            'mode': 'sync',
+            'dry_run': 'true',
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual((response.data['mode'], response.data['dry_run']), ('SYNC', True))
+
+        call_command('process_enrollee_imports', once=True)
+
+        response = self.client.get(reverse('bulk-upload-status', args=[response.data['job_id']]))
+        self.assertEqual(response.data['status'], 'COMPLETED')
+        self.assertEqual(response.data['processed_rows'], 1)
+        self.assertEqual(response.data['created'], 0)
+        self.assertEqual(response.data['summary']['inserts'], 1)
+        self.assertEqual(Enrollees.objects.count(), 0)
+
+    def test_rejects_unknown_mode(self):
+        response = self.client.post(reverse('bulk-upload'), {
+            'file': roster(), 'mode': 'MERGE'
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(EnrolleeImportJob.objects.exists())
@@ -0,0 +1,89 @@
+import datetime
+from io import BytesIO
+import openpyxl
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase
+from apps.enrollees.utils import StageTimer, iter_chunks, normalize_phone
+
+
+def workbook_file(rows, name='roster.xlsx'):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    for row in rows:
+        sheet.append(row)
+    buffer = BytesIO()
+    workbook.save(buffer)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+class IterChunksTest(SimpleTestCase):
+    def test_csv_keeps_values_as_strings(self):
+        file = SimpleUploadedFile('roster.csv', b'phone,dob\n08011111111,\n08022222222,1990-01-01\n')
+        chunks = list(iter_chunks(file, 1))
+
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual(chunks[0].loc[0, 'phone'], '08011111111')
+        self.assertEqual(chunks[0].loc[0, 'dob'], '')
+        self.assertEqual(list(chunks[1].index), [1])
+
+    def test_xlsx_is_streamed_in_chunks(self):
+        file = workbook_file([
+            ['first_name', 'phone', 'dob', 'email'],
+            ['Ada', '08011111111', datetime.datetime(1990, 1, 1), None],
+            ['Ngozi', 8022222222, datetime.date(1991, 2, 2), 'ngozi@test.com'],
+            ['Tunde', 8033333333.0, '1992-03-03', None],
+        ])
+        chunks = list(iter_chunks(file, 2))
+
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 1])
+        self.assertEqual(list(chunks[1].index), [2])
+        first = chunks[0]
+        self.assertEqual(list(first.columns), ['first_name', 'phone', 'dob', 'email'])
+        self.assertEqual(first.loc[0, 'dob'], '1990-01-01')
+        self.assertEqual(first.loc[0, 'email'], '')
+        self.assertEqual(first.loc[1, 'phone'], '8022222222')
+        self.assertEqual(first.loc[1, 'dob'], '1991-02-02')
+        self.assertEqual(chunks[1].loc[2, 'phone'], '8033333333')
+
+    def test_unsupported_format(self):
+        with self.assertRaises(ValueError):
+            list(iter_chunks(SimpleUploadedFile('roster.txt', b'hello'), 10))
+
+    def test_xlsx_skips_blank_rows(self):
+        file = workbook_file([
+            ['first_name', 'phone'],
+            ['Ada', '08011111111'],
+            [None, ''],
+            ['Ngozi', '08022222222'],
+            [None, None],
+            ['', None],
+        ])
+        chunks = list(iter_chunks(file, 10))
+
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(list(chunks[0]['first_name']), ['Ada', 'Ngozi'])
+        # Row numbers still match the sheet
+        self.assertEqual(list(chunks[0].index), [0, 2])
+
+
+class NormalizePhoneTest(SimpleTestCase):
+    def test_formats_to_e164(self):
+        self.assertEqual(normalize_phone('08011111111'), '+2348011111111')
+        self.assertEqual(normalize_phone('+234 801 111 1111'), '+2348011111111')
+        self.assertEqual(normalize_phone('(415) 555-2671', 'US'), '+14155552671')
+
+    def test_rejects_non_numbers(self):
+        self.assertIsNone(normalize_phone('not-a-phone'))
+        self.assertIsNone(normalize_phone('1'))
+
+
+class StageTimerTest(SimpleTestCase):
+    def test_accumulates_per_stage(self):
+        timer = StageTimer()
+        self.assertEqual(list(timer.iterate('parse', [1, 2])), [1, 2])
+        with timer.stage('write'):
+            pass
+        with timer.stage('write'):
+            pass
+
+        self.assertEqual(set(timer.as_dict()), {'parse', 'write'})
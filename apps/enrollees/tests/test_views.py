@@ -0,0 +1,236 @@
+import csv
+import io
+import json
+from unittest import skipUnless
+from django.db import connection
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from apps.accounts.models import User, UserProfile
+from apps.enrollees.exports import EXPORT_ORDERING, parquet_available
+from apps.enrollees.models import Enrollees
+from apps.plans.models import Plan
+from apps.testing import QueryBudgetMixin
+
+
+class EnrolleeViewTestCase(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='employer@test.com', password='pw', username='emp')
+        profile = UserProfile.objects.create(user=self.user, role='EMPLOYER', phone='08100000001')
+        self.employer = profile.employer_profile
+        self.plans = [
+            Plan.objects.create(
+                plan_code=f'PLAN00{i}', name=f'Plan {i}', description='Coverage',
+                annual_cap=1000000.00, visit_cap=10,
+                covered_services=['consultation'], co_pay_rules={'consultation': 1000}
+            )
+            for i in range(2)
+        ]
+        self.enrollees = [
+            Enrollees.objects.create(
+                first_name=f'First{i}', last_name='Last', gender='M',
+                phone=f'080100000{i:02d}', employer=self.employer,
+                plan=self.plans[i % 2] if i < 5 else None
+            )
+            for i in range(6)
+        ]
+        self.client.force_authenticate(user=self.user)
+
+
+class PlanSidecarTest(EnrolleeViewTestCase):
+    def test_plans_sent_once_alongside_enrollees(self):
+        url = reverse('enrollee-list-create')
+        with self.assertMaxQueries(5):
+            response = self.client.get(url, {'expand': 'plans:sidecar'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        results = response.data['results']
+        self.assertEqual(len(results), 6)
+        self.assertNotIn('plan_details', results[0])
+        self.assertEqual(
+            set(response.data['plans']),
+            {str(plan.id) for plan in self.plans}
+        )
+        for enrollee in results:
+            if enrollee['plan']:
+                plan = response.data['plans'][str(enrollee['plan'])]
+                self.assertEqual(plan['id'], str(enrollee['plan']))
+
+    def test_default_shape_nests_plan(self):
+        response = self.client.get(reverse('enrollee-list-create'))
+        self.assertIn('plan_details', response.data['results'][0])
+        self.assertNotIn('plans', response.data)
+
+
+class CoverageFilterTest(EnrolleeViewTestCase):
+    def test_lists_only_active_coverage(self):
+        covered = self.enrollees[0]
+        covered.coverage_start = '2000-01-01'
+        covered.coverage_end = '2999-12-31'
+        covered.save()
+
+        response = self.client.get(reverse('enrollee-list-create'), {'coverage': 'active'})
+
+        self.assertEqual(
+            [(e['id'], e['coverage_active']) for e in response.data['results']],
+            [(str(covered.id), True)]
+        )
+
+
+class ExportTest(EnrolleeViewTestCase):
+    url = reverse('enrollee-export')
+
+    def _content(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b''.join(response.streaming_content)
+
+    def test_csv(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(self._content(response).decode().splitlines()))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0]['phone'], '08010000000')
+        self.assertEqual(rows[0]['plan_id'], str(self.plans[0].id))
+
+    def test_ndjson(self):
+        response = self.client.get(self.url, {'file_format': 'ndjson'})
+        lines = self._content(response).decode().splitlines()
+        self.assertEqual(len(lines), 6)
+        self.assertEqual(json.loads(lines[-1])['first_name'], 'First5')
+
+    @skipUnless(parquet_available(), 'pyarrow is not installed')
+    def test_parquet(self):
+        import pyarrow.parquet as pq
+        response = self.client.get(self.url, {'file_format': 'parquet'})
+        table = pq.read_table(io.BytesIO(self._content(response)))
+        self.assertEqual(table.num_rows, 6)
+        self.assertEqual(table.column('enrollee_id').to_pylist(), [
+            enrollee.enrollee_id for enrollee in self.enrollees
+        ])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Checks the Postgres plan')
+    def test_rows_stream_off_the_index_unsorted(self):
+        # Only an index scan that yields the rows in order avoids the sort
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('SET LOCAL enable_sort = off')
+            try:
+                plan = Enrollees.objects.filter(employer=self.employer).order_by(*EXPORT_ORDERING).explain()
+            finally:
+                cursor.execute('RESET enable_seqscan')
+                cursor.execute('RESET enable_sort')
+        self.assertIn('Index Scan Backward', plan)
+        self.assertNotIn('Sort', plan)
+
+    def test_unsupported_format(self):
+        response = self.client.get(self.url, {'file_format': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BulkStatusTransitionTest(EnrolleeViewTestCase):
+    url = reverse('enrollee-bulk-status')
+
+    def test_terminates_listed_enrollees(self):
+        other = UserProfile.objects.create(
+            user=User.objects.create_user(email='other@test.com', password='pw', username='other'),
+            role='EMPLOYER', phone='08100000002'
+        ).employer_profile
+        foreign = Enrollees.objects.create(
+            first_name='Chi', last_name='Ude', gender='M', phone='08055555555', employer=other
+        )
+        first, second, suspended = self.enrollees[:3]
+        Enrollees.objects.filter(pk=suspended.pk).update(status='TERMINATED')
+
+        with self.assertMaxQueries(6):
+            response = self.client.post(self.url, {
+                'enrollee_ids': [
+                    first.enrollee_id, second.enrollee_id, suspended.enrollee_id,
+                    foreign.enrollee_id, 'HL-000000-0000',
+                ],
+                'status': 'TERMINATED',
+                'effective_date': '2024-01-31',
+            }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {
+            'affected': 2,
+            'skipped': [suspended.enrollee_id],
+            'not_found': [foreign.enrollee_id, 'HL-000000-0000'],
+        })
+        first.refresh_from_db()
+        self.assertEqual(
+            (first.status, str(first.status_effective_date), first.coverage_active),
+            ('TERMINATED', '2024-01-31', False)
+        )
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.status, 'ACTIVE')
+
+    def test_suspends_by_filter(self):
+        response = self.client.post(self.url, {
+            'filter': {'plan': str(self.plans[0].id)},
+            'status': 'SUSPENDED',
+        }, format='json')
+
+        self.assertEqual(response.data['affected'], 3)
+        self.assertEqual(
+            set(Enrollees.objects.filter(status='SUSPENDED').values_list('plan', flat=True)),
+            {self.plans[0].id}
+        )
+
+        # Enrollees already suspended are left out, not listed
+        response = self.client.post(self.url, {
+            'filter': {'plan': str(self.plans[0].id)},
+            'status': 'SUSPENDED',
+        }, format='json')
+        self.assertEqual((response.data['affected'], response.data['skipped']), (0, []))
+
+    def test_rejects_invalid_requests(self):
+        for body in (
+            {'status': 'TERMINATED'},
+            {'filter': {}, 'status': 'TERMINATED'},
+            {'enrollee_ids': ['X'], 'filter': {}, 'status': 'TERMINATED'},
+            {'enrollee_ids': ['X'], 'status': 'RETIRED'},
+            {'enrollee_ids': ['X'], 'status': 'TERMINATED', 'effective_date': '2999-01-01'},
+        ):
+            response = self.client.post(self.url, body, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, body)
+        self.assertFalse(Enrollees.objects.exclude(status='ACTIVE').exists())
+
+
+class ConditionalGetTest(EnrolleeViewTestCase):
+    def test_detail(self):
+        enrollee = self.enrollees[0]
+        url = reverse('enrollee-detail', args=[enrollee.enrollee_id])
+        response = self.client.get(url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        enrollee.plan.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list(self):
+        url = reverse('enrollee-list-create')
+        response = self.client.get(url)
+        etag = response['ETag']
+        # A deletion would not advance a Last-Modified
+        self.assertFalse(response.has_header('Last-Modified'))
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        # Other pages and shapes have their own validators
+        response = self.client.get(url, {'page_size': 2}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.enrollees[-1].delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 5)
@@ -0,0 +1,62 @@
+from django.db import transaction
+from django.db.models import Case, Value, When
+from django.utils import timezone
+
+from apps.enrollees.models import Enrollees
+from apps.enrollees.signals import enrollees_bulk_changed
+
+
+def transition_status(employer, status, effective_date=None, enrollee_ids=None, filters=None):
+    """
+    Move an employer's enrollees, picked by `enrollee_ids` or by queryset
+    `filters`, to `status` with a single UPDATE.
+
+    Returns the number of enrollees `affected` and, for an ID list, the
+    `skipped` enrollee IDs that already had the status and the IDs
+    `not_found` among the employer's enrollees. A filter leaves out the
+    enrollees already in the status instead of listing them.
+    """
+    today = timezone.now().date()
+    effective_date = effective_date or today
+    queryset = Enrollees.objects.filter(employer=employer)
+    if enrollee_ids is not None:
+        queryset = queryset.filter(enrollee_id__in=enrollee_ids)
+    else:
+        queryset = queryset.filter(**filters).exclude(status=status)
+
+    if status == 'ACTIVE':
+        # The status column still holds the old value inside the UPDATE, so
+        # only the coverage dates decide here.
+        coverage_active = Case(
+            When(coverage_start__lte=today, coverage_end__gte=today, then=Value(True)),
+            default=Value(False),
+        )
+    else:
+        coverage_active = Value(False)
+
+    with transaction.atomic():
+        rows = list(queryset.select_for_update().values_list('id', 'enrollee_id', 'status'))
+        pks = [pk for pk, _, current in rows if current != status]
+        affected = 0
+        if pks:
+            affected = Enrollees.objects.filter(id__in=pks).update(
+                status=status,
+                status_effective_date=effective_date,
+                coverage_active=coverage_active,
+                updated_at=timezone.now(),
+            )
+            transaction.on_commit(
+                lambda: enrollees_bulk_changed.send(sender=Enrollees, enrollee_ids=pks)
+            )
+
+    not_found = []
+    if enrollee_ids is not None:
+        found = {enrollee_id for _, enrollee_id, _ in rows}
+        not_found = [
+            enrollee_id for enrollee_id in dict.fromkeys(enrollee_ids) if enrollee_id not in found
+        ]
+    return {
+        'affected': affected,
+        'skipped': [enrollee_id for _, enrollee_id, current in rows if current == status],
+        'not_found': not_found,
+    }
@@ -4,6 +4,12 @@ from . import views
 
 urlpatterns = [
     path('', views.enrollees_list_create, name='enrollee-list-create'),
+    path('bulk-status/', views.bulk_status_transition, name='enrollee-bulk-status'),
+    path('changes/', views.enrollee_changes, name='enrollee-changes'),
+    path('provision-accounts/', views.provision_accounts, name='enrollee-provision-accounts'),
+    path('export/', views.export_enrollees, name='enrollee-export'),
     path('bulk-upload/', views.bulk_upload_enrollee, name='bulk-upload'),
+    path('bulk-upload/<uuid:job_id>/', views.bulk_upload_status, name='bulk-upload-status'),
+    path('bulk-upload/<uuid:job_id>/errors/', views.bulk_upload_errors, name='bulk-upload-errors'),
     path('<str:enrollee_id>/', views.enrollee_detail, name='enrollee-detail'),
 ]
\ No newline at end of file
@@ -1,15 +1,142 @@
+import datetime
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import islice
+
+import openpyxl
 import pandas as pd
+import phonenumbers
+from django.conf import settings
 
 
-def read_csv(file):
+def iter_chunks(file, chunk_size):
     """
-    Read CSV or Excel file and return pandas DataFrame
+    Yield the rows of an uploaded CSV or Excel file as DataFrames of at
+    most `chunk_size` rows, reading the upload stream as it goes. Every cell
+    is read as a string so values such as phone numbers keep their leading
+    zeros; empty cells become ''.
     """
-    file = file.name.lower()
+    file_name = file.name.lower()
 
-    if file.endswith('.csv'):
-        return pd.read_csv(file)
-    elif file_name.endswith(('.xls', '.xlsx')):
-        return pd.read_excel(file)
+    if file_name.endswith('.csv'):
+        yield from pd.read_csv(
+            file, dtype=str, keep_default_na=False, chunksize=chunk_size
+        )
+    elif file_name.endswith('.xlsx'):
+        yield from iter_xlsx_chunks(file, chunk_size)
+    elif file_name.endswith('.xls'):
+        # Legacy workbooks cannot be streamed; they are capped in size anyway.
+        df = pd.read_excel(file, dtype=str, keep_default_na=False)
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
     else:
         raise ValueError("Unsupported file format. Use CSV or Excel.")
+
+
+def iter_xlsx_chunks(file, chunk_size):
+    """
+    Stream the first worksheet with openpyxl's read-only mode, which parses
+    rows lazily instead of loading the whole workbook. Blank rows, such as
+    formatted but empty trailing rows, are skipped; the index keeps each
+    row's position in the sheet.
+    """
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [cell_to_str(value) for value in header]
+
+        rows = (
+            (index, values)
+            for index, row in enumerate(rows)
+            if any(values := [cell_to_str(value) for value in row])
+        )
+        while batch := list(islice(rows, chunk_size)):
+            yield pd.DataFrame(
+                [values for _, values in batch],
+                columns=columns,
+                index=[index for index, _ in batch],
+                dtype=str,
+            )
+    finally:
+        workbook.close()
+
+
+def cell_to_str(value):
+    """
+    Render an Excel cell the way it would appear in a CSV export.
+    """
+    if value is None:
+        return ''
+    if isinstance(value, datetime.datetime):
+        if value.time() == datetime.time():
+            return value.date().isoformat()
+        return value.isoformat()
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+@lru_cache(maxsize=65536)
+def normalize_phone(value, region=None):
+    """
+    Return `value` in E.164 form (+2348012345678), or None when it is not a
+    possible phone number. Numbers without a country code are read as
+    local to `region` (default: settings.PHONE_REGION). Memoized, since
+    rosters repeat the same numbers across uploads and lookups.
+    """
+    try:
+        number = phonenumbers.parse(value, region or settings.PHONE_REGION)
+    except phonenumbers.NumberParseException:
+        return None
+    if not phonenumbers.is_possible_number(number):
+        return None
+    return phonenumbers.format_number(number, phonenumbers.PhoneNumberFormat.E164)
+
+
+class StageTimer:
+    """
+    Accumulates wall-clock seconds per named stage of a bulk operation:
+
+        with timer.stage('validate'):
+            ...
+    """
+    def __init__(self):
+        self.seconds = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = self.seconds.get(name, 0) + time.perf_counter() - start
+
+    def iterate(self, name, iterable):
+        """
+        Yield from `iterable`, timing the production of each item as `name`.
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                item = next(iterator, StopIteration)
+            if item is StopIteration:
+                return
+            yield item
+
+    def as_dict(self):
+        return {name: round(seconds, 3) for name, seconds in self.seconds.items()}
+
+
+class Echo:
+    """
+    File-like object that returns what is written to it, so csv.writer
+    can feed a StreamingHttpResponse row by row.
+    """
+    def write(self, value):
+        return value
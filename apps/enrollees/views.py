@@ -1,30 +1,93 @@
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes, parser_classes
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import IsAuthenticated
+from apps.accounts.authentication import role_profile_id
 from apps.accounts.permissions import IsEmployer
-from apps.enrollees.models import Enrollees
-from apps.enrollees.serializers import EnrolleeSerializer, EnrolleeCreateSerializer
-import pandas as pd
+from apps.enrollees.models import Enrollees, EnrolleeImportJob
+from apps.enrollees.serializers import (
+    EnrolleeAccountProvisioningSerializer,
+    EnrolleeSerializer,
+    EnrolleeCreateSerializer,
+    EnrolleeImportJobSerializer,
+    EnrolleeSidecarSerializer,
+    EnrolleeStatusFilterSerializer,
+    EnrolleeStatusTransitionSerializer
+)
+from apps.plans.models import Plan
+from apps.plans.serializers import PlanSerializer
 from rest_framework.parsers import MultiPartParser
-from django.db import transaction
-from .utils import read_csv
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+import csv
+import datetime
+from .conditional import enrollee_validators, list_validators, not_modified, set_validators
+from .coverage import covered_enrollees
+from .exports import EXPORT_FORMATS, parquet_available, roster_rows
+from .importer import REQUIRED_COLUMNS, OPTIONAL_COLUMNS
+from .pagination import EnrolleeChangeFeedPagination, EnrolleeCursorPagination, change_feed_horizon
+from .transitions import transition_status
+from .utils import Echo
 
 
 
+def current_employer_id(request):
+    """
+    ID of the requesting employer's EmployerProfile, from the token claims
+    when present.
+    """
+    employer_id = role_profile_id(request.user)
+    if employer_id is None:
+        raise PermissionDenied("No employer profile for this account")
+    return employer_id
+
+
 @api_view(['POST', 'GET'])
 @permission_classes([IsAuthenticated, IsEmployer])
 def enrollees_list_create(request):
     """
-    GET: List all enrollees for the logged-in employer
+    GET: List the logged-in employer's enrollees, newest first, one
+         cursor page at a time (?cursor=..., ?page_size=...).
+         ?expand=plans:sidecar returns each distinct plan once in a
+         top-level `plans` map instead of nesting it in every enrollee.
+         ?coverage=active lists only enrollees with active coverage.
+         Conditional requests (If-None-Match) get a 304 when nothing in
+         the list changed.
     POST: Create new enrollee
     """
     if request.method == "GET":
         enrollees = Enrollees.objects.filter(
-            employer=request.user.profile.employer_profile
+            employer_id=current_employer_id(request)
+        )
+        if request.query_params.get('coverage') == 'active':
+            enrollees = covered_enrollees(enrollees)
+        etag, last_modified = list_validators(enrollees, request)
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        paginator = EnrolleeCursorPagination()
+        expand = request.query_params.get('expand', '').split(',')
+
+        if 'plans:sidecar' in expand:
+            page = paginator.paginate_queryset(enrollees, request)
+            serializer = EnrolleeSidecarSerializer(page, many=True)
+            response = paginator.get_paginated_response(serializer.data)
+            plans = Plan.objects.filter(
+                id__in={enrollee.plan_id for enrollee in page if enrollee.plan_id}
+            )
+            response.data['plans'] = {
+                plan['id']: plan for plan in PlanSerializer(plans, many=True).data
+            }
+            return set_validators(response, etag, last_modified)
+
+        page = paginator.paginate_queryset(enrollees.select_related('plan'), request)
+        serializer = EnrolleeSerializer(page, many=True)
+        return set_validators(
+            paginator.get_paginated_response(serializer.data), etag, last_modified
         )
-        serializer = EnrolleeSerializer(enrollees, many=True)
-        return Response(serializer.data)
     elif request.method == "POST":
         serializer = EnrolleeCreateSerializer(
             data=request.data, context={'request': request}
@@ -34,11 +97,61 @@ def enrollees_list_create(request):
             return Response(EnrolleeSerializer(enrollee).data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsEmployer])
+def enrollee_changes(request):
+    """
+    Change feed of the employer's enrollees for incremental sync: the
+    enrollees created, updated or terminated after ?since=<cursor>, oldest
+    change first. Start without a cursor, then pass back the `cursor` of
+    each response; `has_more` tells whether to fetch again right away.
+    """
+    horizon = change_feed_horizon(
+        timezone.now(), datetime.timedelta(seconds=settings.ENROLLEE_CHANGE_FEED_LAG)
+    )
+    enrollees = Enrollees.objects.filter(
+        employer_id=current_employer_id(request), updated_at__lte=horizon
+    )
+    paginator = EnrolleeChangeFeedPagination()
+    page = paginator.paginate_queryset(enrollees, request)
+    serializer = EnrolleeSidecarSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsEmployer])
+def export_enrollees(request):
+    """
+    Stream the employer's whole roster (?file_format=csv|ndjson|parquet).
+    Rows come from a server-side cursor, so memory stays flat for any size.
+    """
+    file_format = request.query_params.get('file_format', 'csv')
+    if file_format not in EXPORT_FORMATS:
+        return Response(
+            {"error": f"Unsupported export format. Use one of: {', '.join(EXPORT_FORMATS)}."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if file_format == 'parquet' and not parquet_available():
+        return Response(
+            {"error": "Parquet export is not available on this server"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    exporter, content_type, extension = EXPORT_FORMATS[file_format]
+    rows = roster_rows(
+        Enrollees.objects.filter(employer_id=current_employer_id(request))
+    )
+    response = StreamingHttpResponse(
+        exporter(rows, settings.ENROLLEE_EXPORT_CHUNK_SIZE),
+        content_type=content_type
+    )
+    response['Content-Disposition'] = f'attachment; filename="enrollees.{extension}"'
+    return response
+
 @api_view(['GET', 'PUT', 'DELETE', 'PATCH'])
 @permission_classes([IsAuthenticated, IsEmployer])
 def enrollee_detail(request, enrollee_id):
     try:
-        enrollee = Enrollees.objects.get(enrollee_id=enrollee_id)
+        enrollee = Enrollees.objects.select_related('plan').get(enrollee_id=enrollee_id)
     except Enrollees.DoesNotExist:
         return Response(
             {"error": "Enrollee not found"},
@@ -46,15 +159,19 @@ def enrollee_detail(request, enrollee_id):
         )
     
     # Check ownership
-    if enrollee.employer != request.user.profile.employer_profile:
+    if enrollee.employer_id != current_employer_id(request):
         return Response(
             {"error": "Enrollee does not belong to this employer"},
             status=status.HTTP_403_FORBIDDEN
         )
     
     if request.method == 'GET':
+        etag, last_modified = enrollee_validators(enrollee)
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
         serializer = EnrolleeSerializer(enrollee)
-        return Response(serializer.data)
+        return set_validators(Response(serializer.data), etag, last_modified)
     
     elif request.method == 'PUT' or request.method == 'PATCH':
         serializer = EnrolleeSerializer(enrollee, data=request.data, partial=True)
@@ -65,19 +182,81 @@ def enrollee_detail(request, enrollee_id):
     
     elif request.method == 'DELETE':
         enrollee.status = 'TERMINATED'
+        enrollee.status_effective_date = timezone.now().date()
         enrollee.save()
         return Response(
             {"message": "Enrollee terminated successfully"},
             status=status.HTTP_200_OK
         )
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsEmployer])
+def bulk_status_transition(request):
+    """
+    Suspend, terminate or reactivate many enrollees at once.
+
+    Body: {"enrollee_ids": [...]} or {"filter": {"status", "plan",
+    "coverage_end_before"}}, plus "status" and an optional "effective_date"
+    (YYYY-MM-DD, today by default). Applied with one UPDATE scoped to the
+    employer; reports the affected count and, for enrollee_ids, the skipped
+    (already in the status) and not-found IDs. The filter needs at least one
+    criterion.
+    """
+    serializer = EnrolleeStatusTransitionSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    data = serializer.validated_data
+    filters = None
+    if 'filter' in data:
+        filters = EnrolleeStatusFilterSerializer.to_lookups(data['filter'])
+    result = transition_status(
+        current_employer_id(request),
+        data['status'],
+        effective_date=data.get('effective_date'),
+        enrollee_ids=data.get('enrollee_ids'),
+        filters=filters,
+    )
+    return Response(result, status=status.HTTP_200_OK)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsEmployer])
+def provision_accounts(request):
+    """
+    Queue the creation of portal accounts for the employer's enrollees: all
+    the non-terminated ones with an email, or {"enrollee_ids": [...]}. The
+    import worker links each new account to its enrollee record and emails
+    it an invite to set its password at auth/accept-invite/. Enrollees who
+    already registered are linked to their account instead. The job's
+    progress and created/linked/skipped counts are served by
+    bulk-upload/<job_id>/.
+    """
+    serializer = EnrolleeAccountProvisioningSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    job = EnrolleeImportJob.objects.create(
+        employer_id=current_employer_id(request),
+        mode='PROVISION',
+        enrollee_ids=serializer.validated_data.get('enrollee_ids'),
+    )
+    return Response(
+        EnrolleeImportJobSerializer(job).data,
+        status=status.HTTP_202_ACCEPTED
+    )
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, IsEmployer])
 @parser_classes([MultiPartParser])
 def bulk_upload_enrollee(request):
     """
-    Upload CSV/Excel file with multiple enrollees
-    Expected columns: first_name, last_name, dob, gender, phone, email, plan_id
+    Queue a CSV/Excel file with multiple enrollees for the import worker.
+    Expected columns: first_name, last_name, dob, gender, phone, email,
+    national_id, address, plan_id (optional: status, coverage_start, coverage_end)
+
+    With mode=SYNC the file is treated as the full roster: matching enrollees
+    are updated, new ones inserted and missing ones terminated. Pass
+    dry_run=true to only get the summary of those changes.
     """
 
     file = request.FILES.get('file')
@@ -86,89 +265,80 @@ def bulk_upload_enrollee(request):
             {"error": "No file uploaded"},
             status=status.HTTP_400_BAD_REQUEST
         )
-    
-    # Call helper function
-    df = read_csv(file)
-    
-    required_columns = [
-        'first_name',
-        'last_name',
-        'dob',
-        'gender',
-        'phone',
-        'plan_id',
-        'email',
-        'national_id',
-        'address'
-    ]
-    value = all(column in df.columns for column in required_columns)
-    if not value:
+
+    if not file.name.lower().endswith(('.csv', '.xls', '.xlsx')):
         return Response(
-            {"error": "File must contain all required columns"},
+            {"error": "Unsupported file format. Use CSV or Excel."},
             status=status.HTTP_400_BAD_REQUEST
         )
-    
-    employer = request.user.profile.employer_profile
-    created = 0
-    errors = []
-
-    for index, row in df.iterrows():
-        try:
-            with transaction.atomic():
-                first_name = row['first_name']
-                last_name = row['last_name']
-                dob = row['dob']
-                gender = row['gender']
-                phone = row['phone']
-                email = row['email']
-                national_id = row['national_id']
-                address = row['address']
-                plan = row['plan_id']
-                enrollee_status = row['status']
-                coverage_start = row['coverage_start']
-                coverage_end = row['coverage_end']
-
-                serializer = EnrolleeCreateSerializer(data={
-                    'first_name': first_name,
-                    'last_name': last_name,
-                    'dob': dob,
-                    'gender': gender,
-                    'phone': phone,
-                    'email': email,
-                    'national_id': national_id,
-                    'address': address,
-                    'plan': plan,
-                    'status': enrollee_status,
-                    'coverage_start': coverage_start,
-                    'coverage_end': coverage_end
-                }, context={'request': request})
-                if serializer.is_valid():
-                    serializer.save()
-                    created += 1
-                else:
-                    errors.append({
-                        'row': index + 2,  # +2 for header row and 0-indexing
-                        'data': row.to_dict(),
-                        'errors': serializer.errors
-                    })
-        
-        except Exception as e:
-            errors.append({
-                'row': index + 2,
-                'error': str(e),
-                'data': row.to_dict()
-            })
-    
+
+    mode = request.data.get('mode', 'CREATE').upper()
+    if mode not in ('CREATE', 'SYNC'):
+        return Response(
+            {"error": "Invalid mode. Use CREATE or SYNC."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    job = EnrolleeImportJob.objects.create(
+        employer_id=current_employer_id(request),
+        file=file,
+        mode=mode,
+        dry_run=str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+    )
     return Response(
-        {
-            'message': f'Bulk upload completed',
-            'total_rows': len(df),
-            'created': created,
-            'failed': len(errors),
-            'errors': errors[:10]  # Return only first 10 errors to avoid huge response
-        },
-        status=status.HTTP_201_CREATED if created > 0 else status.HTTP_400_BAD_REQUEST
+        EnrolleeImportJobSerializer(job).data,
+        status=status.HTTP_202_ACCEPTED
     )
-            
 
-            
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsEmployer])
+def bulk_upload_status(request, job_id):
+    """
+    Report the progress of a bulk upload job.
+    """
+    try:
+        job = EnrolleeImportJob.objects.get(
+            id=job_id, employer_id=current_employer_id(request)
+        )
+    except EnrolleeImportJob.DoesNotExist:
+        return Response(
+            {"error": "Import job not found"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    return Response(EnrolleeImportJobSerializer(job).data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsEmployer])
+def bulk_upload_errors(request, job_id):
+    """
+    Stream the full error report of a bulk upload job as CSV.
+    """
+    try:
+        job = EnrolleeImportJob.objects.get(
+            id=job_id, employer_id=current_employer_id(request)
+        )
+    except EnrolleeImportJob.DoesNotExist:
+        return Response(
+            {"error": "Import job not found"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    columns = REQUIRED_COLUMNS + OPTIONAL_COLUMNS
+    writer = csv.writer(Echo())
+
+    def rows():
+        yield writer.writerow(['row', 'errors'] + columns)
+        for error in job.errors.order_by('row').iterator(chunk_size=2000):
+            messages = '; '.join(
+                f"{field}: {' '.join(map(str, field_errors))}"
+                for field, field_errors in error.errors.items()
+            )
+            yield writer.writerow(
+                [error.row, messages] + [error.data.get(column) for column in columns]
+            )
+
+    response = StreamingHttpResponse(rows(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="import-{job.id}-errors.csv"'
+    return response
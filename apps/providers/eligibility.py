@@ -0,0 +1,277 @@
+import datetime
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+
+from apps.cache_stats import record, stats
+from apps.enrollees.models import Enrollees
+from apps.enrollees.utils import normalize_phone
+
+CACHE_PREFIX = 'eligibility'
+
+# Request identifier -> normalized lookup column on Enrollees
+IDENTIFIER_FIELDS = {
+    'phone': 'phone_e164',
+    'email': 'email_lower',
+    'enrollee_id': 'enrollee_id_upper',
+}
+
+
+def normalize_identifiers(phone=None, email=None, enrollee_id=None):
+    """
+    Normalize the identifiers of a verification request the same way the
+    lookup columns are, dropping the ones that were not given.
+    """
+    identifiers = {}
+    if phone:
+        identifiers['phone'] = normalize_phone(phone) or phone
+    if email:
+        identifiers['email'] = email.lower()
+    if enrollee_id:
+        identifiers['enrollee_id'] = enrollee_id.upper()
+    return identifiers
+
+
+def lookup_query(identifiers):
+    query = Q()
+    for name, value in identifiers.items():
+        query |= Q(**{IDENTIFIER_FIELDS[name]: value})
+    return query
+
+
+def verify_identifiers(identifiers):
+    """
+    Return the cached (data, status) eligibility result for normalized
+    identifiers, resolving and caching it on a miss.
+    """
+    key = cache_key(identifiers)
+    entry = cache.get(key)
+    if entry is not None:
+        result, generations = entry
+        if current_generations(list(generations)) == generations:
+            record(CACHE_PREFIX, 'hits')
+            return result
+
+    record(CACHE_PREFIX, 'misses')
+    # Taken before the lookup, so a change committed meanwhile is not missed
+    generations = current_generations(
+        [generation_key(name, value) for name, value in identifiers.items()]
+    )
+    enrollee = (
+        Enrollees.objects.select_related('plan')
+        .filter(lookup_query(identifiers))
+        .first()
+    )
+    result = eligibility_result(enrollee)
+    store(key, result, generations, enrollee)
+    return result
+
+
+def eligibility_result(enrollee):
+    """
+    Build the verify_user response body and status for an enrollee, or for
+    no match when `enrollee` is None.
+    """
+    if not enrollee:
+        return {'error': 'User not found'}, status.HTTP_404_NOT_FOUND
+
+    # -----------------------------
+    # Check coverage
+    # -----------------------------
+    if not enrollee.is_coverage_active() or enrollee.plan is None:
+        return (
+            {"status": "inactive", "message": "Coverage is not active"},
+            status.HTTP_403_FORBIDDEN
+        )
+
+    # -----------------------------
+    # Return coverage details
+    # -----------------------------
+    annual_cap = enrollee.plan.annual_cap
+    used_amount = 0
+    remaining = annual_cap - used_amount
+
+    response_data = {
+        "status": "active",
+        "enrollee": {
+            "id": str(enrollee.id),
+            "enrollee_id": enrollee.enrollee_id,
+            "name": f"{enrollee.first_name} {enrollee.last_name}",
+            "dob": enrollee.dob,
+            "phone": enrollee.phone,
+            "email": enrollee.email,
+        },
+        "plan": {
+            "name": enrollee.plan.name,
+            "annual_cap": float(annual_cap),
+        },
+        "balance": {
+            "annual_cap": float(annual_cap),
+            "used": float(used_amount),
+            "remaining": float(remaining),
+            "percentage_used": (used_amount / annual_cap * 100) if annual_cap > 0 else 0
+        },
+        "coverage": {
+            "start_date": enrollee.coverage_start,
+            "end_date": enrollee.coverage_end,
+            "days_remaining": (enrollee.coverage_end - timezone.now().date()).days
+        }
+    }
+    return response_data, status.HTTP_200_OK
+
+
+def cache_key(identifiers):
+    return f'{CACHE_PREFIX}:result:' + '|'.join(
+        f'{name}={identifiers[name]}' for name in sorted(identifiers)
+    )
+
+
+def generation_key(kind, value):
+    return f'{CACHE_PREFIX}:generation:{kind}:{value}'
+
+
+def current_generations(keys):
+    """
+    Current generation of each key. Missing generations are created with a
+    random value, so an evicted one cannot make an old entry look current.
+    """
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, new_generation(), timeout=None)
+            generations[key] = cache.get(key)
+    return generations
+
+
+def new_generation():
+    return uuid.uuid4().hex
+
+
+def store(key, result, generations, enrollee):
+    """
+    Cache a result along with the generations it depends on: the
+    identifiers it was looked up by (a new enrollee may take them), the
+    matched enrollee and its plan. Invalidation bumps a generation, which
+    turns every entry recorded against it into a miss.
+    """
+    if enrollee is not None:
+        dependencies = [generation_key('enrollee', enrollee.pk)]
+        if enrollee.plan_id:
+            dependencies.append(generation_key('plan', enrollee.plan_id))
+        generations = {**generations, **current_generations(dependencies)}
+    cache.set(key, (result, generations), cache_timeout())
+
+
+def cache_timeout():
+    """
+    Entries never outlive the day: days_remaining is computed from today.
+    """
+    now = timezone.localtime()
+    midnight = datetime.datetime.combine(
+        now.date() + datetime.timedelta(days=1), datetime.time(), tzinfo=now.tzinfo
+    )
+    return max(1, min(settings.ELIGIBILITY_CACHE_TIMEOUT, int((midnight - now).total_seconds())))
+
+
+def invalidate(keys):
+    """
+    Move the generations behind `keys` to fresh random values, in one round
+    trip, once the current transaction commits. Concurrent writers cannot
+    lose an invalidation: whichever value wins, it differs from the one
+    recorded by the entries it replaces. Bumping before the commit would let
+    a reader cache the old row under the new generation.
+    """
+    if keys:
+        transaction.on_commit(
+            lambda: cache.set_many({key: new_generation() for key in keys}, timeout=None)
+        )
+
+
+def invalidate_enrollees(enrollees):
+    """
+    Drop the cached results that matched, or could now match, the given
+    enrollees. Accepts Enrollees instances or dicts of their lookup fields.
+    """
+    keys = []
+    for enrollee in enrollees:
+        if isinstance(enrollee, Enrollees):
+            enrollee = {
+                'id': enrollee.pk,
+                **{field: getattr(enrollee, field) for field in IDENTIFIER_FIELDS.values()}
+            }
+        keys.append(generation_key('enrollee', enrollee['id']))
+        keys.extend(
+            generation_key(name, enrollee[field])
+            for name, field in IDENTIFIER_FIELDS.items() if enrollee[field]
+        )
+    invalidate(keys)
+
+
+def invalidate_plan(plan):
+    invalidate([generation_key('plan', plan.pk)])
+
+
+def cache_stats():
+    return stats(CACHE_PREFIX)
+
+
+def verify_batch(items, batch_size=1000):
+    """
+    Verify many identifier sets at once. `items` are dicts of phone/email/
+    enrollee_id; results come back in input order with `index` set. Lookups
+    are resolved with one IN query per `batch_size` identifiers.
+    """
+    normalized = [
+        normalize_identifiers(**{
+            name: str(item.get(name) or '').strip() for name in IDENTIFIER_FIELDS
+        }) if isinstance(item, dict) else {}
+        for item in items
+    ]
+
+    values = {name: set() for name in IDENTIFIER_FIELDS}
+    for identifiers in normalized:
+        for name, value in identifiers.items():
+            values[name].add(value)
+
+    matches = {name: {} for name in IDENTIFIER_FIELDS}
+    pending = [(name, value) for name, names in values.items() for value in names]
+    for start in range(0, len(pending), batch_size):
+        batch = {}
+        for name, value in pending[start:start + batch_size]:
+            batch.setdefault(IDENTIFIER_FIELDS[name], []).append(value)
+        query = Q()
+        for field, field_values in batch.items():
+            query |= Q(**{f'{field}__in': field_values})
+        for enrollee in Enrollees.objects.select_related('plan').filter(query):
+            for name, field in IDENTIFIER_FIELDS.items():
+                value = getattr(enrollee, field)
+                current = matches[name].get(value)
+                # Same tie-break as verify_user: the newest enrollee wins.
+                if value and (current is None or enrollee.created_at > current.created_at):
+                    matches[name][value] = enrollee
+
+    results = []
+    for index, identifiers in enumerate(normalized):
+        if not identifiers:
+            results.append({
+                'index': index,
+                'status': 'invalid',
+                'error': 'At least one of phone, email or enrollee_id is required',
+            })
+            continue
+
+        candidates = [
+            matches[name][value] for name, value in identifiers.items()
+            if value in matches[name]
+        ]
+        enrollee = max(candidates, key=lambda enrollee: enrollee.created_at, default=None)
+        data, status_code = eligibility_result(enrollee)
+        if status_code == status.HTTP_404_NOT_FOUND:
+            data = {'status': 'not_found', **data}
+        results.append({'index': index, **data})
+    return results
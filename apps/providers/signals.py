@@ -1,20 +1,37 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from apps.accounts.models import UserProfile
+from apps.accounts.signals import invalidate_role_profile
+from apps.enrollees.models import Enrollees
+from apps.enrollees.signals import enrollees_bulk_changed
+from apps.plans.models import Plan
+from apps.providers.eligibility import IDENTIFIER_FIELDS, invalidate_enrollees, invalidate_plan
 from apps.providers.models import ProviderProfile
 
-@receiver(post_save, sender=UserProfile)
-def create_provider_profile(sender, instance, created, **kwargs):
+@receiver(post_save, sender=ProviderProfile)
+@receiver(post_delete, sender=ProviderProfile)
+def invalidate_provider_identity(sender, instance, **kwargs):
+    invalidate_role_profile(instance)
+
+
+@receiver(post_save, sender=Enrollees)
+@receiver(post_delete, sender=Enrollees)
+def invalidate_enrollee_eligibility(sender, instance, **kwargs):
     """
-    When a user registers as PROVIDER, create a basic Provider record.
-    They'll need to complete it with facility details later.
+    Drop cached verification results for the enrollee, including the ones
+    cached under identifiers it has just taken.
     """
-    if created and instance.role == 'PROVIDER':
-        ProviderProfile.objects.create(
-            user_profile=instance,
-            facility_name=f"Facility - {instance.user.email}",  # Placeholder
-            facility_type='HOSPITAL',  # Default
-            contact_phone=instance.phone or '',
-            contact_email=instance.user.email,
-            accreditation_status='PENDING'
-        )
\ No newline at end of file
+    invalidate_enrollees([instance])
+
+
+@receiver(enrollees_bulk_changed)
+def invalidate_bulk_eligibility(sender, enrollee_ids, **kwargs):
+    invalidate_enrollees(
+        Enrollees.objects.filter(id__in=enrollee_ids)
+        .values('id', *IDENTIFIER_FIELDS.values())
+    )
+
+
+@receiver(post_save, sender=Plan)
+@receiver(post_delete, sender=Plan)
+def invalidate_plan_eligibility(sender, instance, **kwargs):
+    invalidate_plan(instance)
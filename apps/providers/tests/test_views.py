@@ -0,0 +1,348 @@
+from datetime import timedelta
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from apps.accounts.models import User, UserProfile
+from apps.enrollees.models import Enrollees
+from apps.enrollees.search import fallback_search
+from apps.enrollees.signals import enrollees_bulk_changed
+from apps.plans.models import Plan
+from apps.providers.eligibility import cache_stats, generation_key
+
+
+class VerifyUserTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='clinic@test.com', password='pw', username='clinic')
+        UserProfile.objects.create(user=self.user, role='PROVIDER', phone='08100000009')
+        self.client.force_authenticate(user=self.user)
+
+        self.plan = Plan.objects.create(
+            plan_code='PLAN001',
+            name='Gold Plan',
+            description='Premium coverage',
+            annual_cap=1000000.00,
+            visit_cap=10,
+            covered_services=['consultation'],
+            co_pay_rules={'consultation': 1000}
+        )
+        today = timezone.now().date()
+        self.enrollee = Enrollees.objects.create(
+            enrollee_id='HL-240101-0001', first_name='Ada', last_name='Obi',
+            gender='F', phone='08011111111', email='Ada.Obi@Test.com', plan=self.plan,
+            coverage_start=today - timedelta(days=30), coverage_end=today + timedelta(days=30)
+        )
+        self.url = reverse('verify-user')
+
+    def test_lookup_columns_are_maintained_on_save(self):
+        self.assertEqual(self.enrollee.phone_e164, '+2348011111111')
+        self.assertEqual(self.enrollee.email_lower, 'ada.obi@test.com')
+        self.assertEqual(self.enrollee.enrollee_id_upper, 'HL-240101-0001')
+
+        self.enrollee.phone = '+234 802 222 2222'
+        self.enrollee.save()
+        self.enrollee.refresh_from_db()
+        self.assertEqual(self.enrollee.phone_e164, '+2348022222222')
+
+    def test_verifies_by_normalized_identifiers(self):
+        for data in (
+            {'phone': '+234 801 111 1111'},
+            {'phone': '08011111111'},
+            {'email': ' ada.obi@TEST.com'},
+            {'enrollee_id': 'hl-240101-0001'},
+            {'first_name': 'ada', 'last_name': 'OBI'},
+        ):
+            response = self.client.post(self.url, data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK, data)
+            self.assertEqual(response.data['enrollee']['enrollee_id'], 'HL-240101-0001')
+            self.assertEqual(response.data['status'], 'active')
+
+    def test_partial_identifiers_do_not_match(self):
+        response = self.client.post(self.url, {'phone': '0801111'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_names_must_match_exactly(self):
+        response = self.client.post(self.url, {'first_name': 'ada', 'last_name': 'obii'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('enrollee', response.data)
+
+    def test_name_lookup_uses_the_lowercased_name_index(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {'first_name': 'ADA', 'last_name': 'obi'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        sql = next(query['sql'] for query in queries if 'FROM "enrollees"' in query['sql'])
+        self.assertIn('LOWER("enrollees"."first_name") = ', sql)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                try:
+                    cursor.execute(f'EXPLAIN {sql}')
+                    plan = ' '.join(line for line, in cursor.fetchall())
+                finally:
+                    cursor.execute('RESET enable_seqscan')
+            self.assertIn('enrollees_name_lower_idx', plan)
+
+    def test_same_name_needs_dob(self):
+        self.enrollee.dob = '1990-01-01'
+        self.enrollee.save()
+        Enrollees.objects.create(
+            enrollee_id='HL-240101-0002', first_name='Ada', last_name='Obi', dob='1985-05-05',
+            gender='F', phone='08022222222', plan=self.plan
+        )
+        name = {'first_name': 'Ada', 'last_name': 'Obi'}
+        response = self.client.post(self.url, name, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        response = self.client.post(self.url, {**name, 'dob': '1990-01-01'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['enrollee']['enrollee_id'], 'HL-240101-0001')
+
+    def test_inactive_coverage(self):
+        self.enrollee.status = 'SUSPENDED'
+        self.enrollee.save()
+        response = self.client.post(self.url, {'email': 'ada.obi@test.com'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_requires_a_search_parameter(self):
+        response = self.client.post(self.url, {'first_name': 'Ada'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_requires_provider_role(self):
+        employer = User.objects.create_user(email='employer@test.com', password='pw', username='emp')
+        UserProfile.objects.create(user=employer, role='EMPLOYER', phone='08100000001')
+        self.client.force_authenticate(user=employer)
+        response = self.client.post(self.url, {'phone': '08011111111'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class VerificationCacheTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='clinic@test.com', password='pw', username='clinic')
+        UserProfile.objects.create(user=self.user, role='PROVIDER', phone='08100000009')
+        self.client.force_authenticate(user=self.user)
+
+        self.plan = Plan.objects.create(
+            plan_code='PLAN001',
+            name='Gold Plan',
+            description='Premium coverage',
+            annual_cap=1000000.00,
+            visit_cap=10,
+            covered_services=['consultation'],
+            co_pay_rules={'consultation': 1000}
+        )
+        today = timezone.now().date()
+        self.enrollee = Enrollees.objects.create(
+            enrollee_id='HL-240101-0001', first_name='Ada', last_name='Obi',
+            gender='F', phone='08011111111', email='ada@test.com', plan=self.plan,
+            coverage_start=today - timedelta(days=30), coverage_end=today + timedelta(days=30)
+        )
+        self.url = reverse('verify-user')
+
+    def verify(self, **data):
+        return self.client.post(self.url, data, format='json')
+
+    def test_repeat_verifications_are_served_from_cache(self):
+        self.verify(phone='08011111111')
+        with self.assertNumQueries(0):
+            self.verify(phone='+2348011111111')
+        response = self.verify(phone='08011111111')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(cache_stats()['hits'], 2)
+        self.assertEqual(cache_stats()['misses'], 1)
+
+    def test_enrollee_save_invalidates(self):
+        self.verify(phone='08011111111')
+        self.enrollee.status = 'SUSPENDED'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.enrollee.save()
+
+        self.assertEqual(self.verify(phone='08011111111').status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_invalidated_only_on_commit(self):
+        self.verify(phone='08011111111')
+        self.enrollee.status = 'SUSPENDED'
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.enrollee.save()
+        # Until the commit, readers keep the result of the committed row.
+        self.assertEqual(self.verify(phone='08011111111').status_code, status.HTTP_200_OK)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.verify(phone='08011111111').status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_identifier_change_invalidates_old_and_new_keys(self):
+        self.assertEqual(self.verify(phone='08022222222').status_code, status.HTTP_404_NOT_FOUND)
+        self.verify(phone='08011111111')
+
+        self.enrollee.phone = '08022222222'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.enrollee.save()
+
+        self.assertEqual(self.verify(phone='08011111111').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.verify(phone='08022222222').status_code, status.HTTP_200_OK)
+
+    def test_plan_save_invalidates(self):
+        self.verify(email='ada@test.com')
+        self.plan.annual_cap = 500000
+        with self.captureOnCommitCallbacks(execute=True):
+            self.plan.save()
+
+        response = self.verify(email='ada@test.com')
+        self.assertEqual(response.data['plan']['annual_cap'], 500000.0)
+
+    def test_evicted_generation_is_a_miss(self):
+        self.verify(email='ada@test.com')
+        cache.delete(generation_key('plan', self.plan.pk))
+        self.verify(email='ada@test.com')
+        self.assertEqual(cache_stats()['misses'], 2)
+
+    def test_bulk_changes_invalidate(self):
+        self.verify(enrollee_id='HL-240101-0001')
+        Enrollees.objects.filter(pk=self.enrollee.pk).update(status='TERMINATED')
+        with self.captureOnCommitCallbacks(execute=True):
+            enrollees_bulk_changed.send(sender=Enrollees, enrollee_ids=[self.enrollee.pk])
+
+        response = self.verify(enrollee_id='HL-240101-0001')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_stats_require_admin(self):
+        response = self.client.get(reverse('verification-cache-stats'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        admin = User.objects.create_user(email='admin@test.com', password='pw', username='admin')
+        UserProfile.objects.create(user=admin, role='ADMIN', phone='08100000008')
+        self.client.force_authenticate(user=admin)
+        self.verify(phone='08011111111')
+
+        response = self.client.get(reverse('verification-cache-stats'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data), {'hits', 'misses', 'hit_rate'})
+
+
+class SearchEnrolleeTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='clinic@test.com', password='pw', username='clinic')
+        UserProfile.objects.create(user=self.user, role='PROVIDER', phone='08100000009')
+        self.client.force_authenticate(user=self.user)
+
+        for i, (first_name, last_name, dob) in enumerate([
+            ('Chukwuemeka', 'Okonkwo', '1990-01-01'),
+            ('Chukwuemeka', 'Okonkwo', '1985-05-05'),
+            ('Chioma', 'Okafor', '1992-02-02'),
+            ('Tunde', 'Bello', '1990-01-01'),
+        ]):
+            Enrollees.objects.create(
+                first_name=first_name, last_name=last_name, dob=dob,
+                gender='M', phone=f'0801000000{i}'
+            )
+        self.url = reverse('enrollee-search')
+
+    def test_ranks_misspelled_names(self):
+        response = self.client.get(self.url, {'name': 'chukwuemeka okonkwoh'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        names = [result['name'] for result in response.data['results']]
+        self.assertEqual(names[:2], ['Chukwuemeka Okonkwo'] * 2)
+        self.assertNotIn('Tunde Bello', names)
+        similarities = [result['similarity'] for result in response.data['results']]
+        self.assertEqual(similarities, sorted(similarities, reverse=True))
+
+    def test_narrows_by_dob_and_limit(self):
+        response = self.client.get(
+            self.url, {'name': 'Chukwuemeka Okonkwo', 'dob': '1985-05-05', 'limit': 5}
+        )
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(str(response.data['results'][0]['dob']), '1985-05-05')
+
+        response = self.client.get(self.url, {'name': 'Chukwuemeka Okonkwo', 'limit': 1})
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_fallback_ranks_the_best_candidates(self):
+        for i in range(5):
+            Enrollees.objects.create(
+                first_name='Chidi', last_name=f'Chukwu{i}', gender='M', phone=f'0802000000{i}'
+            )
+        with mock.patch('apps.enrollees.search.FALLBACK_CANDIDATES', 2):
+            results = fallback_search(Enrollees.objects.all(), 'chioma okafor', 1)
+        self.assertEqual(
+            [(enrollee.first_name, enrollee.last_name) for enrollee in results],
+            [('Chioma', 'Okafor')]
+        )
+
+    def test_requires_name(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(self.url, {'name': 'Ada', 'dob': '01/01/1990'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class VerifyUsersBatchTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='clinic@test.com', password='pw', username='clinic')
+        UserProfile.objects.create(user=self.user, role='PROVIDER', phone='08100000009')
+        self.client.force_authenticate(user=self.user)
+
+        self.plan = Plan.objects.create(
+            plan_code='PLAN001',
+            name='Gold Plan',
+            description='Premium coverage',
+            annual_cap=1000000.00,
+            visit_cap=10,
+            covered_services=['consultation'],
+            co_pay_rules={'consultation': 1000}
+        )
+        today = timezone.now().date()
+        self.enrollees = [
+            Enrollees.objects.create(
+                enrollee_id=f'HL-240101-000{i}', first_name=f'Member{i}', last_name='Test',
+                gender='F', phone=f'0801111111{i}', email=f'member{i}@test.com', plan=self.plan,
+                status='SUSPENDED' if i == 2 else 'ACTIVE',
+                coverage_start=today - timedelta(days=30), coverage_end=today + timedelta(days=30)
+            )
+            for i in range(3)
+        ]
+        self.url = reverse('verify-users-batch')
+
+    def test_results_in_input_order(self):
+        items = [
+            {'enrollee_id': 'hl-240101-0001'},
+            {'phone': '+234 801 111 1110'},
+            {'email': 'MEMBER2@test.com'},
+            {'phone': '08099999999'},
+            {'first_name': 'Member0'},
+            {'phone': '08011111110', 'email': 'member1@test.com'},
+        ]
+        Enrollees.objects.filter(pk=self.enrollees[1].pk).update(
+            created_at=timezone.now() + timedelta(minutes=1)
+        )
+        with self.assertNumQueries(1):
+            response = self.client.post(self.url, {'items': items}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([result['index'] for result in results], list(range(6)))
+        self.assertEqual(
+            [result['status'] for result in results],
+            ['active', 'active', 'inactive', 'not_found', 'invalid', 'active']
+        )
+        self.assertEqual(results[0]['enrollee']['enrollee_id'], 'HL-240101-0001')
+        self.assertEqual(results[1]['enrollee']['enrollee_id'], 'HL-240101-0000')
+        self.assertEqual(results[1]['plan']['name'], 'Gold Plan')
+        # Newest match wins, as in verify_user
+        self.assertEqual(results[5]['enrollee']['enrollee_id'], 'HL-240101-0001')
+
+    def test_rejects_bad_payloads(self):
+        response = self.client.post(self.url, {'items': {}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        with self.settings(ELIGIBILITY_BATCH_MAX_ITEMS=2):
+            response = self.client.post(self.url, {'items': [{'phone': '1'}] * 3}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
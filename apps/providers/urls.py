@@ -3,4 +3,7 @@ from . import views
 
 urlpatterns = [
     path('verify-user/', views.verify_user, name='verify-user'),
+    path('verify-user/cache-stats/', views.verification_cache_stats, name='verification-cache-stats'),
+    path('verify-users/batch/', views.verify_users_batch, name='verify-users-batch'),
+    path('search/', views.search_enrollee, name='enrollee-search'),
 ]
\ No newline at end of file
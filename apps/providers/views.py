@@ -1,10 +1,20 @@
+import datetime
+from django.conf import settings
+from django.db.models.functions import Lower
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
-from apps.accounts.permissions import IsProvider
+from apps.accounts.permissions import IsAdmin, IsProvider
 from apps.enrollees.models import Enrollees
-from django.db.models import Q
+from apps.enrollees.search import DEFAULT_LIMIT, search_enrollees
+from apps.providers.eligibility import (
+    cache_stats,
+    eligibility_result,
+    normalize_identifiers,
+    verify_batch,
+    verify_identifiers,
+)
 
 
 @api_view(['POST'])
@@ -19,13 +29,21 @@ def verify_user(request):
     - enrollee_id
     - first_name + last_name
     
+    Identifiers are matched exactly against the normalized lookup columns
+    (E.164 phone, lower-cased email, upper-cased enrollee ID), so each one
+    is an index lookup, and the result is cached until the enrollee or its
+    plan changes. Names are only used when no identifier is given. They must
+    match exactly, ignoring case, and an optional dob (YYYY-MM-DD) narrows
+    them; misspelled names are for search_enrollee, which returns candidates.
+
     Returns coverage status, plan details, and balance.
     """
-    phone = request.get('phone', None)
-    email = request.get('email', None)
-    enrollee_id = request.get('enrollee_id', None)
-    first_name = request.get('first_name', None)
-    last_name = request.get('last_name', None)
+    phone = str(request.data.get('phone') or '').strip()
+    email = str(request.data.get('email') or '').strip()
+    enrollee_id = str(request.data.get('enrollee_id') or '').strip()
+    first_name = str(request.data.get('first_name') or '').strip()
+    last_name = str(request.data.get('last_name') or '').strip()
+    dob = str(request.data.get('dob') or '').strip()
 
     # Validating that at least one search parameter was provided
     if not phone and not email and not enrollee_id and not (first_name and last_name):
@@ -34,73 +52,108 @@ def verify_user(request):
         }, status=status.HTTP_400_BAD_REQUEST)
     
     # ---------------------------
-    # Build flexible Q query
+    # Exact identifiers are cached
     # ---------------------------
-    query = Q()
-
-    if phone:
-        query |= Q(contact_phone__icontains=phone)
-    if email:
-        query |= Q(contact_email__icontains=email)
-    if enrollee_id:
-        query |= Q(enrollee_id__icontains=enrollee_id)
-    if first_name and last_name:
-        query |= Q(first_name__icontains=first_name) & Q(last_name__icontains=last_name)
-    
-    enrollee = Enrollees.objects.filter(query).first()
+    identifiers = normalize_identifiers(phone, email, enrollee_id)
+    if identifiers:
+        data, status_code = verify_identifiers(identifiers)
+    else:
+        # lower() rather than iexact, which no index can serve
+        matches = (
+            Enrollees.objects.select_related('plan')
+            .alias(first_name_lower=Lower('first_name'), last_name_lower=Lower('last_name'))
+            .filter(first_name_lower=first_name.lower(), last_name_lower=last_name.lower())
+        )
+        if dob:
+            try:
+                matches = matches.filter(dob=datetime.date.fromisoformat(dob))
+            except ValueError:
+                return Response(
+                    {"error": "dob must be a YYYY-MM-DD date"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        matches = list(matches[:2])
+        if len(matches) > 1:
+            return Response(
+                {"error": "Several enrollees have this name; add dob or an identifier"},
+                status=status.HTTP_409_CONFLICT
+            )
+        data, status_code = eligibility_result(matches[0] if matches else None)
 
-    
-    if not enrollee:
-        return Response({
-            'error': 'User not found'
-        }, status=status.HTTP_404_NOT_FOUND)
-    
-    # -----------------------------
-    # Check coverage
-    # -----------------------------
-    if not enrollee.is_coverage_active():
+    return Response(data, status=status_code)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsProvider])
+def verify_users_batch(request):
+    """
+    Verify a list of patients in one request, e.g. a day's appointments.
+
+    Body: {"items": [{"phone": ...}, {"enrollee_id": ...}, ...]}, each item
+    with any of phone, email and enrollee_id. Returns one result per item in
+    input order; unmatched, inactive and invalid items are reported inline.
+    """
+    items = request.data.get('items')
+    if not isinstance(items, list) or not items:
         return Response(
-            {"status": "inactive", "message": "Coverage is not active"},
-            status=status.HTTP_403_FORBIDDEN
+            {"error": "items must be a non-empty list"},
+            status=status.HTTP_400_BAD_REQUEST
         )
-    
-    # -----------------------------
-    # Return coverage details
-    # -----------------------------
-    annual_cap = enrollee.plan.annual_cap
-    used_amount = 0
-    remaining = annual_cap - used_amount
-    
-    # ---------------------------
-    # TASK 7: Construct response
-    # ---------------------------
-    response_data = {
-        "status": "active",
-        "enrollee": {
+
+    max_items = settings.ELIGIBILITY_BATCH_MAX_ITEMS
+    if len(items) > max_items:
+        return Response(
+            {"error": f"At most {max_items} items can be verified at once"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    return Response({"results": verify_batch(items)}, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsProvider])
+def search_enrollee(request):
+    """
+    Search enrollees by (possibly misspelled) name for the front desk.
+
+    Query params: name, optional dob (YYYY-MM-DD) and limit.
+    Returns the closest matches first, with their similarity score.
+    """
+    name = request.query_params.get('name', '').strip()
+    if not name:
+        return Response(
+            {"error": "name is required"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        limit = int(request.query_params.get('limit', DEFAULT_LIMIT))
+        dob = request.query_params.get('dob') or None
+        if dob:
+            dob = datetime.date.fromisoformat(dob)
+    except ValueError:
+        return Response(
+            {"error": "limit must be a number and dob a YYYY-MM-DD date"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    results = [
+        {
             "id": str(enrollee.id),
             "enrollee_id": enrollee.enrollee_id,
             "name": f"{enrollee.first_name} {enrollee.last_name}",
             "dob": enrollee.dob,
-            "phone": enrollee.phone,
-            "email": enrollee.email,
-        },
-        "plan": {
-            "name": enrollee.plan.name,
-            "annual_cap": float(annual_cap),
-        },
-        "balance": {
-            "annual_cap": float(annual_cap),
-            "used": float(used_amount),
-            "remaining": float(remaining),
-            "percentage_used": (used_amount / annual_cap * 100) if annual_cap > 0 else 0
-        },
-        "coverage": {
-            "start_date": enrollee.coverage_start,
-            "end_date": enrollee.coverage_end,
-            "days_remaining": (enrollee.coverage_end - timezone.now().date()).days
+            "similarity": round(enrollee.similarity, 3),
         }
-    }
-
-    return Response(response_data, status=status.HTTP_200_OK)
+        for enrollee in search_enrollees(name, dob=dob, limit=limit)
+    ]
+    return Response({"results": results}, status=status.HTTP_200_OK)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdmin])
+def verification_cache_stats(request):
+    """
+    Hit/miss counters of the verification cache, for sizing it.
+    """
+    return Response(cache_stats(), status=status.HTTP_200_OK)
@@ -0,0 +1,40 @@
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+class _AssertMaxQueriesContext(CaptureQueriesContext):
+    def __init__(self, test_case, max_queries, connection):
+        self.test_case = test_case
+        self.max_queries = max_queries
+        super().__init__(connection)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        super().__exit__(exc_type, exc_value, traceback)
+        if exc_type is not None:
+            return
+        executed = len(self)
+        self.test_case.assertLessEqual(
+            executed, self.max_queries,
+            "%d queries executed, at most %d allowed\nCaptured queries were:\n%s" % (
+                executed,
+                self.max_queries,
+                '\n'.join(
+                    '%d. %s' % (i, query['sql'])
+                    for i, query in enumerate(self.captured_queries, start=1)
+                ),
+            )
+        )
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin to keep endpoints within a query budget:
+
+        with self.assertMaxQueries(3):
+            self.client.get(url)
+
+    Unlike assertNumQueries, the budget is an upper bound, so an endpoint
+    that gets cheaper keeps passing while an N+1 regression fails.
+    """
+    def assertMaxQueries(self, max_queries, using=DEFAULT_DB_ALIAS):
+        return _AssertMaxQueriesContext(self, max_queries, connections[using])
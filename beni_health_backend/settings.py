@@ -68,6 +68,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.accounts.middleware.IdentityMapMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -107,6 +108,23 @@ DATABASES = {
     }
 }
 
+# Cache
+# Redis when REDIS_URL is set (see docker-compose.yml), per-process memory otherwise
+
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -144,6 +162,10 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded files (profile pictures, enrollee import files)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -152,7 +174,7 @@ AUTH_USER_MODEL = 'accounts.User'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.accounts.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.AllowAny',
@@ -177,7 +199,8 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,  # Generate new refresh token on refresh
     'BLACKLIST_AFTER_ROTATION': True,  # Invalidate old token
-    'UPDATE_LAST_LOGIN': True,
+    # Logins are buffered and written in batches by apps.accounts.last_login
+    'UPDATE_LAST_LOGIN': False,
     
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': os.getenv('SECRET_KEY'),
@@ -194,6 +217,59 @@ SIMPLE_JWT = {
     'JTI_CLAIM': 'jti',  # JWT ID for token tracking
 }
 
+# Longest delay (seconds) before a login shows up in User.last_login; logins
+# are buffered and written in one batched UPDATE. 0 writes them immediately.
+LAST_LOGIN_FLUSH_INTERVAL = int(os.getenv('LAST_LOGIN_FLUSH_INTERVAL', 60))
+
+# Cached User + profiles of authenticated users (seconds); entries are
+# also dropped whenever one of those rows is saved or deleted
+IDENTITY_CACHE_TIMEOUT = int(os.getenv('IDENTITY_CACHE_TIMEOUT', 300))
+
+# Phone numbers without a country code are read as local to this region
+PHONE_REGION = os.getenv('PHONE_REGION', 'NG')
+
+# Enrollee bulk import
+ENROLLEE_IMPORT_CHUNK_SIZE = int(os.getenv('ENROLLEE_IMPORT_CHUNK_SIZE', 1000))
+# Seconds without a heartbeat after which a PROCESSING import job is handed
+# to another worker. Roster syncs only beat once, so keep this above the
+# longest sync.
+ENROLLEE_IMPORT_JOB_TIMEOUT = int(os.getenv('ENROLLEE_IMPORT_JOB_TIMEOUT', 1800))
+
+# Enrollee roster export (rows fetched per server-side cursor round-trip)
+ENROLLEE_EXPORT_CHUNK_SIZE = int(os.getenv('ENROLLEE_EXPORT_CHUNK_SIZE', 2000))
+ENROLLEE_SYNC_PREVIEW_LIMIT = int(os.getenv('ENROLLEE_SYNC_PREVIEW_LIMIT', 50))
+
+# The enrollee change feed only returns rows updated at least this many
+# seconds ago, and on Postgres this long before the oldest open writing
+# transaction began, so rows from transactions still committing are not skipped
+ENROLLEE_CHANGE_FEED_LAG = int(os.getenv('ENROLLEE_CHANGE_FEED_LAG', 5))
+
+# Enrollee IDs accepted by one bulk status transition request
+ENROLLEE_STATUS_TRANSITION_MAX_IDS = int(os.getenv('ENROLLEE_STATUS_TRANSITION_MAX_IDS', 5000))
+
+# Processes hashing passwords and invite tokens when provisioning employee
+# accounts in bulk (0: one per CPU)
+ACCOUNT_PROVISIONING_WORKERS = int(os.getenv('ACCOUNT_PROVISIONING_WORKERS', 0))
+
+# Link emailed to provisioned employee accounts to set their password; the
+# page posts {uid} and {token} back to auth/accept-invite/
+ACCOUNT_INVITE_URL = os.getenv(
+    'ACCOUNT_INVITE_URL', 'http://localhost:3000/accept-invite?uid={uid}&token={token}'
+)
+
+# Outgoing email (account invites)
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_HOST = os.getenv('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.getenv('EMAIL_PORT', 25))
+EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', '').lower() in ('1', 'true', 'yes')
+DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'webmaster@localhost')
+
+# Provider eligibility results cache (seconds; entries also expire at midnight)
+ELIGIBILITY_CACHE_TIMEOUT = int(os.getenv('ELIGIBILITY_CACHE_TIMEOUT', 3600))
+ELIGIBILITY_BATCH_MAX_ITEMS = int(os.getenv('ELIGIBILITY_BATCH_MAX_ITEMS', 5000))
+
 # CORS Configuration (allow React frontend to call API)
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",  # React dev server